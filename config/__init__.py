@@ -31,6 +31,8 @@ SEMANTIC_STORE = {her_name: f'memory/store/semantic_memory_{her_name}'}
 TIME_STORE = {her_name: f'memory/store/time_indexed_{her_name}'}
 SETTING_STORE = {her_name: f'memory/store/settings_{her_name}.json'}
 RECENT_LOG = {her_name: f'memory/store/recent_{her_name}.json'}
+MEMORY_OUTBOX = {her_name: f'memory/store/outbox_{her_name}.jsonl'}
+SUMMARY_CACHE = 'memory/store/summary_cache.json'  # 各记忆模块共用的对话摘要缓存
 
 
 import json
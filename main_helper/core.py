@@ -2,6 +2,7 @@
 本文件是主逻辑文件，负责管理整个对话流程。当选择不使用TTS时，将会通过OpenAI兼容接口使用Omni模型的原生语音输出。
 当选择使用TTS时，将会通过额外的TTS API去合成语音。注意，TTS API的输出是流式输出、且需要与用户输入进行交互，实现打断逻辑。
 TTS部分使用了两个队列，原本只需要一个，但是阿里的TTS API回调函数只支持同步函数，所以增加了一个response queue来异步向前端发送音频数据。
+合成的音频本身通过共享内存环形缓冲区（utils/shm_ring.py）传递，response queue中只传递帧序号作为唤醒通知。
 """
 import asyncio
 import json
@@ -9,29 +10,42 @@ import traceback
 import struct  # For packing audio data
 import threading
 import re
-import requests
 import logging
 from datetime import datetime
 from websockets import exceptions as web_exceptions
 from fastapi import WebSocket, WebSocketDisconnect
-from utils.frontend_utils import contains_chinese, replace_blank, replace_corner_mark, remove_bracket, spell_out_number, \
-    is_only_punctuation, split_paragraph
-from utils.audio import make_wav_header
+from utils.frontend_utils import IncrementalSegmenter
+from utils.text_normalizer import normalize_tts_text, warm_up as warm_up_normalizer
+from utils.audio import make_wav_header, StreamingUpsampler
 from main_helper.omni_realtime_client import OmniRealtimeClient
-import inflect
-import base64
-from io import BytesIO
-from PIL import Image
+from main_helper.session_pool import RealtimeSessionPool
+from main_helper.image_pipeline import ImagePipeline
+from main_helper.turn_tracer import TurnTracer
+from utils.queue_bridge import QueueBridge
+from utils.shm_ring import SharedAudioRing
 from config import MASTER_NAME, MEMORY_SERVER_PORT, CORE_API_KEY, CORE_URL, CORE_MODEL, USE_TTS
-from multiprocessing import Process, Queue as MPQueue
+from multiprocessing import Process, Queue as MPQueue, Value as MPValue
 from uuid import uuid4
 import numpy as np
-from librosa import resample
 import httpx 
 
 # Setup logger for this module
 logger = logging.getLogger(__name__)
 
+# 上行麦克风音频的合并窗口（毫秒），0表示每个chunk单独发送。合并会让所有上行音频最多晚一个窗口到达服务端，
+# 服务端VAD的speech_started/speech_stopped与打断也随之推迟；需要减少websocket帧数的会话可以单独设置
+# LLMSessionManager.audio_send_window_ms，建议不超过32（两个chunk）。
+AUDIO_SEND_WINDOW_MS = 0
+TURN_TRACE_PATH = None  # 逐轮延迟记录的JSONL路径，例如 'turn_trace_{LANLAN_NAME}.jsonl'；None表示不写文件
+OUTPUT_BYTES_PER_MS = 48000 * 2 // 1000  # 发往前端的音频：48kHz int16 单声道
+NATIVE_BYTES_PER_MS = 24000 * 2 // 1000  # Omni原生语音输出：24kHz int16 单声道
+TTS_CACHE_DIR = 'memory/store/tts_cache'  # 短句TTS音频的磁盘缓存目录，None表示只使用内存缓存
+TTS_CACHE_MEMORY_BYTES = 16 << 20
+TTS_CACHE_DISK_BYTES = 256 << 20
+SESSION_POOL_SPARES = 1  # 每个角色预先连接好的备用Realtime会话数，0表示每次当场连接
+SESSION_POOL_MAX_IDLE = 120  # 备用会话的最长空闲时间（秒），在服务端断开空闲连接之前重建
+SESSION_POOL_REFRESH_INTERVAL = 5  # 向记忆服务器重新验证prompt的间隔（秒）
+
 
 
 # --- 一个带有定期上下文压缩+在线热切换的语音会话管理器 ---
@@ -47,21 +61,32 @@ class LLMSessionManager:
         self.tts_request_queue = MPQueue() # TTS request (多进程队列)
         self.tts_response_queue = MPQueue() # TTS response (多进程队列)
         self.tts_process = None  # TTS子进程
+        self.tts_response_bridge = QueueBridge(self.tts_response_queue, name=f"tts-response-{lanlan_name}")
+        self.tts_ring = None  # TTS音频共享内存环形缓冲区，首次启用TTS时创建
+        self.tts_cache_stats = {}  # TTS子进程上报的短句缓存计数
+        self.new_dialog_cache = None  # 记忆服务器/new_dialog的本地副本 (ETag, 内容)，用If-None-Match重新验证
+        self.audio_resampler = StreamingUpsampler()  # 原生语音输出 24kHz -> 48kHz，跨chunk保留滤波器状态
+        # 输出音频的代数，每次用户打断（speech_started）加一；与同步进程共享，各环节据此以O(1)丢弃旧音频
+        self.audio_generation = MPValue('Q', 0, lock=False)
+        self.response_generation = 0  # 当前回复开始时的代数，早于最近一次打断的回复的音频一律丢弃
+        self._tts_stale_bytes_seen = 0
+        self.image_pipeline = ImagePipeline(self._stream_image)  # 屏幕/摄像头帧处理，只保留最新帧
         self.lock = threading.Lock()
         with self.lock:
             self.current_speech_id = None
-        self.inflect_parser = inflect.engine()
-        self.emoji_pattern = re.compile(r'[^\w\u4e00-\u9fff\s>][^\w\u4e00-\u9fff\s]{2,}[^\w\u4e00-\u9fff\s<]', flags=re.UNICODE)
-        self.emoji_pattern2 = re.compile("["
-        u"\U0001F600-\U0001F64F"  # emoticons
-        u"\U0001F300-\U0001F5FF"  # symbols & pictographs
-        u"\U0001F680-\U0001F6FF"  # transport & map symbols
-        u"\U0001F1E0-\U0001F1FF"  # flags (iOS)
-                           "]+", flags=re.UNICODE)
+        self.tts_segmenter = IncrementalSegmenter()  # 按句切分送去TTS的文本，打断时清空
+        warm_up_normalizer()  # 原先在这里创建inflect引擎；首次创建耗时数秒，不能推迟到事件循环中的feed_tts
         self.emotion_pattern = re.compile('<(.*?)>')
 
         self.lanlan_prompt = lanlan_prompt
         self.lanlan_name = lanlan_name
+        self.turn_tracer = TurnTracer(lanlan_name, TURN_TRACE_PATH.replace('{LANLAN_NAME}', lanlan_name) if TURN_TRACE_PATH else None)
+        # 延迟追踪与打断代数用到的事件，通过extra_event_handlers挂到OmniRealtimeClient上
+        self.session_event_handlers = {
+            "input_audio_buffer.speech_stopped": self._on_speech_stopped,
+            "response.created": self._on_response_created,
+            "response.done": self._on_response_done,
+        }
         self.MODEL = CORE_MODEL
         self.generation_config = {}  # Qwen暂时不用
         self.message_cache_for_new_session = []
@@ -76,6 +101,7 @@ class LLMSessionManager:
         self.is_hot_swap_imminent = False
         self.tts_handler_task = None
         self.use_tts = USE_TTS
+        self.audio_send_window_ms = AUDIO_SEND_WINDOW_MS
         # 将TTS相关的导入移到外部，确保始终可用
         
         # 热切换相关变量
@@ -84,8 +110,18 @@ class LLMSessionManager:
         self.receive_task = None
         self.message_handler_task = None
 
+        self.memory_client = None  # 访问记忆服务器用的httpx.AsyncClient，首次使用时创建
+
         # 注册回调
-        self.session = OmniRealtimeClient(
+        self.session = self._create_session()
+        # 预连接的备用会话，start_session与热切换都从这里取
+        self.session_pool = RealtimeSessionPool(self._create_session, self._pool_instructions,
+                                                spares=SESSION_POOL_SPARES, max_idle=SESSION_POOL_MAX_IDLE,
+                                                refresh_interval=SESSION_POOL_REFRESH_INTERVAL,
+                                                native_audio=not self.use_tts)
+
+    def _create_session(self):
+        return OmniRealtimeClient(
             base_url=CORE_URL,
             api_key=CORE_API_KEY,
             model=self.MODEL,
@@ -96,18 +132,45 @@ class LLMSessionManager:
             on_input_transcript=self.handle_input_transcript,
             on_output_transcript=self.handle_output_transcript,
             on_connection_error=self.handle_connection_error,
-            on_response_done=self.handle_response_complete
+            on_response_done=self.handle_response_complete,
+            extra_event_handlers=self.session_event_handlers,
+            audio_send_window_ms=self.audio_send_window_ms
         )
 
+    async def _on_speech_stopped(self, event):
+        if self.tts_ring is not None:
+            # TTS子进程在打断后仍合成出的旧音频，在写入环形缓冲区前就被丢弃了
+            stale_bytes = self.tts_ring.stale_bytes
+            self.turn_tracer.stale_audio_dropped((stale_bytes - self._tts_stale_bytes_seen) / OUTPUT_BYTES_PER_MS)
+            self._tts_stale_bytes_seen = stale_bytes
+        self.turn_tracer.start_turn()
+
+    async def _on_response_created(self, event):
+        self.response_generation = self.audio_generation.value
+        self.turn_tracer.response_created(event.get("response", {}).get("id"))
+
+    async def _on_response_done(self, event):
+        self.turn_tracer.response_done(event.get("response", {}).get("id"))
+
+    def _drop_stale_audio(self, nbytes, bytes_per_ms=OUTPUT_BYTES_PER_MS):
+        self.turn_tracer.stale_audio_dropped(nbytes / bytes_per_ms)
+
     async def handle_interrupt(self):
+        self.audio_generation.value += 1
+        self.turn_tracer.interrupted()
         if self.use_tts:
-            self.tts_request_queue.put((None, None))
+            if self.tts_ring is not None:
+                self._drop_stale_audio(self.tts_ring.interrupt())  # 丢弃被打断回复中尚未播放的音频
+            self.tts_segmenter.reset()
+            self.tts_request_queue.put((None, None, None))
+        self.audio_resampler.reset()
         await self.send_user_activity()
 
     async def handle_text_data(self, text: str, is_first_chunk: bool = False):
         """Qwen文本回调：可用于前端显示、语音合成"""
+        self.turn_tracer.mark("first_delta")
         if self.use_tts:
-            self.tts_request_queue.put((self.current_speech_id, text))
+            self.feed_tts(text)
             await self.send_lanlan_response(text, is_first_chunk)
         else:
             logger.info(f"\nAssistant: {text}")
@@ -116,7 +179,14 @@ class LLMSessionManager:
         """Qwen完成回调：用于处理Core API的响应完成事件，包含TTS和热切换逻辑"""
         if self.use_tts:
             print("Response complete")
-            self.tts_request_queue.put((None, None))
+            self.feed_tts(None)
+            self.tts_request_queue.put((None, None, None))
+        elif self.response_generation == self.audio_generation.value:
+            # 输出上采样滤波器中剩余的尾音，否则每条回复的最后几毫秒会被丢掉
+            tail = self.audio_resampler.flush()
+            if tail:
+                await self.send_speech(tail, self.response_generation)
+        self.audio_resampler.reset()
         self.sync_message_queue.put({'type': 'system', 'data': 'turn end'})
         
         # 如果正在热切换过程中，跳过所有热切换逻辑
@@ -167,17 +237,20 @@ class LLMSessionManager:
 
     async def handle_audio_data(self, audio_data: bytes):
         """Qwen音频回调：推送音频到WebSocket前端"""
+        self.turn_tracer.mark("first_delta")
         if not self.use_tts:
+            if self.response_generation != self.audio_generation.value:
+                # 被打断的回复在response.cancel生效前仍在到达的音频
+                self._drop_stale_audio(len(audio_data), NATIVE_BYTES_PER_MS)
+                return
             # 这里假设audio_data为PCM16字节流，直接推送
-            audio = np.frombuffer(audio_data, dtype=np.int16)
-            audio = (resample(audio.astype(np.float32) / 32768.0, orig_sr=24000, target_sr=48000)*32767.).clip(-32768, 32767).astype(np.int16)
-
-            await self.send_speech(audio.tobytes())
+            await self.send_speech(self.audio_resampler.process(audio_data), self.response_generation)
             # 你可以根据需要加上格式、isNewMessage等标记
             # await self.websocket.send_json({"type": "cozy_audio", "format": "blob", "isNewMessage": True})
 
     async def handle_input_transcript(self, transcript: str):
         """Qwen输入转录回调：同步转录文本到消息队列和缓存"""
+        self.turn_tracer.mark("input_transcript")
         # 推送到同步消息队列
         self.sync_message_queue.put({"type": "user", "data": {"input_type": "transcript", "data": transcript.strip()}})
         # 缓存到session cache
@@ -189,12 +262,16 @@ class LLMSessionManager:
             elif self.message_cache_for_new_session[-1]['role'] == MASTER_NAME:
                 self.message_cache_for_new_session[-1]['text'] += transcript.strip()
         # 可选：推送用户活动
+        if self.use_tts:
+            self.feed_tts(None)  # 转录晚于回复到达时，分句器中未凑满一句的文本仍按原speech id送去合成
         with self.lock:
             self.current_speech_id = str(uuid4())
+        self.turn_tracer.set_speech_id(self.current_speech_id)
 
     async def handle_output_transcript(self, text: str, is_first_chunk: bool = False):
+        self.turn_tracer.mark("first_delta")
         if self.use_tts:
-            self.tts_request_queue.put((self.current_speech_id, text))
+            self.feed_tts(text)
         await self.send_lanlan_response(text, is_first_chunk)
 
     async def send_lanlan_response(self, text: str, is_first_chunk: bool = False):
@@ -256,23 +333,19 @@ class LLMSessionManager:
         self.is_hot_swap_imminent = False
 
     def normalize_text(self, text): # 对文本进行基本预处理
-        text = text.strip()
-        text = text.replace("\n", "")
-        if contains_chinese(text):
-            text = replace_blank(text)
-            text = replace_corner_mark(text)
-            text = text.replace(".", "。")
-            text = text.replace(" - ", "，")
-            text = remove_bracket(text)
-            text = re.sub(r'[，、]+$', '。', text)
-        else:
-            text = remove_bracket(text)
-            text = spell_out_number(text, self.inflect_parser)
-        text = self.emoji_pattern2.sub('', text)
-        text = self.emoji_pattern.sub('', text)
-        if is_only_punctuation(text) and text not in ['<', '>']:
-            return ""
-        return text
+        return normalize_tts_text(text)
+
+    def feed_tts(self, text):
+        """把增量文本交给分句器，凑满一句后规范化并送入TTS队列；text为None时冲刷剩余文本。"""
+        if self.response_generation != self.audio_generation.value:
+            # 被打断的回复在response.cancel生效前仍在到达的文本，与handle_audio_data一样丢弃，不送去合成
+            return
+        segments = self.tts_segmenter.feed(text) if text is not None else [self.tts_segmenter.flush()]
+        epoch = self.tts_ring.epoch if self.tts_ring is not None else 0  # 入队时的epoch，打断后TTS进程据此丢弃旧请求
+        for segment in segments:
+            segment = self.normalize_text(segment)
+            if segment:
+                self.tts_request_queue.put((self.current_speech_id, epoch, segment))
 
     async def start_session(self, websocket: WebSocket, new=False):
         self.websocket = websocket
@@ -284,13 +357,16 @@ class LLMSessionManager:
             # 启动TTS子进程
             if self.tts_process is None or not self.tts_process.is_alive():
                 from config import AUDIO_API_KEY, VOICE_ID
+                if self.tts_ring is None:
+                    self.tts_ring = SharedAudioRing()
                 self.tts_process = Process(
                     target=speech_synthesis_worker,
-                    args=(self.tts_request_queue, self.tts_response_queue, AUDIO_API_KEY, VOICE_ID)
+                    args=(self.tts_request_queue, self.tts_response_queue, self.tts_ring, AUDIO_API_KEY, VOICE_ID)
                 )
                 self.tts_process.daemon = True
                 self.tts_process.start()
-            if self.tts_handler_task is None or not self.tts_handler_task.done():
+            if self.tts_handler_task is None or self.tts_handler_task.done():
+                self.tts_response_bridge.start()
                 self.tts_handler_task = asyncio.create_task(self.tts_response_handler())
 
         if new:
@@ -302,33 +378,19 @@ class LLMSessionManager:
 
         try:
             # 获取初始 prompt
-            initial_prompt = self.lanlan_prompt
-            
-            # 尝试连接memory server获取历史记录
-            try:
-                memory_response = requests.get(f"http://localhost:{MEMORY_SERVER_PORT}/new_dialog/{self.lanlan_name}", timeout=5)
-                if memory_response.status_code == 200:
-                    initial_prompt += memory_response.text
-                    logger.info("Memory server connected successfully")
-                else:
-                    logger.warning(f"Memory server returned status {memory_response.status_code}")
-                    initial_prompt += f"\n========{self.lanlan_name}的内心活动========\n现在开始新的对话。\n"
-            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
-                logger.warning(f"Memory server not available (port {MEMORY_SERVER_PORT}): {e}")
-                logger.warning("继续运行但不使用历史记忆功能。如需使用记忆功能，请启动memory server:")
-                logger.warning(f"python memory_server.py")
-                initial_prompt += f"\n========{self.lanlan_name}的内心活动========\n现在开始新的对话。\n"
-            except Exception as e:
-                logger.error(f"Unexpected error connecting to memory server: {e}")
-                initial_prompt += f"\n========{self.lanlan_name}的内心活动========\n现在开始新的对话。\n"
-                
+            initial_prompt = self.lanlan_prompt + await self._fetch_memory_prompt()
             logger.info("====Initial Prompt=====")
             logger.info(initial_prompt)
 
+            # 从会话池中取一个已经连接好的session，没有备用时当场连接
+            self.session_pool.native_audio = not self.use_tts
+            self.session_pool.start()
+            self.session = await self.session_pool.acquire(initial_prompt)
+
             # 标记 session 激活
             if self.session:
-                await self.session.connect(initial_prompt, native_audio = not self.use_tts)
                 self.is_active = True
+                self.image_pipeline.gate.reset()
                 # await self.session.create_response("SYSTEM_MESSAGE | " + initial_prompt)
                 # await self.session.create_response("SYSTEM_MESSAGE | 当前时间：" + str(
                 #             datetime.now().strftime(
@@ -357,6 +419,48 @@ class LLMSessionManager:
         
         await self._safe_websocket_send(_send, "Send User Activity")
 
+    def _new_dialog_headers(self):
+        return {"If-None-Match": self.new_dialog_cache[0]} if self.new_dialog_cache else {}
+
+    async def _fetch_memory_prompt(self, context="", quiet=False):
+        """从记忆服务器获取记忆prompt（带ETag重新验证）；记忆服务器不可用时返回新对话的占位文本。quiet为True时不打印日志。"""
+        fallback = f"\n========{self.lanlan_name}的内心活动========\n现在开始新的对话。\n"
+        try:
+            if self.memory_client is None:
+                # 复用同一个客户端：每次新建AsyncClient都要加载SSL上下文，耗时数十毫秒
+                self.memory_client = httpx.AsyncClient(timeout=5.0)
+            resp = await self.memory_client.get(f"http://localhost:{MEMORY_SERVER_PORT}/new_dialog/{self.lanlan_name}",
+                                                headers=self._new_dialog_headers())
+            memory_prompt = self._accept_new_dialog(resp)
+            if memory_prompt is not None:
+                if not quiet:
+                    logger.info(f"Memory server connected successfully{context}")
+                return memory_prompt
+            if not quiet:
+                logger.warning(f"Memory server returned status {resp.status_code}{context}")
+        except (httpx.ConnectError, httpx.TimeoutException) as e:
+            if not quiet:
+                logger.warning(f"Memory server not available (port {MEMORY_SERVER_PORT}){context}: {e}")
+                logger.warning("继续运行但不使用历史记忆功能。如需使用记忆功能，请启动memory server:")
+                logger.warning(f"python memory_server.py")
+        except Exception as e:
+            if not quiet:
+                logger.error(f"Unexpected error connecting to memory server{context}: {e}")
+        return fallback
+
+    async def _pool_instructions(self):
+        return self.lanlan_prompt + await self._fetch_memory_prompt(quiet=True)
+
+    def _accept_new_dialog(self, response):
+        """处理/new_dialog的响应，返回记忆prompt；记忆服务器返回错误状态时返回None。"""
+        if response.status_code == 304 and self.new_dialog_cache:
+            return self.new_dialog_cache[1]
+        if response.status_code == 200:
+            etag = response.headers.get("ETag")
+            self.new_dialog_cache = (etag, response.text) if etag else None
+            return response.text
+        return None
+
     def _convert_cache_to_str(self, cache):
         """[热切换相关] 将cache转换为字符串"""
         res = ""
@@ -369,42 +473,12 @@ class LLMSessionManager:
 
         # 2. Create PENDING session components (as before, store in self.pending_connector, self.pending_session)
         try:
-            # 创建新的pending session
-            self.pending_session = OmniRealtimeClient(
-                base_url=CORE_URL,
-                api_key=CORE_API_KEY,
-                model=self.MODEL,
-                voice="Chelsie",
-                on_text_delta=self.handle_text_data,
-                on_audio_delta=self.handle_audio_data,
-                on_interrupt=self.handle_interrupt,
-                on_input_transcript=self.handle_input_transcript,
-                on_output_transcript=self.handle_output_transcript,
-                on_connection_error=self.handle_connection_error,
-                on_response_done=self.handle_response_complete
-            )
-            
-            initial_prompt = self.lanlan_prompt
             self.initial_cache_snapshot_len = len(self.message_cache_for_new_session)
-            
-            # 尝试连接memory server获取历史记录（异步版本）
-            try:
-                async with httpx.AsyncClient(timeout=5.0) as client:
-                    resp = await client.get(f"http://localhost:{MEMORY_SERVER_PORT}/new_dialog/{self.lanlan_name}")
-                    if resp.status_code == 200:
-                        initial_prompt += resp.text + self._convert_cache_to_str(self.message_cache_for_new_session)
-                        logger.info("Memory server connected successfully (background prep)")
-                    else:
-                        logger.warning(f"Memory server returned status {resp.status_code} (background prep)")
-                        initial_prompt += f"\n========{self.lanlan_name}的内心活动========\n现在开始新的对话。\n" + self._convert_cache_to_str(self.message_cache_for_new_session)
-            except (httpx.ConnectError, httpx.TimeoutException) as e:
-                logger.warning(f"Memory server not available during background prep: {e}")
-                initial_prompt += f"\n========{self.lanlan_name}的内心活动========\n现在开始新的对话。\n" + self._convert_cache_to_str(self.message_cache_for_new_session)
-            except Exception as e:
-                logger.error(f"Unexpected error connecting to memory server during background prep: {e}")
-                initial_prompt += f"\n========{self.lanlan_name}的内心活动========\n现在开始新的对话。\n" + self._convert_cache_to_str(self.message_cache_for_new_session)
+            initial_prompt = self.lanlan_prompt + await self._fetch_memory_prompt(" (background prep)") + \
+                self._convert_cache_to_str(self.message_cache_for_new_session)
             # print(initial_prompt)
-            await self.pending_session.connect(initial_prompt, native_audio = not self.use_tts)
+            # 从会话池中取备用session，只需在已打开的连接上重发带有缓存对话的instructions
+            self.pending_session = await self.session_pool.acquire(initial_prompt)
 
             # 4. Start temporary listener for PENDING session's *first* ignored response
             #    and wait for it to complete.
@@ -472,6 +546,7 @@ class LLMSessionManager:
             # 执行session切换
             logger.info("Final Swap Sequence: Swapping sessions...")
             self.session = self.pending_session
+            self.image_pipeline.gate.reset()  # 新session还没见过当前画面
             self.session_start_time = datetime.now()
 
             # Start the main listener for the NEWLY PROMOTED self.session
@@ -558,7 +633,11 @@ class LLMSessionManager:
         try:
             if input_type == 'audio':
                 try:
-                    if isinstance(data, list):
+                    if isinstance(data, (bytes, bytearray, memoryview)):
+                        # 二进制帧，已经是小端int16 PCM，直接转发
+                        await self.session.stream_audio(data)
+                    elif isinstance(data, list):
+                        # 旧前端的JSON整数数组，作为回退路径保留
                         audio_bytes = struct.pack(f'<{len(data)}h', *data)
                         await self.session.stream_audio(audio_bytes)
                     else:
@@ -582,20 +661,8 @@ class LLMSessionManager:
             elif input_type in ['screen', 'camera']:
                 try:
                     if isinstance(data, str) and data.startswith('data:image/jpeg;base64,'):
-                        img_data = data.split(',')[1]
-                        img_bytes = base64.b64decode(img_data)
-                        # Resize to 480p (height=480, keep aspect ratio)
-                        image = Image.open(BytesIO(img_bytes))
-                        w, h = image.size
-                        new_h = 480
-                        new_w = int(w * (new_h / h))
-                        image = image.resize((new_w, new_h), Image.Resampling.LANCZOS)
-                        buffer = BytesIO()
-                        image.save(buffer, format='JPEG')
-                        buffer.seek(0)
-                        resized_bytes = buffer.read()
-                        resized_b64 = base64.b64encode(resized_bytes).decode('utf-8')
-                        await self.session.stream_image(resized_b64)
+                        # 解码、缩放至480p、重新编码都在图像线程池中完成，这里只提交最新帧
+                        self.image_pipeline.submit(data.split(',')[1])
                     else:
                         logger.error(f"💥 Stream: Invalid screen data format.")
                         return
@@ -615,6 +682,21 @@ class LLMSessionManager:
             traceback.print_exc()
             await self.send_status(error_message)
 
+    async def _stream_image(self, image_b64: str) -> bool:
+        """图像管线的回调：把处理好的帧发送给当前的Core API session，返回是否真正上传"""
+        if not self.is_active or not self.session:
+            return False
+        try:
+            return await self.session.stream_image(image_b64)
+        except web_exceptions.ConnectionClosedOK:
+            return False
+        except web_exceptions.ConnectionClosedError as e:
+            logger.error(f"💥 Stream: Error sending image data to session: {e}")
+            await self.disconnected_by_server()
+        except Exception as e:
+            logger.error(f"💥 Stream: Error sending image data to session: {e}")
+        return False
+
     async def end_session(self):  # 与Core API断开连接
         self._init_renew_status()
 
@@ -624,6 +706,7 @@ class LLMSessionManager:
         logger.info("End Session: Starting cleanup...")
         self.sync_message_queue.put({'type': 'system', 'data': 'session end'})
         self.is_active = False
+        self.image_pipeline.clear()
 
         if self.message_handler_task:
             self.message_handler_task.cancel()
@@ -647,13 +730,17 @@ class LLMSessionManager:
                 traceback.print_exc()
         # 关闭TTS子进程
         if self.use_tts and self.tts_process and self.tts_process.is_alive():
-            self.tts_request_queue.put((None, None))  # 通知子进程退出
+            self.tts_request_queue.put((None, None, None))  # 通知子进程退出
             self.tts_process.terminate()
             self.tts_process.join()
             self.tts_process = None
         if self.use_tts and self.tts_handler_task and not self.tts_handler_task.done():
             self.tts_handler_task.cancel()
             self.tts_handler_task = None
+        if self.use_tts:
+            self.tts_response_bridge.stop()
+            if self.tts_ring is not None:
+                self.tts_ring.interrupt()
 
         self.last_time = None
         await self.send_expressions()
@@ -749,85 +836,151 @@ class LLMSessionManager:
                     self.current_expression = None
 
 
-    async def send_speech(self, tts_audio):
+    async def send_speech(self, tts_audio, generation=None):
+        """generation为产生这段音频时的代数；在等待发送期间发生了打断则直接丢弃。"""
+        if generation is not None and generation != self.audio_generation.value:
+            self._drop_stale_audio(len(tts_audio))
+            return
+
         async def _send():
             await self.websocket.send_bytes(tts_audio)
         
         if await self._safe_websocket_send(_send, "Send Speech"):
+            self.turn_tracer.mark("first_audio_sent")
             # 同步到同步服务器
-            self.sync_message_queue.put({"type": "binary", "data": tts_audio})
+            self.sync_message_queue.put({"type": "binary", "data": tts_audio, "generation": self.audio_generation.value})
 
     async def tts_response_handler(self):
         while True:
-            while not self.tts_response_queue.empty():
-                data = self.tts_response_queue.get_nowait()
-                await self.send_speech(data)
-            await asyncio.sleep(0.01)
+            item = await self.tts_response_bridge.get()
+            if isinstance(item, tuple):
+                # 子进程上报的指标，例如 ("tts_first_chunk", 毫秒)
+                if item[0] == "tts_first_chunk":
+                    self.turn_tracer.observe_tts_first_chunk(item[1])
+                elif item[0] == "tts_cache":
+                    self.tts_cache_stats = item[1]
+                continue
+            generation = self.audio_generation.value
+            for _, frame in self.tts_ring.read():
+                # 同一份数据要同时发给前端和同步进程，拷贝出共享内存后再让出事件循环
+                await self.send_speech(bytes(frame), generation)
 
 # TTS多进程worker函数，供主进程Process(target=...)调用
 
-def speech_synthesis_worker(request_queue, response_queue, AUDIO_API_KEY, VOICE_ID):
+def speech_synthesis_worker(request_queue, response_queue, tts_ring, AUDIO_API_KEY, VOICE_ID):
     import dashscope
-    from dashscope.audio.tts_v2 import ResultCallback, SpeechSynthesizer, AudioFormat
-    import numpy as np
-    from librosa import resample
-    import re
     import time
+    from dashscope.audio.tts_v2 import ResultCallback
+    from main_helper.tts_pool import SynthesizerPool, CosyVoiceBackend
+    from main_helper.tts_cache import PhraseAudioCache
     dashscope.api_key = AUDIO_API_KEY
+    CACHE_CHUNK_BYTES = 9600  # 缓存命中时按100ms一帧写入环形缓冲区
     class Callback(ResultCallback):
-        def __init__(self, response_queue):
+        def __init__(self, response_queue, tts_ring):
             self.response_queue = response_queue
+            self.tts_ring = tts_ring
+            self.epoch = tts_ring.epoch
+            self.resampler = StreamingUpsampler()
+            self.turn_start = None  # 本轮开始的时间，用于统计首包延迟
+            self.capture_text = None  # 本合成器只合成了这一句短句时，收集其音频写入缓存
+            self.captured = []
         def on_open(self): pass
         def on_complete(self): pass
-        def on_error(self, message: str): print(f"TTS Error: {message}")
+        def on_error(self, message: str):
+            self.capture_text = None
+            print(f"TTS Error: {message}")
         def on_close(self): pass
         def on_event(self, message): pass
         def on_data(self, data: bytes) -> None:
-            audio = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
-            data = (resample(audio, orig_sr=24000, target_sr=48000)*32767.).clip(-32767, 32766).astype(np.int16).tobytes()
-            self.response_queue.put(data)
-    callback = Callback(response_queue)
+            if self.turn_start is not None:
+                self.response_queue.put(("tts_first_chunk", (time.perf_counter() - self.turn_start) * 1000))
+                self.turn_start = None
+            pcm = self.resampler.process(data)
+            if self.capture_text is not None:
+                self.captured.append(pcm)
+            seq = self.tts_ring.write(pcm, self.epoch)
+            if seq is not None:
+                self.response_queue.put(seq)
+    pool = SynthesizerPool(CosyVoiceBackend(VOICE_ID), lambda: Callback(response_queue, tts_ring))
+    cache = PhraseAudioCache(TTS_CACHE_DIR, VOICE_ID, memory_bytes=TTS_CACHE_MEMORY_BYTES,
+                             disk_bytes=TTS_CACHE_DISK_BYTES)
+
+    def finish(synthesizer, callback):
+        try:
+            if callback.epoch != tts_ring.epoch:
+                # 本轮已被打断：不必等服务端合成完剩余文本，也不把不完整的音频写入缓存
+                cancel = getattr(synthesizer, "streaming_cancel", None)
+                if cancel is not None:
+                    cancel()
+            else:
+                synthesizer.streaming_complete()
+                tail = callback.resampler.flush()
+                if tail:
+                    callback.captured.append(tail)
+                    seq = tts_ring.write(tail, callback.epoch)
+                    if seq is not None:
+                        response_queue.put(seq)
+                if callback.capture_text is not None:
+                    cache.put(callback.capture_text, b''.join(callback.captured))
+            synthesizer.close()
+        except Exception:
+            pass
+
+    def serve_cached(pcm, epoch):
+        seq = None
+        for offset in range(0, len(pcm), CACHE_CHUNK_BYTES):
+            seq = tts_ring.write(pcm[offset:offset + CACHE_CHUNK_BYTES], epoch)
+        if seq is not None:
+            response_queue.put(seq)
+
     current_speech_id = None
     synthesizer = None
+    callback = None
+    turn_start = None
     while True:
-        # 非阻塞检查队列，优先处理打断
-        if request_queue.empty():
-            time.sleep(0.01)
-            continue
-
-        sid, tts_text = request_queue.get()
-        if sid is None and synthesizer is not None:
+        # 阻塞等待下一条请求，不再轮询
+        sid, epoch, tts_text = request_queue.get()
+        if sid is None:
             # 合成完毕
-            try:
-                current_speech_id = None
-                synthesizer.streaming_complete()
-            except Exception:
+            current_speech_id = None
+            if synthesizer is not None:
+                finish(synthesizer, callback)
                 synthesizer = None
+            response_queue.put(("tts_cache", cache.stats()))
+            continue
+        if epoch != tts_ring.epoch:
+            # 打断前入队、尚未处理的文本：不再合成，也不从缓存播放
             continue
-        if current_speech_id is None or current_speech_id != sid or synthesizer is None:
+        if sid != current_speech_id or (synthesizer is not None and callback.epoch != epoch):
+            if synthesizer is not None:
+                finish(synthesizer, callback)
+                synthesizer = None
             current_speech_id = sid
+            turn_start = time.perf_counter()
+        if not tts_text:
+            continue
+        if synthesizer is None:
+            # 本轮还没有打开合成器时，短句优先从缓存中取；一旦打开合成器，后续文本都交给它以保证顺序
+            pcm = cache.get(tts_text)
+            if pcm is not None:
+                if turn_start is not None:
+                    response_queue.put(("tts_first_chunk", (time.perf_counter() - turn_start) * 1000))
+                    turn_start = None
+                serve_cached(pcm, epoch)
+                continue
             try:
-                if synthesizer is not None:
-                    try:
-                        synthesizer.streaming_complete()
-                        synthesizer.close()
-                    except Exception:
-                        pass
-                synthesizer = SpeechSynthesizer(
-                    model="cosyvoice-v2",
-                    voice=VOICE_ID,
-                    speech_rate=1.1,
-                    format=AudioFormat.PCM_24000HZ_MONO_16BIT,
-                    callback=callback,
-                )
+                synthesizer, callback = pool.acquire()
             except Exception as e:
                 print("TTS Error: ", e)
                 synthesizer = None
                 current_speech_id = None
                 continue
-        if not tts_text:
-            time.sleep(0.01)
-            continue
+            callback.epoch = epoch
+            callback.turn_start, turn_start = turn_start, None
+            if cache.cacheable(tts_text):
+                callback.capture_text = tts_text
+        else:
+            callback.capture_text = None
         # 处理表情等逻辑
         try:
             synthesizer.streaming_call(tts_text)
@@ -836,4 +989,3 @@ def speech_synthesis_worker(request_queue, response_queue, AUDIO_API_KEY, VOICE_
             synthesizer = None
             current_speech_id = None
             continue
-
@@ -12,33 +12,16 @@ import asyncio
 import time
 import pickle
 import aiohttp
-from config import MONITOR_SERVER_PORT, MEMORY_SERVER_PORT, COMMENTER_SERVER_PORT
+from config import MONITOR_SERVER_PORT, MEMORY_SERVER_PORT, COMMENTER_SERVER_PORT, MEMORY_OUTBOX
 from datetime import datetime
 import json
-import requests
 import re
-from utils.frontend_utils import contains_chinese, replace_blank, replace_corner_mark, remove_bracket, spell_out_number, \
-    is_only_punctuation, split_paragraph
-emoji_pattern = re.compile(r'[^\w\u4e00-\u9fff\s>][^\w\u4e00-\u9fff\s]{2,}[^\w\u4e00-\u9fff\s<]', flags=re.UNICODE)
-emoji_pattern2 = re.compile("["
-        u"\U0001F600-\U0001F64F"  # emoticons
-        u"\U0001F300-\U0001F5FF"  # symbols & pictographs
-        u"\U0001F680-\U0001F6FF"  # transport & map symbols
-        u"\U0001F1E0-\U0001F1FF"  # flags (iOS)
-                           "]+", flags=re.UNICODE)
-emotion_pattern = re.compile('<(.*?)>')
+from collections import deque
+from utils.text_normalizer import normalize_sync_text as normalize_text  # 对文本进行基本预处理
+from utils.queue_bridge import QueueBridge
+from main_helper.memory_outbox import MemoryOutbox
 
-
-def normalize_text(text):  # 对文本进行基本预处理
-    text = text.strip()
-    text = replace_blank(text)
-
-    text = emoji_pattern2.sub('', text)
-    text = emoji_pattern.sub('', text)
-    text = emotion_pattern.sub("", text)
-    if is_only_punctuation(text):
-        return ""
-    return text
+SYNC_HEARTBEAT_INTERVAL = 1.  # 秒；没有消息时也按这个间隔唤醒，发送心跳并检查shutdown_event
 
 async def keep_reader(ws: aiohttp.ClientWebSocketResponse):
     while not ws.closed:
@@ -50,8 +33,8 @@ async def keep_reader(ws: aiohttp.ClientWebSocketResponse):
             break
 
 
-def sync_connector_process(message_queue, shutdown_event, lanlan_name, sync_server_url=f"ws://localhost:{MONITOR_SERVER_PORT}", config=None):
-    """独立进程运行的同步连接器"""
+def sync_connector_process(message_queue, shutdown_event, lanlan_name, sync_server_url=f"ws://localhost:{MONITOR_SERVER_PORT}", config=None, audio_generation=None):
+    """独立进程运行的同步连接器。audio_generation为与LLMSessionManager共享的输出音频代数，早于它的音频不再转发"""
 
     # 创建一个新的事件循环
     loop = asyncio.new_event_loop()
@@ -78,6 +61,16 @@ def sync_connector_process(message_queue, shutdown_event, lanlan_name, sync_serv
         current_turn = 'user'
         last_screen = None
 
+        # 读线程阻塞在message_queue上，把消息成批投递到asyncio.Queue；事件循环本身不再调用阻塞的get()
+        bridge = QueueBridge(message_queue, name="sync-connector")
+        bridge.start()
+        pending = deque()  # 已取出、尚未处理的消息；连接出错重连后继续处理
+        # 对话历史经由持久化发件箱交给记忆服务器，投递在后台进行，不阻塞转发
+        outbox = MemoryOutbox(MEMORY_OUTBOX.get(lanlan_name, f'memory/store/outbox_{lanlan_name}.jsonl'),
+                              f"http://localhost:{MEMORY_SERVER_PORT}")
+        outbox.start()
+        last_heartbeat = 0.
+
         while not shutdown_event.is_set():
             try:
                 # 如果连接不存在或已关闭，重新连接
@@ -115,9 +108,14 @@ def sync_connector_process(message_queue, shutdown_event, lanlan_name, sync_serv
                         )
                         bullet_reader = asyncio.create_task(keep_reader(bullet_ws))
 
-                # 检查消息队列
-                while not message_queue.empty():
-                    message = message_queue.get()
+                # 等待新消息，超时则只发心跳
+                if not pending:
+                    try:
+                        pending.extend(await asyncio.wait_for(bridge.get_batch(), timeout=SYNC_HEARTBEAT_INTERVAL))
+                    except asyncio.TimeoutError:
+                        pass
+                while pending:
+                    message = pending.popleft()
 
                     if message["type"] == "json":
                         if config['monitor'] and sync_ws:
@@ -155,6 +153,8 @@ def sync_connector_process(message_queue, shutdown_event, lanlan_name, sync_serv
                             text_output_cache += message["data"]["text"]
 
                     elif message["type"] == "binary":
+                        if audio_generation is not None and message.get("generation", 0) < audio_generation.value:
+                            continue  # 入队后用户已经打断，这段音频不再转发
                         if config['monitor'] and binary_ws:
                             await binary_ws.send_bytes(message["data"])
 
@@ -183,12 +183,7 @@ def sync_connector_process(message_queue, shutdown_event, lanlan_name, sync_serv
                                     chat_history.append(
                                             {'role': 'assistant', 'content': [{'type': 'text', 'text': text_output_cache}]})
                                 text_output_cache = ''
-                                response = requests.post(
-                                    f"http://localhost:{MEMORY_SERVER_PORT}/renew/{lanlan_name}",
-                                    json={'input_history': json.dumps(chat_history, indent=2, ensure_ascii=False)},
-                                )
-                                if response.json()['status'] == 'error':
-                                    print("💥 Conversation processing error", response.json()['message'])
+                                outbox.enqueue('renew', lanlan_name, json.dumps(chat_history, indent=2, ensure_ascii=False))
                                 chat_history.clear()
 
                             if message["data"] == 'turn end': # lanlan的消息结束了
@@ -203,12 +198,7 @@ def sync_connector_process(message_queue, shutdown_event, lanlan_name, sync_serv
 
                             elif message["data"] == 'session end': # 当前session结束了
                                 print("💗开始处理聊天历史")
-                                response = requests.post(
-                                    f"http://localhost:{MEMORY_SERVER_PORT}/process/{lanlan_name}",
-                                    json={'input_history': json.dumps(chat_history, indent=2, ensure_ascii=False)},
-                                )
-                                if response.json()['status'] == 'error':
-                                    print("💥 Conversation processing error", response.json()['message'])
+                                outbox.enqueue('process', lanlan_name, json.dumps(chat_history, indent=2, ensure_ascii=False))
                                 text_output_cache = ''  # lanlan的当前消息
                                 current_turn = 'user'
                                 chat_history.clear()
@@ -216,15 +206,13 @@ def sync_connector_process(message_queue, shutdown_event, lanlan_name, sync_serv
                             print('❗️❗️❗️System message error: ', e)
                             import traceback
                             traceback.print_exc()
-                    await asyncio.sleep(0.01)
                 # 发送心跳
-                if config['monitor'] and sync_ws:
-                    await sync_ws.send_json({"type": "heartbeat", "timestamp": time.time()})
-                if config['monitor'] and binary_ws:
-                    await binary_ws.send_bytes(b'\x00\x01\x02\x03')
-
-                # 短暂休眠避免CPU占用过高
-                await asyncio.sleep(0.1)
+                if time.monotonic() - last_heartbeat >= SYNC_HEARTBEAT_INTERVAL:
+                    last_heartbeat = time.monotonic()
+                    if config['monitor'] and sync_ws:
+                        await sync_ws.send_json({"type": "heartbeat", "timestamp": time.time()})
+                    if config['monitor'] and binary_ws:
+                        await binary_ws.send_bytes(b'\x00\x01\x02\x03')
 
             except asyncio.CancelledError:
                 break
@@ -260,6 +248,8 @@ def sync_connector_process(message_queue, shutdown_event, lanlan_name, sync_serv
                 await asyncio.sleep(0.2)  # 重连前等待
 
         # 关闭资源
+        bridge.stop()
+        await outbox.close()
         for ws in [sync_ws, binary_ws, bullet_ws]:
             if ws and not ws.closed:
                 await ws.close()
@@ -0,0 +1,205 @@
+"""
+屏幕/摄像头帧的处理管线。base64解码、JPEG解码、缩放、重新编码都是CPU密集操作，如果直接在事件循环里执行，
+所有会话的音频和websocket发送都会被阻塞。本模块把这些操作放到共享的线程池中（PIL在编解码和缩放时会释放GIL），
+每个会话只保留最新的一帧：处理过程中到达的新帧会覆盖尚未开始处理的旧帧，旧帧直接丢弃。
+屏幕内容没有变化时，FrameGate根据感知哈希(dHash)跳过上传，以节省上行带宽；哈希在解码后立即用缩略图计算，
+被跳过的帧不再缩放和重新编码。
+"""
+import asyncio
+import base64
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Awaitable, Callable, Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+TARGET_HEIGHT = 480
+DEDUP_HAMMING_THRESHOLD = 5  # dHash汉明距离小于该值时视为同一画面
+FORCE_REFRESH_SECONDS = 10.  # 即使画面不变，也至少每隔这么久上传一次
+HASH_THUMB_WIDTH = 128  # 计算dHash前先用reduce()把解码后的图像缩小到大约这个宽度
+STAGES = ("b64_decode", "jpeg_decode", "dhash", "resize", "jpeg_encode", "b64_encode")
+
+# 所有会话共享的图像处理线程池
+_executor = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="image_worker")
+
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """差值哈希：灰度缩略图中每个像素与右侧像素比较，得到hash_size*hash_size位的整数。"""
+    thumb = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = list(thumb.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def frame_hash(image: Image.Image) -> int:
+    """在整数倍缩小的缩略图上计算dHash，比在完整图像上转灰度再缩放快得多。"""
+    return dhash(image.reduce(max(1, image.width // HASH_THUMB_WIDTH)))
+
+
+class FrameGate:
+    """
+    单个会话的重复帧过滤器。与最近一次真正上传的帧比较dHash，汉明距离低于threshold则跳过，
+    但距离上次上传超过refresh_interval秒时强制上传。
+    """
+    def __init__(self, threshold: int = DEDUP_HAMMING_THRESHOLD, refresh_interval: float = FORCE_REFRESH_SECONDS):
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self.frames_received = 0
+        self.frames_skipped = 0
+        self.bytes_saved = 0
+        self.reset()
+
+    def reset(self):
+        """忘记上一次上传的帧，下一帧必定上传。用于新建或切换Core API session时。"""
+        self._last_hash = None
+        self._last_sent_time = 0.
+        self._last_sent_bytes = 0
+
+    def should_send(self, frame_hash: int) -> bool:
+        self.frames_received += 1
+        if self._last_hash is not None and \
+                time.monotonic() - self._last_sent_time < self.refresh_interval and \
+                (frame_hash ^ self._last_hash).bit_count() < self.threshold:
+            self.frames_skipped += 1
+            self.bytes_saved += self._last_sent_bytes  # 跳过的帧没有编码，按上一次上传的同一画面的大小计
+            return False
+        return True
+
+    def mark_sent(self, frame_hash: int, nbytes: int):
+        self._last_hash = frame_hash
+        self._last_sent_time = time.monotonic()
+        self._last_sent_bytes = nbytes
+
+    def stats(self):
+        return {
+            "frames_received": self.frames_received,
+            "frames_skipped": self.frames_skipped,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+def decode_frame(img_b64: str, target_height: int = TARGET_HEIGHT):
+    """
+    解码base64编码的JPEG并计算感知哈希，返回(图像, 缩放后的尺寸, 感知哈希, 各阶段耗时秒数)。
+    缩放后的尺寸为target_height高度、保持原图宽高比。
+    对JPEG使用draft模式在解码时直接按1/2、1/4、1/8缩小，大尺寸截图不会被完整解码。
+    """
+    timings = {}
+    t0 = time.perf_counter()
+    img_bytes = base64.b64decode(img_b64)
+    t1 = time.perf_counter()
+    timings["b64_decode"] = t1 - t0
+
+    image = Image.open(BytesIO(img_bytes))
+    w, h = image.size
+    new_h = target_height
+    new_w = int(w * (new_h / h))
+    image.draft("RGB", (new_w, new_h))
+    image.load()
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    t2 = time.perf_counter()
+    timings["jpeg_decode"] = t2 - t1
+
+    image_hash = frame_hash(image)
+    timings["dhash"] = time.perf_counter() - t2
+    return image, (new_w, new_h), image_hash, timings
+
+
+def encode_frame(image: Image.Image, size):
+    """把decode_frame得到的图像缩放到size并重新编码为JPEG，返回(新的base64字符串, 各阶段耗时秒数)。"""
+    timings = {}
+    t2 = time.perf_counter()
+    image = image.resize(size, Image.Resampling.LANCZOS)
+    t3 = time.perf_counter()
+    timings["resize"] = t3 - t2
+
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG')
+    t4 = time.perf_counter()
+    timings["jpeg_encode"] = t4 - t3
+
+    resized_b64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    timings["b64_encode"] = time.perf_counter() - t4
+    return resized_b64, timings
+
+
+class ImagePipeline:
+    """
+    单个会话的图像管线。submit()只是把帧放入容量为1的槽位，真正的处理由后台任务在线程池中完成：
+    先解码并计算哈希，经FrameGate去重后，只有需要上传的帧才缩放、编码，再通过on_frame回调（在事件循环中）发出。
+    on_frame返回帧是否真正被上传。
+    """
+    def __init__(self, on_frame: Callable[[str], Awaitable[bool]], target_height: int = TARGET_HEIGHT,
+                 gate: Optional[FrameGate] = None):
+        self.on_frame = on_frame
+        self.target_height = target_height
+        self.gate = gate or FrameGate()
+        self._pending: Optional[str] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        self.frames_submitted = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.stage_totals = {stage: 0.0 for stage in STAGES}
+        self.stage_counts = {stage: 0 for stage in STAGES}
+        self.last_timings = {}
+
+    def submit(self, img_b64: str):
+        """提交一帧。若上一帧还没开始处理，则直接覆盖（丢弃）它。"""
+        self.frames_submitted += 1
+        if self._pending is not None:
+            self.frames_dropped += 1
+        self._pending = img_b64
+        if self._worker_task is None or self._worker_task.done():
+            self._worker_task = asyncio.get_running_loop().create_task(self._run())
+
+    def clear(self):
+        """丢弃尚未处理的帧并停止后台任务，用于会话结束时。"""
+        self._pending = None
+        if self._worker_task and not self._worker_task.done():
+            self._worker_task.cancel()
+        self._worker_task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._pending is not None:
+            img_b64, self._pending = self._pending, None
+            try:
+                image, size, image_hash, timings = await loop.run_in_executor(_executor, decode_frame, img_b64, self.target_height)
+                if self.gate.should_send(image_hash):
+                    resized_b64, encode_timings = await loop.run_in_executor(_executor, encode_frame, image, size)
+                    timings |= encode_timings
+                else:
+                    resized_b64 = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"💥 Image pipeline: Error processing frame: {e}")
+                continue
+            self.frames_processed += 1
+            self.last_timings = timings
+            for stage, seconds in timings.items():
+                self.stage_totals[stage] += seconds
+                self.stage_counts[stage] += 1
+            if resized_b64 is not None and await self.on_frame(resized_b64):
+                self.gate.mark_sent(image_hash, len(resized_b64))
+
+    def stats(self):
+        """返回帧计数以及各阶段的平均/最近一次耗时（毫秒），被跳过的帧不计入缩放、编码阶段的平均值。"""
+        return {
+            "frames_submitted": self.frames_submitted,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": self.frames_dropped,
+            "avg_ms": {stage: self.stage_totals[stage] * 1000 / max(self.stage_counts[stage], 1) for stage in STAGES},
+            "last_ms": {stage: seconds * 1000 for stage, seconds in self.last_timings.items()},
+            **self.gate.stats(),
+        }
@@ -0,0 +1,163 @@
+"""
+cross_server向记忆服务器交接对话历史（/renew、/process）用的持久化发件箱。
+记忆服务器要先调用LLM做总结才会回复，原先同步进程在事件循环中直接requests.post，整个转发循环（包括副终端的音频）会卡住数秒，
+记忆服务器没有运行时这段对话也就丢了。现在：
+    enqueue() 把请求追加写入JSONL文件并fsync，随即返回，不等待投递；
+    后台协程复用同一个aiohttp.ClientSession按顺序投递，失败时指数退避重试，成功后追加一条ack记录；
+    每条记录的id作为request_id一起发送，记忆服务器据此丢弃超时后重发的同一条请求；
+    启动时重放文件中没有ack的请求；全部投递完成后清空文件。
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from uuid import uuid4
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryOutbox:
+    def __init__(self, path: str, base_url: str, timeout: float = 300., max_backoff: float = 60.,
+                 max_attempts: int = 5):
+        """
+        timeout：单次投递的超时（秒），记忆服务器的总结可能很慢。
+        max_attempts：记忆服务器明确返回status=error（处理失败，而不是连不上）时最多尝试的次数，
+        超过后放弃这条请求，避免一条坏数据堵住后面的投递；连接失败则一直重试。
+        """
+        self.path = path
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self._pending = deque(self._load())
+        self._wakeup = None
+        self._task = None
+        self.delivered = 0
+        self.dropped = 0
+        self.last_error = None
+
+    def _load(self):
+        records, acked = {}, set()
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 写到一半时进程退出留下的残行
+                    if 'ack' in entry:
+                        acked.add(entry['ack'])
+                    else:
+                        records[entry['id']] = entry
+        except FileNotFoundError:
+            return []
+        pending = [entry for uid, entry in records.items() if uid not in acked]
+        # 只保留未投递的请求重写文件，顺带去掉可能的残行
+        self._rewrite(pending)
+        if pending:
+            logger.info(f"Memory outbox: {len(pending)} undelivered request(s) recovered from {self.path}")
+        return pending
+
+    def _rewrite(self, entries):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def _append(self, entry):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def enqueue(self, endpoint: str, lanlan_name: str, input_history: str):
+        """endpoint为'renew'或'process'；input_history为已经序列化好的JSON字符串。"""
+        entry = {'id': uuid4().hex, 'endpoint': endpoint, 'lanlan_name': lanlan_name,
+                 'input_history': input_history, 'created': time.time()}
+        self._append(entry)
+        self._pending.append(entry)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        """必须在事件循环中调用。"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._deliver_loop())
+
+    async def _post(self, session, entry):
+        """返回 'ok'、'error'（记忆服务器处理失败）或 'retry'（连不上、超时、HTTP错误）。"""
+        url = f"{self.base_url}/{entry['endpoint']}/{entry['lanlan_name']}"
+        try:
+            async with session.post(url, json={'input_history': entry['input_history'],
+                                               'request_id': entry['id']}) as response:
+                if response.status != 200:
+                    self.last_error = f"HTTP {response.status} from {url}"
+                    return 'retry'
+                result = await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            self.last_error = f"{url}: {e!r}"
+            return 'retry'
+        if result.get('status') == 'error':
+            print("💥 Conversation processing error", result.get('message'))
+            return 'error'
+        return 'ok'
+
+    async def _deliver_loop(self):
+        backoff = 1.
+        attempts = 0
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+            while True:
+                if not self._pending:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                entry = self._pending[0]
+                outcome = await self._post(session, entry)
+                if outcome == 'ok':
+                    self.delivered += 1
+                else:
+                    if outcome == 'error':
+                        attempts += 1
+                    if attempts < self.max_attempts:
+                        if outcome == 'retry' and backoff == 1.:
+                            # 只在连续失败的第一次打印，记忆服务器没启动时不刷屏
+                            logger.warning(f"Memory outbox: delivery failed ({self.last_error}), "
+                                           f"retrying with backoff up to {self.max_backoff:.0f}s")
+                        await asyncio.sleep(backoff)
+                        backoff = min(backoff * 2, self.max_backoff)
+                        continue
+                    logger.error(f"Memory outbox: giving up on {entry['endpoint']} request {entry['id']} "
+                                 f"after {attempts} attempts")
+                    self.dropped += 1
+                backoff = 1.
+                attempts = 0
+                self._pending.popleft()
+                if self._pending:
+                    self._append({'ack': entry['id']})
+                else:
+                    self._rewrite([])
+
+    async def close(self, timeout: float = 2.):
+        """尽量在timeout内投递完剩余请求；没投递完的留在文件中，下次启动时重放。"""
+        if self._task is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self._pending and not self._task.done() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._task = None
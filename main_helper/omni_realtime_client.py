@@ -2,17 +2,27 @@
 
 import asyncio
 import websockets
-import json
+from websockets.protocol import State
 import base64
+import binascii
+import re
 import time
 import logging
+import itertools
+from uuid import uuid4
 
 from typing import Optional, Callable, Dict, Any, Awaitable
 from enum import Enum
 
+from utils import json_codec
+
 # Setup logger for this module
 logger = logging.getLogger(__name__)
 
+INPUT_BYTES_PER_MS = 16000 * 2 // 1000  # 16bit 16kHz mono pcm
+_AUDIO_DELTA_TYPE = re.compile(r'"type"\s*:\s*"response\.audio\.delta"')
+_DELTA_KEY = re.compile(r'"delta"\s*:\s*"')
+
 class TurnDetectionMode(Enum):
     SERVER_VAD = "server_vad"
     MANUAL = "manual"
@@ -52,6 +62,13 @@ class OmniRealtimeClient:
         extra_event_handlers (Dict[str, Callable[[Dict[str, Any]], Awaitable[None]]]):
             Additional event handlers.
             Is a mapping of event names to functions that process the event payload.
+        audio_send_window_ms (int):
+            If > 0, upstream audio is coalesced into one append event per window instead of one per chunk.
+            Buffered audio is flushed when the window fills, when it times out, and on speech boundaries.
+            Off by default: every chunk then reaches the server (and its VAD) up to one window later, so
+            speech_started / barge-in are delayed by the same amount. Keep it at a chunk or two (20-32 ms).
+        json_loads / json_dumps (Callable):
+            JSON codec used for server events. Defaults to utils.json_codec (orjson when installed).
     """
     def __init__(
         self,
@@ -67,7 +84,10 @@ class OmniRealtimeClient:
         on_output_transcript: Optional[Callable[[str, bool], Awaitable[None]]] = None,
         on_connection_error: Optional[Callable[[], Awaitable[None]]] = None,
         on_response_done: Optional[Callable[[], Awaitable[None]]] = None,
-        extra_event_handlers: Optional[Dict[str, Callable[[Dict[str, Any]], Awaitable[None]]]] = None
+        extra_event_handlers: Optional[Dict[str, Callable[[Dict[str, Any]], Awaitable[None]]]] = None,
+        audio_send_window_ms: int = 0,
+        json_loads: Optional[Callable[[Any], Any]] = None,
+        json_dumps: Optional[Callable[[Any], str]] = None
     ):
         self.base_url = base_url
         self.api_key = api_key
@@ -83,6 +103,15 @@ class OmniRealtimeClient:
         self.handle_connection_error = on_connection_error
         self.on_response_done = on_response_done
         self.extra_event_handlers = extra_event_handlers or {}
+        self.audio_send_window_ms = audio_send_window_ms
+        self._audio_send_window_bytes = audio_send_window_ms * INPUT_BYTES_PER_MS
+        self._audio_send_buffer = bytearray()
+        self._audio_flush_task = None
+        # event_id: per-client prefix + monotonic counter, never collides within or across clients
+        self._event_id_prefix = f"event_{uuid4().hex[:8]}_"
+        self._event_counter = itertools.count()
+        self.json_loads = json_loads or json_codec.loads
+        self.json_dumps = json_dumps or json_codec.dumps
 
         # Track current response state
         self._current_response_id = None
@@ -95,6 +124,7 @@ class OmniRealtimeClient:
         self._modalities = ["text", "audio"]
         self._audio_in_buffer = False
         self._skip_until_next_response = False
+        self._register_event_handlers()
 
     async def connect(self, instructions: str, native_audio=True) -> None:
         """Establish WebSocket connection with the Realtime API."""
@@ -106,8 +136,10 @@ class OmniRealtimeClient:
             "OpenAI-Beta": "realtime=v1"
         }
         self.ws = await websockets.connect(url, additional_headers=headers)
+        await self.configure(instructions, native_audio)
 
-        # Set up default session configuration
+    async def configure(self, instructions: str, native_audio=True) -> None:
+        """Send the full session configuration. Also used to re-prime an already connected (pooled) session."""
         if self.turn_detection_mode == TurnDetectionMode.MANUAL:
             raise NotImplementedError("Manual turn detection is not supported")
         elif self.turn_detection_mode == TurnDetectionMode.SERVER_VAD:
@@ -133,10 +165,16 @@ class OmniRealtimeClient:
         else:
             raise ValueError(f"Invalid turn detection mode: {self.turn_detection_mode}")
 
+    def is_open(self) -> bool:
+        return self.ws is not None and self.ws.state is State.OPEN
+
+    def next_event_id(self) -> str:
+        return self._event_id_prefix + str(next(self._event_counter))
+
     async def send_event(self, event) -> None:
-        event['event_id'] = "event_" + str(int(time.time() * 1000))
+        event['event_id'] = self.next_event_id()
         if self.ws:
-            await self.ws.send(json.dumps(event))
+            await self.ws.send(self.json_dumps(event))
 
     async def update_session(self, config: Dict[str, Any]) -> None:
         """Update session configuration."""
@@ -147,8 +185,35 @@ class OmniRealtimeClient:
         await self.send_event(event)
 
     async def stream_audio(self, audio_chunk: bytes) -> None:
-        """Stream raw audio data to the API."""
+        """Stream raw audio data to the API. Accepts any bytes-like object, e.g. a memoryview into a websocket frame."""
         # only support 16bit 16kHz mono pcm
+        if self.audio_send_window_ms <= 0:
+            await self._send_audio(audio_chunk)
+            return
+        self._audio_send_buffer += audio_chunk
+        if len(self._audio_send_buffer) >= self._audio_send_window_bytes:
+            # 按大小发送时取消旧的定时器，下一段音频到达时重新计时；否则旧的定时器会在下一个窗口中途发出不满的append
+            if self._audio_flush_task is not None:
+                self._audio_flush_task.cancel()
+                self._audio_flush_task = None
+            await self.flush_audio()
+        elif self._audio_flush_task is None or self._audio_flush_task.done():
+            self._audio_flush_task = asyncio.create_task(self._delayed_flush_audio())
+
+    async def _delayed_flush_audio(self) -> None:
+        await asyncio.sleep(self.audio_send_window_ms / 1000)
+        self._audio_flush_task = None  # 开始发送后不再被stream_audio取消
+        await self.flush_audio()
+
+    async def flush_audio(self) -> None:
+        """Send any coalesced audio immediately."""
+        if not self._audio_send_buffer:
+            return
+        audio_chunk = bytes(self._audio_send_buffer)
+        self._audio_send_buffer.clear()
+        await self._send_audio(audio_chunk)
+
+    async def _send_audio(self, audio_chunk: bytes) -> None:
         audio_b64 = base64.b64encode(audio_chunk).decode()
 
         append_event = {
@@ -157,14 +222,16 @@ class OmniRealtimeClient:
         }
         await self.send_event(append_event)
 
-    async def stream_image(self, image_b64: str) -> None:
-        """Stream raw image data to the API."""
+    async def stream_image(self, image_b64: str) -> bool:
+        """Stream raw image data to the API. Returns whether the image was actually sent."""
         if self._audio_in_buffer:
             append_event = {
                 "type": "input_image_buffer.append",
                 "image": image_b64
             }
             await self.send_event(append_event)
+            return True
+        return False
 
     async def create_response(self, instructions: str, skipped: bool = False) -> None:
         """Request a response from the API. Needed when using manual mode."""
@@ -202,6 +269,123 @@ class OmniRealtimeClient:
         self._current_response_id = None
         self._current_item_id = None
 
+    def _register_event_handlers(self) -> None:
+        """Build the dispatch tables once. State handlers always run; content handlers are skipped while
+        _skip_until_next_response is set. Event types without a built-in content handler fall through
+        to extra_event_handlers."""
+        self._state_handlers = {
+            "response.done": self._on_response_done,
+            "response.created": self._on_response_created,
+            "response.output_item.added": self._on_output_item_added,
+            "input_audio_buffer.speech_started": self._on_speech_started,
+            "input_audio_buffer.speech_stopped": self._on_speech_stopped,
+            "conversation.item.input_audio_transcription.completed": self._on_input_transcript_completed,
+            "response.audio_transcript.done": self._on_output_transcript_done,
+        }
+        self._content_handlers = {
+            "response.text.delta": self._on_text_delta,
+            "response.audio.delta": self._on_audio_delta,
+            "conversation.item.input_audio_transcription.completed": self._on_input_transcript,
+            "response.audio_transcript.done": self._on_output_transcript_done,
+            "response.audio_transcript.delta": self._on_output_transcript_delta,
+        }
+
+    async def _on_response_done(self, event) -> None:
+        self._is_responding = False
+        self._current_response_id = None
+        self._current_item_id = None
+        self._skip_until_next_response = False
+        if self.on_response_done:
+            await self.on_response_done()
+
+    async def _on_response_created(self, event) -> None:
+        self._current_response_id = event.get("response", {}).get("id")
+        self._is_responding = True
+        self._is_first_chunk = True
+
+    async def _on_output_item_added(self, event) -> None:
+        self._current_item_id = event.get("item", {}).get("id")
+
+    # Handle interruptions
+    async def _on_speech_started(self, event) -> None:
+        logger.info("Speech detected")
+        self._audio_in_buffer = True
+        await self.flush_audio()
+        if self._is_responding:
+            logger.info("Handling interruption")
+            await self.handle_interruption()
+        if self.on_interrupt:
+            # logger.info("Handling on_interrupt, stop playback")
+            await self.on_interrupt()
+
+    async def _on_speech_stopped(self, event) -> None:
+        logger.info("Speech ended")
+        self._audio_in_buffer = False
+        await self.flush_audio()
+
+    async def _on_input_transcript_completed(self, event) -> None:
+        self._print_input_transcript = True
+
+    async def _on_output_transcript_done(self, event) -> None:
+        self._print_input_transcript = False
+
+    async def _on_text_delta(self, event) -> None:
+        if self.on_text_delta:
+            await self.on_text_delta(event["delta"], self._is_first_chunk)
+            self._is_first_chunk = False
+
+    async def _on_audio_delta(self, event) -> None:
+        if self.on_audio_delta:
+            await self.on_audio_delta(base64.b64decode(event["delta"]))
+
+    async def _on_input_transcript(self, event) -> None:
+        transcript = event.get("transcript", "")
+        if self.on_input_transcript:
+            await self.on_input_transcript(transcript)
+
+    async def _on_output_transcript_delta(self, event) -> None:
+        if self.on_output_transcript:
+            delta = event.get("delta", "")
+            if not self._print_input_transcript:
+                self._output_transcript_buffer += delta
+            else:
+                if self._output_transcript_buffer:
+                    # logger.info(f"{self._output_transcript_buffer} is_first_chunk: True")
+                    await self.on_output_transcript(self._output_transcript_buffer, self._is_first_chunk)
+                    self._is_first_chunk = False
+                    self._output_transcript_buffer = ""
+                await self.on_output_transcript(delta, self._is_first_chunk)
+                self._is_first_chunk = False
+
+    async def dispatch_event(self, event: Dict[str, Any]) -> None:
+        """Route one decoded server event through the dispatch tables."""
+        event_type = event.get("type")
+        if event_type == "error":
+            logger.error(f"API Error: {event['error']}")
+            return
+        handler = self._state_handlers.get(event_type)
+        if handler:
+            await handler(event)
+        if not self._skip_until_next_response:
+            handler = self._content_handlers.get(event_type) or self.extra_event_handlers.get(event_type)
+            if handler:
+                await handler(event)
+
+    @staticmethod
+    def extract_audio_delta(message) -> Optional[bytes]:
+        """Fast path for response.audio.delta: slice the base64 payload out of the raw message and decode it
+        directly, skipping the full JSON parse. Returns None if the message is not a recognisable audio delta."""
+        if not isinstance(message, str) or not _AUDIO_DELTA_TYPE.search(message, 0, 256):
+            return None
+        key = _DELTA_KEY.search(message)
+        if not key:
+            return None
+        end = message.find('"', key.end())
+        if end < 0:
+            return None
+        # a2b_base64 ignores non-alphabet characters, so JSON-escaped slashes (\/) decode correctly
+        return binascii.a2b_base64(message[key.end():end])
+
     async def handle_messages(self) -> None:
         try:
             if not self.ws:
@@ -209,78 +393,12 @@ class OmniRealtimeClient:
                 return
                 
             async for message in self.ws:
-                event = json.loads(message)
-                event_type = event.get("type")
-                
-                # if event_type not in ["response.audio.delta", "response.audio_transcript.delta"]:
-                #     logger.debug(f"Received event: {event}")
-                # else:
-                #     logger.debug(f"Event type: {event_type}")
-                if event_type == "error":
-                    logger.error(f"API Error: {event['error']}")
+                audio_bytes = self.extract_audio_delta(message)
+                if audio_bytes is not None:
+                    if not self._skip_until_next_response and self.on_audio_delta:
+                        await self.on_audio_delta(audio_bytes)
                     continue
-                elif event_type == "response.done":
-                    self._is_responding = False
-                    self._current_response_id = None
-                    self._current_item_id = None
-                    self._skip_until_next_response = False
-                    if self.on_response_done:
-                        await self.on_response_done()
-                elif event_type == "response.created":
-                    self._current_response_id = event.get("response", {}).get("id")
-                    self._is_responding = True
-                    self._is_first_chunk = True
-                elif event_type == "response.output_item.added":
-                    self._current_item_id = event.get("item", {}).get("id")
-                # Handle interruptions
-                elif event_type == "input_audio_buffer.speech_started":
-                    logger.info("Speech detected")
-                    self._audio_in_buffer = True
-                    if self._is_responding:
-                        logger.info("Handling interruption")
-                        await self.handle_interruption()
-                    if self.on_interrupt:
-                        # logger.info("Handling on_interrupt, stop playback")
-                        await self.on_interrupt()
-                elif event_type == "input_audio_buffer.speech_stopped":
-                    logger.info("Speech ended")
-                    self._audio_in_buffer = False
-                elif event_type == "conversation.item.input_audio_transcription.completed":
-                    self._print_input_transcript = True
-                elif event_type == "response.audio_transcript.done":
-                    self._print_input_transcript = False
-
-                if not self._skip_until_next_response:
-                    if event_type == "response.text.delta":
-                        if self.on_text_delta:
-                            await self.on_text_delta(event["delta"], self._is_first_chunk)
-                            self._is_first_chunk = False
-                    elif event_type == "response.audio.delta":
-                        if self.on_audio_delta:
-                            audio_bytes = base64.b64decode(event["delta"])
-                            await self.on_audio_delta(audio_bytes)
-                    elif event_type == "conversation.item.input_audio_transcription.completed":
-                        transcript = event.get("transcript", "")
-                        if self.on_input_transcript:
-                            await self.on_input_transcript(transcript)
-                    elif event_type == "response.audio_transcript.done":
-                        self._print_input_transcript = False
-                    elif event_type == "response.audio_transcript.delta":
-                        if self.on_output_transcript:
-                            delta = event.get("delta", "")
-                            if not self._print_input_transcript:
-                                self._output_transcript_buffer += delta
-                            else:
-                                if self._output_transcript_buffer:
-                                    # logger.info(f"{self._output_transcript_buffer} is_first_chunk: True")
-                                    await self.on_output_transcript(self._output_transcript_buffer, self._is_first_chunk)
-                                    self._is_first_chunk = False
-                                    self._output_transcript_buffer = ""
-                                await self.on_output_transcript(delta, self._is_first_chunk)
-                                self._is_first_chunk = False
-                    
-                    elif event_type in self.extra_event_handlers:
-                        await self.extra_event_handlers[event_type](event)
+                await self.dispatch_event(self.json_loads(message))
 
         except websockets.exceptions.ConnectionClosedOK:
             logger.info("Connection closed as expected")
@@ -298,6 +416,9 @@ class OmniRealtimeClient:
 
     async def close(self) -> None:
         """Close the WebSocket connection."""
+        if self._audio_flush_task and not self._audio_flush_task.done():
+            self._audio_flush_task.cancel()
+        self._audio_send_buffer.clear()
         if self.ws:
             try:
                 # 尝试关闭websocket连接
@@ -0,0 +1,147 @@
+"""
+每个角色的预连接Realtime会话池。原先start_session在用户点击后才建立websocket连接并发送instructions，
+热切换也是到了需要续期时才新建OmniRealtimeClient并连接；现在池中始终保持spares个已经连接、
+并已按最新的人设+记忆prompt配置好的备用会话：
+    acquire(instructions) 直接取一个备用会话，instructions不同（例如热切换时附加了缓存的对话）时只需在已打开的连接上重发一次session.update；
+    后台协程每refresh_interval秒通过prompt_source获取最新prompt（记忆服务器用ETag重新验证，没有变化时返回304），
+    prompt变化时就地重新配置备用会话；空闲超过max_idle的备用会话在服务端断开空闲连接之前关闭并重建。
+池中的会话没有运行handle_messages，服务端发来的session.created/updated留在websocket的接收缓冲区中，取出后由主监听协程照常处理。
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class RealtimeSessionPool:
+    def __init__(self, factory, prompt_source, spares: int = 1, max_idle: float = 120., refresh_interval: float = 5.,
+                 native_audio: bool = True):
+        """
+        factory()返回一个尚未连接的OmniRealtimeClient，回调已经绑定到会话管理器。
+        prompt_source()为协程，返回当前完整的instructions（人设+记忆）。
+        spares为0时不维护备用会话，acquire每次当场连接，与原来的行为相同。
+        """
+        self.factory = factory
+        self.prompt_source = prompt_source
+        self.spares = spares
+        self.max_idle = max_idle
+        self.refresh_interval = refresh_interval
+        self.native_audio = native_audio
+        self.instructions = None  # prompt_source最近一次返回的prompt
+        self._idle = deque()  # [ready_time, instructions, native_audio, session]
+        self._task = None
+        self._wakeup = None
+        self._retry_delay = refresh_interval
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.refreshed = 0
+        self.last_error = None
+
+    def start(self):
+        """必须在事件循环中调用，可以重复调用。"""
+        if self.spares > 0 and (self._task is None or self._task.done()):
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._maintain())
+
+    async def _build(self, instructions):
+        session = self.factory()
+        native_audio = self.native_audio
+        try:
+            await session.connect(instructions, native_audio=native_audio)
+        except BaseException:
+            await self._close(session)
+            raise
+        return [time.monotonic(), instructions, native_audio, session]
+
+    async def _maintain(self):
+        while True:
+            delay = self.refresh_interval
+            try:
+                self.instructions = await self.prompt_source()
+            except Exception as e:
+                logger.error(f"💥 Session pool: Error fetching prompt: {e}")
+            now = time.monotonic()
+            retired = [entry for entry in self._idle if now - entry[0] > self.max_idle or not entry[3].is_open()]
+            outdated = [entry for entry in self._idle if entry not in retired and
+                        (entry[1] != self.instructions or entry[2] != self.native_audio)]
+            for entry in retired + outdated:
+                # 先从空闲队列中取出，重新配置期间不会被acquire拿走
+                self._idle.remove(entry)
+            for entry in retired:
+                self.expired += 1
+                await self._close(entry[3])
+            for entry in outdated:
+                try:
+                    await entry[3].configure(self.instructions, native_audio=self.native_audio)
+                except Exception as e:
+                    logger.warning(f"Session pool: Error refreshing spare session, dropping it: {e}")
+                    await self._close(entry[3])
+                    continue
+                entry[1], entry[2] = self.instructions, self.native_audio
+                self.refreshed += 1
+                self._idle.append(entry)
+            while self.instructions is not None and len(self._idle) < self.spares:
+                try:
+                    entry = await self._build(self.instructions)
+                except Exception as e:
+                    if self.last_error is None:
+                        # 只在连续失败的第一次打印，API不可用时不刷屏
+                        logger.warning(f"Session pool: Error connecting spare session, retrying with backoff: {e}")
+                    self.last_error = str(e)
+                    delay = self._retry_delay
+                    self._retry_delay = min(self._retry_delay * 2, self.max_idle)
+                    break
+                self.last_error = None
+                self._retry_delay = self.refresh_interval
+                self._idle.append(entry)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def acquire(self, instructions: str):
+        """取一个已连接、并已按instructions配置好的会话；没有可用的备用会话时当场连接。"""
+        entry = None
+        while self._idle and entry is None:
+            entry = self._idle.popleft()
+            if not entry[3].is_open():
+                self.expired += 1
+                await self._close(entry[3])
+                entry = None
+        if self._wakeup is not None:
+            self._wakeup.set()  # 让后台协程立即补充备用会话
+        if entry is None:
+            self.misses += 1
+            return (await self._build(instructions))[3]
+        self.hits += 1
+        session = entry[3]
+        if entry[1] != instructions or entry[2] != self.native_audio:
+            await session.configure(instructions, native_audio=self.native_audio)
+        return session
+
+    @staticmethod
+    async def _close(session):
+        try:
+            await session.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        return {"spares": len(self._idle), "hits": self.hits, "misses": self.misses,
+                "expired": self.expired, "refreshed": self.refreshed, "last_error": self.last_error}
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        idle, self._idle = list(self._idle), deque()
+        for entry in idle:
+            await self._close(entry[3])
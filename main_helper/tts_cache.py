@@ -0,0 +1,136 @@
+"""
+短句TTS音频缓存。角色经常重复一些短句（问候、语气词、system_timer的报时、状态提示），
+命中时TTS子进程直接输出缓存的48kHz PCM，不再打开合成器。
+键为 (规范化后的文本, 音色, 模型, 语速, 采样率) 的sha1，分两级：
+    内存LRU：OrderedDict，按字节数限制大小；
+    磁盘：cache_dir下每个键一个.pcm文件，命中时mmap读取，按字节数限制大小，按最近访问顺序淘汰。
+磁盘命中的数据会提升到内存层。
+"""
+import hashlib
+import logging
+import mmap
+import os
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class PhraseAudioCache:
+    def __init__(self, cache_dir: str, voice: str, model: str = "cosyvoice-v2", speech_rate: float = 1.1,
+                 sample_rate: int = 48000, memory_bytes: int = 16 << 20, disk_bytes: int = 256 << 20,
+                 max_phrase_chars: int = 40):
+        self.cache_dir = cache_dir
+        self.key_prefix = f"{voice}|{model}|{speech_rate}|{sample_rate}|"
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.max_phrase_chars = max_phrase_chars
+        self._memory = OrderedDict()  # key -> bytes
+        self._memory_used = 0
+        self._disk = OrderedDict()    # key -> 文件大小，按访问顺序
+        self._disk_used = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.evictions = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            entries = []
+            for entry in os.scandir(cache_dir):
+                if entry.name.endswith(".pcm"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+            for _, key, size in sorted(entries):
+                self._disk[key] = size
+                self._disk_used += size
+            self._evict_disk()
+
+    def cacheable(self, text: str) -> bool:
+        return 0 < len(text) <= self.max_phrase_chars
+
+    def key(self, text: str) -> str:
+        return hashlib.sha1((self.key_prefix + text).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".pcm")
+
+    def get(self, text: str):
+        """返回缓存的PCM（bytes），未命中返回None。"""
+        if not self.cacheable(text):
+            return None
+        key = self.key(text)
+        pcm = self._memory.get(key)
+        if pcm is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            self.bytes_served += len(pcm)
+            return pcm
+        if key in self._disk:
+            try:
+                with open(self._path(key), "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    pcm = mm[:]
+            except (OSError, ValueError) as e:
+                logger.warning(f"TTS cache: dropping unreadable entry {key}: {e}")
+                self._remove_disk(key)
+            else:
+                self._disk.move_to_end(key)
+                try:
+                    os.utime(self._path(key))  # 让重启后的淘汰顺序与访问顺序一致
+                except OSError:
+                    pass
+                self._put_memory(key, pcm)
+                self.disk_hits += 1
+                self.bytes_served += len(pcm)
+                return pcm
+        self.misses += 1
+        return None
+
+    def put(self, text: str, pcm: bytes):
+        if not self.cacheable(text) or not pcm:
+            return
+        key = self.key(text)
+        self._put_memory(key, pcm)
+        if not self.cache_dir or key in self._disk or len(pcm) > self.disk_bytes:
+            return
+        tmp = self._path(key) + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(pcm)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            logger.warning(f"TTS cache: failed to write {key}: {e}")
+            return
+        self._disk[key] = len(pcm)
+        self._disk_used += len(pcm)
+        self._evict_disk()
+
+    def _put_memory(self, key, pcm):
+        if len(pcm) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_used -= len(old)
+        self._memory[key] = pcm
+        self._memory_used += len(pcm)
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted)
+            self.evictions += 1
+
+    def _remove_disk(self, key):
+        size = self._disk.pop(key, 0)
+        self._disk_used -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        while self._disk_used > self.disk_bytes and self._disk:
+            self._remove_disk(next(iter(self._disk)))
+            self.evictions += 1
+
+    def stats(self):
+        return {"memory_hits": self.memory_hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "bytes_served": self.bytes_served, "evictions": self.evictions,
+                "memory_bytes": self._memory_used, "disk_bytes": self._disk_used}
@@ -0,0 +1,116 @@
+"""
+TTS子进程中的预热合成器池。每个新的speech id直接取一个已经建立好连接的空闲合成器，
+当前合成器说话的同时，后台线程补充新的备用合成器；空闲超过ttl的备用合成器会被关闭并重建。
+后端是可替换的，只需实现：
+    create(callback) -> 合成器对象，需提供 streaming_call(text) / streaming_complete() / close()
+    warm(synthesizer)   在后台线程中调用，提前完成连接等耗时准备
+默认后端CosyVoiceBackend使用dashscope的SpeechSynthesizer；tools/bench_tts_pool.py中有一个本地模拟后端。
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class CosyVoiceBackend:
+    def __init__(self, voice, model="cosyvoice-v2", speech_rate=1.1):
+        self.voice = voice
+        self.model = model
+        self.speech_rate = speech_rate
+
+    def create(self, callback):
+        from dashscope.audio.tts_v2 import SpeechSynthesizer, AudioFormat
+        return SpeechSynthesizer(
+            model=self.model,
+            voice=self.voice,
+            speech_rate=self.speech_rate,
+            format=AudioFormat.PCM_24000HZ_MONO_16BIT,
+            callback=callback,
+        )
+
+    def warm(self, synthesizer):
+        # SpeechSynthesizer默认在第一次streaming_call时才建立websocket连接，
+        # dashscope自带的SpeechSynthesizerObjectPool同样通过这个私有方法预先连接
+        synthesizer._SpeechSynthesizer__connect()
+
+
+class SynthesizerPool:
+    def __init__(self, backend, callback_factory, spares: int = 1, ttl: float = 25.):
+        """
+        callback_factory()为每个合成器创建独立的回调对象，使旧合成器的收尾音频不会串到新的一轮。
+        ttl：备用合成器的最长空闲时间（秒），dashscope服务端大约30秒后会断开空闲连接。
+        """
+        self.backend = backend
+        self.callback_factory = callback_factory
+        self.spares = spares
+        self.ttl = ttl
+        self._idle = deque()  # (ready_time, synthesizer, callback)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._thread = threading.Thread(target=self._maintain, name="tts-pool", daemon=True)
+        self._thread.start()
+
+    def _build(self):
+        callback = self.callback_factory()
+        synthesizer = self.backend.create(callback)
+        warm = getattr(self.backend, "warm", None)
+        if warm is not None:
+            warm(synthesizer)
+        return synthesizer, callback
+
+    def _maintain(self):
+        while not self._closed:
+            stale = []
+            with self._lock:
+                now = time.monotonic()
+                while self._idle and now - self._idle[0][0] > self.ttl:
+                    stale.append(self._idle.popleft())
+                missing = self.spares - len(self._idle)
+            for _, synthesizer, _ in stale:
+                self.expired += 1
+                self._close(synthesizer)
+            for _ in range(missing):
+                try:
+                    synthesizer, callback = self._build()
+                except Exception as e:
+                    logger.error(f"💥 TTS pool: Error warming synthesizer: {e}")
+                    break
+                with self._lock:
+                    if self._closed:
+                        self._close(synthesizer)
+                        return
+                    self._idle.append((time.monotonic(), synthesizer, callback))
+            self._wakeup.wait(self.ttl / 4)
+            self._wakeup.clear()
+
+    def acquire(self):
+        """取一个空闲的合成器；没有备用时当场创建。返回 (synthesizer, callback)。"""
+        with self._lock:
+            entry = self._idle.popleft() if self._idle else None
+        self._wakeup.set()
+        if entry is not None:
+            self.hits += 1
+            return entry[1], entry[2]
+        self.misses += 1
+        return self._build()
+
+    @staticmethod
+    def _close(synthesizer):
+        try:
+            synthesizer.close()
+        except Exception:
+            pass
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for _, synthesizer, _ in idle:
+            self._close(synthesizer)
@@ -0,0 +1,138 @@
+"""
+语音对话的逐轮延迟追踪。每一轮记录以下阶段的时间戳（time.perf_counter_ns）：
+    speech_stopped -> input_transcript -> response_created -> first_delta -> first_audio_sent -> response_done
+每个阶段相对于本轮起点（通常是speech_stopped）的耗时被累计进直方图，通过main_server的/metrics以Prometheus文本格式输出；
+可选地把每一轮的完整记录追加写入JSONL文件。热路径上只有一次字典查找和赋值。
+"""
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("speech_stopped", "input_transcript", "response_created", "first_delta", "first_audio_sent", "response_done")
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.
+        self.count = 0
+
+    def observe(self, value_ms: float):
+        for i, upper in enumerate(self.buckets):
+            if value_ms <= upper:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value_ms
+        self.count += 1
+
+    def render(self, name: str, labels: str):
+        """按Prometheus histogram格式输出（累计bucket）。"""
+        lines = []
+        cumulative = 0
+        for upper, n in zip(self.buckets, self.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{labels},le="{upper}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:.3f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class TurnTracer:
+    def __init__(self, lanlan_name: str, trace_path: Optional[str] = None):
+        self.lanlan_name = lanlan_name
+        self.trace_path = trace_path
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self.tts_first_chunk = LatencyHistogram()  # TTS每轮从取合成器到收到第一块音频的耗时
+        self.stale_audio = LatencyHistogram()  # 每次打断后被丢弃、没有发给前端的旧音频时长
+        self.stale_audio_ms_total = 0.
+        self._stale_ms = None  # 当前打断窗口内累计的旧音频时长，None表示不在打断窗口内
+        self.turns_completed = 0
+        self._stamps: Dict[str, int] = {}
+        self._response_id = None
+        self._speech_id = None
+
+    def interrupted(self):
+        """speech_started打断时调用，开始统计本次打断丢弃的旧音频。"""
+        self._close_stale_window()
+        self._stale_ms = 0.
+
+    def stale_audio_dropped(self, ms: float):
+        self.stale_audio_ms_total += ms
+        if self._stale_ms is not None:
+            self._stale_ms += ms
+
+    def _close_stale_window(self):
+        if self._stale_ms is not None:
+            self.stale_audio.observe(self._stale_ms)
+            self._stale_ms = None
+
+    def start_turn(self):
+        """以speech_stopped开始新的一轮。上一轮若尚未结束则按未完成处理。"""
+        self._close_stale_window()
+        if self._stamps:
+            self._finish(completed=False)
+        self._stamps = {"speech_stopped": time.perf_counter_ns()}
+
+    def mark(self, stage: str):
+        """记录阶段时间戳，每轮每个阶段只记录第一次。"""
+        if stage not in self._stamps:
+            self._stamps[stage] = time.perf_counter_ns()
+
+    def set_speech_id(self, speech_id):
+        self._speech_id = speech_id
+
+    def response_created(self, response_id):
+        if self._response_id is not None:
+            # 没有语音输入的回复（例如系统消息触发），单独成为一轮
+            self._finish(completed=False)
+        self._response_id = response_id
+        self.mark("response_created")
+
+    def response_done(self, response_id):
+        # 被打断的旧回复的response.done可能在新一轮开始后才到达，此时忽略
+        if self._response_id is None or self._response_id != response_id:
+            return
+        self.mark("response_done")
+        self._finish(completed=True)
+
+    def observe_tts_first_chunk(self, ms: float):
+        self.tts_first_chunk.observe(ms)
+
+    def _finish(self, completed: bool):
+        stamps, self._stamps = self._stamps, {}
+        response_id, self._response_id = self._response_id, None
+        if not stamps:
+            return
+        origin = stamps.get("speech_stopped", min(stamps.values()))
+        elapsed_ms = {stage: (stamps[stage] - origin) / 1e6 for stage in STAGES if stage in stamps}
+        for stage, ms in elapsed_ms.items():
+            self.histograms[stage].observe(ms)
+        if completed:
+            self.turns_completed += 1
+        if self.trace_path:
+            record = {"lanlan_name": self.lanlan_name, "response_id": response_id, "speech_id": self._speech_id,
+                      "completed": completed, "elapsed_ms": elapsed_ms}
+            try:
+                with open(self.trace_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except OSError as e:
+                logger.error(f"💥 Turn tracer: Error writing trace: {e}")
+
+    def render_metrics(self):
+        lines = []
+        for stage in STAGES:
+            labels = f'lanlan="{self.lanlan_name}",stage="{stage}"'
+            lines.extend(self.histograms[stage].render("lanlan_turn_stage_latency_ms", labels))
+        lines.extend(self.tts_first_chunk.render("lanlan_tts_first_chunk_ms", f'lanlan="{self.lanlan_name}"'))
+        lines.extend(self.stale_audio.render("lanlan_interrupt_stale_audio_ms", f'lanlan="{self.lanlan_name}"'))
+        lines.append(f'lanlan_stale_audio_ms_total{{lanlan="{self.lanlan_name}"}} {self.stale_audio_ms_total:.1f}')
+        lines.append(f'lanlan_turns_completed_total{{lanlan="{self.lanlan_name}"}} {self.turns_completed}')
+        return lines
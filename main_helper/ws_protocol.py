@@ -0,0 +1,39 @@
+"""
+本模块定义前端与主服务器之间 /ws/{lanlan_name} 上的二进制帧格式。
+麦克风PCM如果以JSON整数数组上传，服务器需要json.loads出一个逐采样的Python列表，再用struct重新打包，开销很大。
+二进制帧的格式为：
+    byte 0   : action，见 ACTION_CODES
+    byte 1   : input_type，见 INPUT_TYPE_CODES
+    byte 2.. : 负载。音频为16kHz、单声道、小端int16 PCM，原样转发给OmniRealtimeClient.stream_audio。
+JSON文本帧仍然保留，作为旧前端的回退路径。
+"""
+
+BINARY_HEADER_SIZE = 2
+
+ACTION_CODES = {
+    1: "stream_data",
+}
+INPUT_TYPE_CODES = {
+    1: "audio",
+}
+_ACTION_IDS = {v: k for k, v in ACTION_CODES.items()}
+_INPUT_TYPE_IDS = {v: k for k, v in INPUT_TYPE_CODES.items()}
+
+
+def parse_binary_frame(frame: bytes):
+    """
+    解析一个二进制帧。
+
+    Returns:
+        (action, input_type, payload)。payload是指向原始帧的memoryview，不会拷贝数据。
+        未知的action/input_type返回None。
+    """
+    if len(frame) < BINARY_HEADER_SIZE:
+        raise ValueError(f"Binary frame too short: {len(frame)} bytes")
+    payload = memoryview(frame)[BINARY_HEADER_SIZE:]
+    return ACTION_CODES.get(frame[0]), INPUT_TYPE_CODES.get(frame[1]), payload
+
+
+def encode_binary_frame(action: str, input_type: str, payload: bytes) -> bytes:
+    """构造一个二进制帧，前端app.js中的实现与此一致。"""
+    return bytes((_ACTION_IDS[action], _INPUT_TYPE_IDS[input_type])) + payload
@@ -10,8 +10,9 @@ from datetime import datetime
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
 from fastapi.staticfiles import StaticFiles
 from main_helper import core as core, cross_server as cross_server
+from main_helper.ws_protocol import parse_binary_frame
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from utils.preferences import load_user_preferences, update_model_preferences, validate_model_preferences, get_model_preferences, get_preferred_model_path, move_model_to_top
 from utils.frontend_utils import find_models
 templates = Jinja2Templates(directory="./")
@@ -141,15 +142,20 @@ async def startup_event():
         if sync_process[k] is None:
             sync_process[k] = Process(
                 target=cross_server.sync_connector_process,
-                args=(sync_message_queue[k], sync_shutdown_event[k], k, "ws://localhost:8002", {'bullet': False, 'monitor': False})
+                args=(sync_message_queue[k], sync_shutdown_event[k], k, "ws://localhost:8002", {'bullet': False, 'monitor': False},
+                      session_manager[k].audio_generation)
             )
             sync_process[k].start()
             logger.info(f"同步连接器进程已启动 (PID: {sync_process[k].pid})")
+        # 提前建立备用的Realtime会话，用户第一次点击开始时就不必当场连接
+        session_manager[k].session_pool.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时执行"""
+    for k in session_manager:
+        await session_manager[k].session_pool.close()
     logger.info("Shutting down sync connector processes")
     # 关闭同步服务器连接
     for k in sync_process:
@@ -172,12 +178,22 @@ async def websocket_endpoint(websocket: WebSocket, lanlan_name: str):
 
     try:
         while True:
-            data = await websocket.receive_text()
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
             if session_id[lanlan_name] != this_session_id:
                 await session_manager[lanlan_name].send_status(f"切换至另一个终端...")
                 await websocket.close()
                 break
-            message = json.loads(data)
+            if frame.get("bytes") is not None:
+                # 二进制帧：PCM负载以memoryview形式直接交给session，不做拷贝
+                action, input_type, payload = parse_binary_frame(frame["bytes"])
+                if action == "stream_data":
+                    asyncio.create_task(session_manager[lanlan_name].stream_data({"input_type": input_type, "data": payload}))
+                else:
+                    logger.warning(f"Unknown binary action received: {frame['bytes'][0]}")
+                continue
+            message = json.loads(frame["text"])
             action = message.get("action")
             # logger.debug(f"WebSocket received action: {action}") # Optional debug log
 
@@ -220,6 +236,23 @@ async def websocket_endpoint(websocket: WebSocket, lanlan_name: str):
             session_manager[lanlan_name].websocket = None
         await session_manager[lanlan_name].cleanup()
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus文本格式的逐轮延迟直方图、图像管线与TTS缓存计数"""
+    lines = []
+    for k, mgr in session_manager.items():
+        lines.extend(mgr.turn_tracer.render_metrics())
+        for name, value in mgr.image_pipeline.stats().items():
+            if isinstance(value, dict):
+                # avg_ms / last_ms：各处理阶段的耗时，按stage标签展开
+                for stage, ms in value.items():
+                    lines.append(f'lanlan_image_stage_{name}{{lanlan="{k}",stage="{stage}"}} {ms:.3f}')
+            elif isinstance(value, (int, float)):
+                lines.append(f'lanlan_image_{name}{{lanlan="{k}"}} {value}')
+        for name, value in mgr.tts_cache_stats.items():
+            lines.append(f'lanlan_tts_cache_{name}{{lanlan="{k}"}} {value}')
+    return PlainTextResponse("\n".join(lines) + "\n")
+
 @app.get("/l2d", response_class=HTMLResponse)
 async def get_l2d_manager(request: Request):
     """渲染Live2D模型管理器页面"""
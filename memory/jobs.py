@@ -0,0 +1,192 @@
+"""
+记忆服务器的后台总结任务队列。/process与/renew只把原始消息写入任务日志、登记任务就返回，
+总结（CompressedRecentHistoryManager.update_history与TimeIndexedMemory.store_conversation，各需要若干次LLM调用）交给线程池：
+    - 同一角色的任务按提交顺序串行执行（近期记忆是读-改-写），不同角色之间并发，总并发数不超过max_workers；
+    - 带同一个request_id的请求（发件箱超时后重发同一条记录）只执行一次，返回同一个job id；
+      不按内容去重，内容相同的两段独立对话各自执行；
+    - 任务状态（queued / running / done / error）保存在内存中，可以通过HTTP查询；
+    - 任务日志为JSONL，记录提交与完成；服务器重启后，日志中没有完成的任务会重新执行。
+"""
+import json
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+
+class MemoryJobQueue:
+    def __init__(self, journal_path: str, handlers: dict, max_workers: int = 2, keep_finished: int = 1000):
+        """
+        handlers：任务类型 -> handler(lanlan_name, input_history)，input_history为请求中的JSON字符串。
+        keep_finished：内存中最多保留多少个已结束任务的状态（也是按request_id去重的窗口）。
+        """
+        self.journal_path = journal_path
+        self.handlers = handlers
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="memory-job")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()   # job_id -> 状态dict
+        self._payloads = {}          # job_id -> input_history，任务结束后释放
+        self._by_key = {}            # request_id -> job_id
+        self._keys = {}              # job_id -> request_id
+        self._queues = {}            # lanlan_name -> deque(job_id)
+        self._active = set()         # 正在占用工作线程的角色
+        self._unfinished = 0
+        directory = os.path.dirname(journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            for entry in self._recover():
+                self._register(entry)
+            self._rewrite_journal()
+            for lanlan_name in list(self._queues):
+                self._schedule(lanlan_name)
+
+    def _recover(self):
+        entries, finished = OrderedDict(), set()
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 写到一半时进程退出留下的残行
+                    if "finished" in entry:
+                        finished.add(entry["finished"])
+                    else:
+                        entries[entry["id"]] = entry
+        except FileNotFoundError:
+            return []
+        pending = [entry for job_id, entry in entries.items() if job_id not in finished]
+        if pending:
+            print(f"💗 恢复了{len(pending)}个未完成的记忆任务")
+        return pending
+
+    def _rewrite_journal(self):
+        # 调用方持有self._lock，期间不会有新的任务追加到日志
+        entries = [self._journal_entry(job_id) for job_id, job in self._jobs.items()
+                   if job["status"] in ("queued", "running")]
+        tmp = self.journal_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.journal_path)
+
+    def _journal_entry(self, job_id):
+        job = self._jobs[job_id]
+        return {"id": job_id, "kind": job["kind"], "lanlan_name": job["lanlan_name"],
+                "input_history": self._payloads[job_id], "created": job["created"],
+                "request_id": self._keys.get(job_id)}
+
+    def _append_journal(self, entry):
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _register(self, entry):
+        job_id, lanlan_name = entry["id"], entry["lanlan_name"]
+        self._jobs[job_id] = {"id": job_id, "kind": entry["kind"], "lanlan_name": lanlan_name, "status": "queued",
+                              "created": entry["created"], "started": None, "finished": None, "error": None}
+        self._payloads[job_id] = entry["input_history"]
+        request_id = entry.get("request_id")
+        if request_id is not None:
+            self._by_key[request_id] = job_id
+            self._keys[job_id] = request_id
+        self._queues.setdefault(lanlan_name, deque()).append(job_id)
+        self._unfinished += 1
+
+    def submit(self, kind: str, lanlan_name: str, input_history: str, request_id: str = None) -> dict:
+        """
+        登记一个任务并立即返回其状态。request_id为调用方给每条请求生成的幂等键：
+        同一request_id的任务已在排队、执行中或已完成时，直接返回那个任务；没有request_id时总是新建任务。
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"unknown job kind: {kind}")
+        with self._lock:
+            job_id = self._by_key.get(request_id) if request_id is not None else None
+            if job_id is not None and self._jobs[job_id]["status"] != "error":
+                return dict(self._jobs[job_id])
+            entry = {"id": uuid4().hex, "kind": kind, "lanlan_name": lanlan_name,
+                     "input_history": input_history, "created": time.time(), "request_id": request_id}
+            # 先落盘再登记：返回之后服务器即使退出，这个任务也会在重启后执行
+            self._append_journal(entry)
+            self._register(entry)
+            self._schedule(lanlan_name)
+            return dict(self._jobs[entry["id"]])
+
+    def _schedule(self, lanlan_name):
+        # 调用方持有self._lock。每个角色最多占用一个工作线程，由它按顺序执行该角色的任务
+        if lanlan_name not in self._active and self._queues.get(lanlan_name):
+            self._active.add(lanlan_name)
+            self._executor.submit(self._drain, lanlan_name)
+
+    def _drain(self, lanlan_name):
+        while True:
+            with self._lock:
+                queue = self._queues.get(lanlan_name)
+                if not queue:
+                    self._active.discard(lanlan_name)
+                    self._queues.pop(lanlan_name, None)
+                    return
+                job_id = queue.popleft()
+                job = self._jobs[job_id]
+                job["status"] = "running"
+                job["started"] = time.time()
+                input_history = self._payloads[job_id]
+            try:
+                self.handlers[job["kind"]](lanlan_name, input_history)
+                status, error = "done", None
+            except Exception as e:
+                traceback.print_exc()
+                status, error = "error", str(e)
+            self._finish(job_id, status, error)
+
+    def _finish(self, job_id, status, error):
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = status
+            job["error"] = error
+            job["finished"] = time.time()
+            self._payloads.pop(job_id, None)
+            self._unfinished -= 1
+            if self._unfinished == 0:
+                self._rewrite_journal()  # 没有未完成的任务时清空日志
+            else:
+                self._append_journal({"finished": job_id, "status": status})
+            self._trim()
+
+    def _trim(self):
+        # 调用方持有self._lock
+        excess = len(self._jobs) - self._unfinished - self.keep_finished
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            job = self._jobs[job_id]
+            if job["status"] in ("done", "error"):
+                del self._jobs[job_id]
+                request_id = self._keys.pop(job_id, None)
+                if request_id is not None and self._by_key.get(request_id) == job_id:
+                    del self._by_key[request_id]
+                excess -= 1
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list(self, lanlan_name: str = None):
+        with self._lock:
+            return [dict(job) for job in self._jobs.values()
+                    if lanlan_name is None or job["lanlan_name"] == lanlan_name]
+
+    def pending(self, lanlan_name: str = None) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job["status"] in ("queued", "running")
+                       and (lanlan_name is None or job["lanlan_name"] == lanlan_name))
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
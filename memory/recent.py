@@ -1,49 +1,157 @@
 from datetime import datetime
-from config import RECENT_LOG, SUMMARY_MODEL, OPENROUTER_API_KEY, OPENROUTER_URL, NAME_MAPPING
+from config import RECENT_LOG, SUMMARY_MODEL, OPENROUTER_API_KEY, OPENROUTER_URL, NAME_MAPPING, SUMMARY_CACHE
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, messages_to_dict, messages_from_dict
+import atexit
 import json
 import os
+import threading
+from memory.summary_cache import SummaryCache
 
 from config.prompts_sys import recent_history_manager_prompt, detailed_recent_history_manager_prompt, further_summarize_prompt
 
+COMPACT_EVERY = 16  # 追加日志累积这么多条记录后，把完整历史重写回recent_{name}.json
+
+
 class CompressedRecentHistoryManager:
-    def __init__(self, max_history_length=10):
+    def __init__(self, max_history_length=10, summary_cache=None):
         
         self.llm = ChatOpenAI(model=SUMMARY_MODEL, base_url=OPENROUTER_URL, api_key=OPENROUTER_API_KEY, temperature=0.4)
+        # 近期记忆、时间索引记忆、语义记忆都通过compress_history总结，共用这一份缓存
+        self.summary_cache = summary_cache if summary_cache is not None else SummaryCache(SUMMARY_CACHE)
         self.max_history_length = max_history_length
         self.log_file_path = RECENT_LOG
+        # 内存中的历史是权威数据，读取时不再重新解析JSON。修改先追加写入 recent_{name}.json.journal，
+        # 每条记录带有写入时JSON文件的(mtime, size)，定期合并回JSON（临时文件+原子替换）。
+        # JSON文件的(mtime, size)与内存中记录的不同，说明被外部编辑过：重新加载，并丢弃基于旧文件的日志记录。
         self.user_histories = {}
+        self.generation = {}  # 每个角色近期记忆的版本号，内容发生变化时加一
+        self._file_state = {}
+        self._journal_records = {}
+        self._lock = threading.Lock()
         for ln in self.log_file_path:
-            if os.path.exists(self.log_file_path[ln]):
-                with open(self.log_file_path[ln], encoding='utf-8') as f:
-                    self.user_histories[ln] = messages_from_dict(json.load(f))
-            else:
-                self.user_histories[ln] = []
+            self._load(ln)
+        atexit.register(self.flush)
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def _journal_path(self, lanlan_name):
+        return self.log_file_path[lanlan_name] + '.journal'
+
+    @staticmethod
+    def _apply(history, record):
+        if 'extend' in record:
+            return history + messages_from_dict(record['extend'])
+        if 'compress' in record:
+            return messages_from_dict([record['compress']['memo']]) + history[record['compress']['drop']:]
+        if 'clear' in record:
+            return []
+        return history
+
+    def _load(self, lanlan_name):
+        # 调用方持有self._lock，或者在__init__中
+        path = self.log_file_path[lanlan_name]
+        history = []
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                history = messages_from_dict(json.load(f))
+        state = self._stat(path)
+        applied = stale = 0
+        if os.path.exists(self._journal_path(lanlan_name)):
+            with open(self._journal_path(lanlan_name), encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # 崩溃时写了一半的最后一行
+                    if record.get('base') != state:
+                        stale += 1
+                        continue
+                    history = self._apply(history, record)
+                    applied += 1
+        if stale:
+            print(f"⚠️ {path}被外部修改过，丢弃了{stale}条基于旧文件的近期记忆日志")
+        self.user_histories[lanlan_name] = history
+        self.generation[lanlan_name] = self.generation.get(lanlan_name, 0) + 1
+        self._file_state[lanlan_name] = state
+        self._journal_records[lanlan_name] = applied
+        if applied or stale:
+            self._compact(lanlan_name)
+
+    def _refresh(self, lanlan_name):
+        # 调用方持有self._lock
+        if self._stat(self.log_file_path[lanlan_name]) != self._file_state[lanlan_name]:
+            self._load(lanlan_name)
+
+    def _append_journal(self, lanlan_name, records):
+        # 调用方持有self._lock
+        if not records:
+            return
+        with open(self._journal_path(lanlan_name), 'a', encoding='utf-8') as f:
+            for record in records:
+                record['base'] = self._file_state[lanlan_name]
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_records[lanlan_name] += len(records)
+        if self._journal_records[lanlan_name] >= COMPACT_EVERY:
+            self._compact(lanlan_name)
+
+    def _compact(self, lanlan_name):
+        # 调用方持有self._lock。先原子替换JSON，再清空日志；两步之间崩溃时，日志记录的base与新文件不符，不会被重复应用
+        path = self.log_file_path[lanlan_name]
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(messages_to_dict(self.user_histories[lanlan_name]), f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._file_state[lanlan_name] = self._stat(path)
+        open(self._journal_path(lanlan_name), 'w').close()
+        self._journal_records[lanlan_name] = 0
+
+    def flush(self):
+        """把所有日志合并回JSON文件，进程退出时自动调用。"""
+        with self._lock:
+            for ln in list(self.user_histories):
+                self._refresh(ln)  # 文件被外部修改过时以文件为准，不用内存中的旧数据覆盖
+                if self._journal_records.get(ln):
+                    self._compact(ln)
 
 
     def update_history(self, new_messages, lanlan_name, detailed=False):
-        if os.path.exists(self.log_file_path[lanlan_name]):
-            with open(self.log_file_path[lanlan_name], encoding='utf-8') as f:
-                self.user_histories[lanlan_name] = messages_from_dict(json.load(f))
+        with self._lock:
+            self._refresh(lanlan_name)
+            history = list(self.user_histories[lanlan_name])
+        records = []
 
         try:
-            self.user_histories[lanlan_name].extend(new_messages)
+            history.extend(new_messages)
+            records.append({'extend': messages_to_dict(new_messages)})
 
-            if len(self.user_histories[lanlan_name]) > self.max_history_length:
+            if len(history) > self.max_history_length:
                 # 压缩旧消息
-                to_compress = self.user_histories[lanlan_name][:-self.max_history_length+1]
+                to_compress = history[:-self.max_history_length+1]
                 compressed = [self.compress_history(to_compress, lanlan_name, detailed)[0]]
 
                 # 只保留最近的max_history_length条消息
-                self.user_histories[lanlan_name] = compressed + self.user_histories[lanlan_name][-self.max_history_length+1:]
+                history = compressed + history[-self.max_history_length+1:]
+                records.append({'compress': {'drop': len(to_compress), 'memo': messages_to_dict(compressed)[0]}})
         except Exception as e:
             print("Error when updating history: ", e)
             import traceback
             traceback.print_exc()
 
-        with open(self.log_file_path[lanlan_name], "w", encoding='utf-8') as f:
-            json.dump(messages_to_dict(self.user_histories[lanlan_name]), f, indent=2, ensure_ascii=False)
+        with self._lock:
+            self.user_histories[lanlan_name] = history
+            self.generation[lanlan_name] += 1
+            self._append_journal(lanlan_name, records)
 
 
     # detailed: 保留尽可能多的细节
@@ -52,16 +160,21 @@ class CompressedRecentHistoryManager:
         name_mapping = NAME_MAPPING.copy()
         name_mapping['ai'] = lanlan_name
         messages_text = "\n".join([f"{name_mapping[msg.type]} | {"\n".join([(i.get("text", "|" +i["type"]+ "|") if isinstance(i, dict) else str(i)) for i in msg.content]) if type(msg.content)!=str else f"{name_mapping[msg.type]} | {msg.content}"}" for msg in messages])
+        cache_key = self.summary_cache.key(messages_text, detailed)
+        cached = self.summary_cache.get(cache_key)
+        if cached is not None:
+            return SystemMessage(content=f"先前对话的备忘录: {cached['memo']}"), cached['raw']
         if not detailed:
             prompt = recent_history_manager_prompt % messages_text
         else:
             prompt = detailed_recent_history_manager_prompt % messages_text
 
+        usage = [0, 0]  # 本次总结的LLM调用次数与token数，命中缓存时计入节省
         retries = 0
         while retries < 3:
             try:
                 # 尝试将响应内容解析为JSON
-                response_content = self.llm.invoke(prompt).content
+                response_content = self._invoke(prompt, usage)
                 if response_content.startswith("```"):
                     response_content = response_content.replace('```json','').replace('```', '')
                 summary_json = json.loads(response_content)
@@ -70,9 +183,10 @@ class CompressedRecentHistoryManager:
                     print(f"💗摘要结果：{summary_json['对话摘要']}")
                     summary = summary_json['对话摘要']
                     if len(summary) > 500:
-                        summary = self.further_compress(summary)
+                        summary = self.further_compress(summary, usage)
                         if summary is None:
                             continue
+                    self.summary_cache.put(cache_key, summary, summary_json['对话摘要'], usage[0], usage[1])
                     return SystemMessage(content=f"先前对话的备忘录: {summary}"), summary_json['对话摘要']
                 else:
                     print('💥 摘要failed: ', response_content)
@@ -84,12 +198,12 @@ class CompressedRecentHistoryManager:
         # 如果所有重试都失败，返回None
         return SystemMessage(content=f"先前对话的备忘录: 无。"), ""
 
-    def further_compress(self, initial_summary):
+    def further_compress(self, initial_summary, usage=None):
         retries = 0
         while retries < 3:
             try:
                 # 尝试将响应内容解析为JSON
-                response_content = self.llm.invoke(further_summarize_prompt % initial_summary).content
+                response_content = self._invoke(further_summarize_prompt % initial_summary, usage)
                 if response_content.startswith("```"):
                     response_content = response_content.replace('```json', '').replace('```', '')
                 summary_json = json.loads(response_content)
@@ -105,14 +219,31 @@ class CompressedRecentHistoryManager:
                 retries += 1
         return None
 
+    def _invoke(self, prompt, usage=None):
+        response = self.llm.invoke(prompt)
+        tokens = (getattr(response, 'usage_metadata', None) or {}).get('total_tokens', 0)
+        self.summary_cache.record_llm_call(tokens)
+        if usage is not None:
+            usage[0] += 1
+            usage[1] += tokens
+        return response.content
+
+    def version(self, lanlan_name):
+        """当前近期记忆的版本号；文件被外部修改过时先重新加载。"""
+        with self._lock:
+            self._refresh(lanlan_name)
+            return self.generation[lanlan_name]
+
     def get_recent_history(self, lanlan_name):
-        if os.path.exists(self.log_file_path[lanlan_name]):
-            with open(self.log_file_path[lanlan_name], encoding='utf-8') as f:
-                self.user_histories[lanlan_name] = messages_from_dict(json.load(f))
-        return self.user_histories[lanlan_name]
+        with self._lock:
+            self._refresh(lanlan_name)
+            return list(self.user_histories[lanlan_name])
 
     def clear_history(self, lanlan_name):
         """
         清除用户的聊天历史
         """
-        self.user_histories[lanlan_name] = []
+        with self._lock:
+            self.user_histories[lanlan_name] = []
+            self.generation[lanlan_name] += 1
+            self._append_journal(lanlan_name, [{'clear': True}])
@@ -1,4 +1,5 @@
 import json
+import os
 from langchain_openai import ChatOpenAI
 from config import OPENROUTER_API_KEY, SETTING_PROPOSER_MODEL, SETTING_VERIFIER_MODEL, OPENROUTER_URL, SETTING_STORE, MASTER_NAME, NAME_MAPPING, lanlan_basic_config, master_basic_config
 from config.prompts_sys import settings_extractor_prompt, settings_verifier_prompt
@@ -10,19 +11,36 @@ class ImportantSettingsManager:
         self.proposer = ChatOpenAI(model=SETTING_PROPOSER_MODEL, base_url=OPENROUTER_URL, api_key=OPENROUTER_API_KEY, temperature=0.5)
         self.verifier = ChatOpenAI(model=SETTING_VERIFIER_MODEL, base_url=OPENROUTER_URL, api_key=OPENROUTER_API_KEY, temperature=0.5)
         self.settings = {}
+        self.generation = {}  # 每个角色的设定版本号，设定发生变化时加一
+        self._file_state = {}
         self.load_settings()
 
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
     def load_settings(self):
         for i in self.settings_file:
+            state = self._stat(self.settings_file[i])
+            if i in self.settings and state == self._file_state.get(i):
+                continue  # 文件没有变化，不必重新解析
             try:
                 with open(self.settings_file[i], 'r', encoding='utf-8') as f:
                     self.settings[i] = json.load(f)
             except (FileNotFoundError, json.JSONDecodeError):
                 self.settings[i] = {i: lanlan_basic_config[i], MASTER_NAME: master_basic_config}
+            self._file_state[i] = state
+            self.generation[i] = self.generation.get(i, 0) + 1
 
     def save_settings(self, lanlan_name):
         with open(self.settings_file[lanlan_name], 'w', encoding='utf-8') as f:
             json.dump(self.settings[lanlan_name], f, indent=2, ensure_ascii=False)
+        self._file_state[lanlan_name] = self._stat(self.settings_file[lanlan_name])
+        self.generation[lanlan_name] += 1
 
     def detect_and_resolve_contradictions(self, old_settings, new_settings, lanlan_name):
         # 使用LLM检测矛盾并解决它们
@@ -80,6 +98,11 @@ class ImportantSettingsManager:
             self.settings[lanlan_name] = self.detect_and_resolve_contradictions(self.settings[lanlan_name], new_settings, lanlan_name)
             self.save_settings(lanlan_name)
 
+    def version(self, lanlan_name):
+        """当前设定的版本号；设定文件被外部修改过时先重新加载。"""
+        self.load_settings()
+        return self.generation[lanlan_name]
+
     def get_settings(self, lanlan_name):
         self.load_settings()
         self.settings[lanlan_name][lanlan_name].update(lanlan_basic_config[lanlan_name])
@@ -0,0 +1,82 @@
+"""
+对话摘要缓存。同一段对话会被近期记忆、时间索引记忆和语义记忆分别调用compress_history总结，
+记忆任务重放、发件箱重发时还会再总结一遍；这里按 (消息文本, detailed) 的内容哈希缓存摘要结果，
+相同的输入只调用一次LLM。
+缓存保存在一个JSON文件中（按最近使用顺序），条目数超过max_entries时淘汰最久未使用的。
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class SummaryCache:
+    def __init__(self, path: str = None, max_entries: int = 512):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> {"memo": 备忘录正文, "raw": 原始对话摘要, "tokens": 生成时消耗的token数}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.llm_calls = 0
+        self.llm_calls_saved = 0
+        self.tokens_used = 0
+        self.tokens_saved = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self._entries.update(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"💥 摘要缓存读取失败，将重新建立: {e}")
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def key(messages_text: str, detailed: bool) -> str:
+        return hashlib.sha1(f"{int(bool(detailed))}|{messages_text}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.llm_calls_saved += entry.get("calls", 1)
+            self.tokens_saved += entry.get("tokens", 0)
+            return entry
+
+    def put(self, key: str, memo: str, raw: str, calls: int, tokens: int):
+        with self._lock:
+            self._entries[key] = {"memo": memo, "raw": raw, "calls": calls, "tokens": tokens}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self.path:
+                self._save()
+
+    def record_llm_call(self, tokens: int):
+        with self._lock:
+            self.llm_calls += 1
+            self.tokens_used += tokens
+
+    def _save(self):
+        # 调用方持有self._lock
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"💥 摘要缓存写入失败: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "llm_calls": self.llm_calls, "llm_calls_saved": self.llm_calls_saved,
+                    "tokens_used": self.tokens_used, "tokens_saved": self.tokens_saved}
@@ -1,16 +1,79 @@
 from langchain_community.chat_message_histories import SQLChatMessageHistory
-from langchain_core.messages import SystemMessage
-from sqlalchemy import create_engine, text
+from langchain_core.messages import SystemMessage, message_to_dict
+from sqlalchemy import create_engine, event, text
 from config import TIME_ORIGINAL_TABLE_NAME, TIME_COMPRESSED_TABLE_NAME, TIME_STORE
 from datetime import datetime
+import json
+import re
+import threading
+
+# 每个连接建立时设置。WAL模式下读写互不阻塞，提交只需追加WAL文件；synchronous=NORMAL时只在检查点fsync，
+# 断电最多丢失最后几次提交，不会损坏数据库
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,  # 页缓存16MB（负数的单位为KiB）
+    "temp_store": "MEMORY",
+}
+
+
+# 原始对话的全文索引。FTS5的unicode61分词器会把一串连续的汉字当成一个词，这里在写入前把每段中日韩文字展开成
+# 单字+相邻二字词（"咖喱饭" -> "咖 喱 饭 咖喱 喱饭"）；查询时单字查单字，多字的关键词按相邻二字词组成短语匹配。
+# 索引为contentless，只保存倒排表，rowid即原始表的id
+TIME_FTS_TABLE_NAME = f"{TIME_ORIGINAL_TABLE_NAME}_fts"
+FTS_SYNC_BATCH = 10000
+FTS_RANK_CANDIDATES = 500  # 只对最近的这么多条命中计算BM25，常见词的命中有几十万条时查询仍在毫秒级
+_CJK_RUN = re.compile(r'([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+)')
+
+
+def _cjk_tokens(run, index):
+    bigrams = [run[i:i + 2] for i in range(len(run) - 1)]
+    if index:
+        return list(run) + bigrams
+    return bigrams or [run]
+
+
+def _fts_text(message_dict):
+    """从message_to_dict格式（即SQLChatMessageHistory的message列）的消息中取出文本，展开其中的中日韩文字。"""
+    content = message_dict.get("data", {}).get("content", "")
+    if not isinstance(content, str):
+        content = "\n".join(part.get("text", "") for part in content
+                            if isinstance(part, dict) and part.get("type") == "text")
+    return " ".join(" ".join(_cjk_tokens(part, True)) if i % 2 else part
+                    for i, part in enumerate(_CJK_RUN.split(content)))
+
+
+def _fts_query(keywords):
+    """
+    空格分隔的关键词 -> FTS5查询。每个关键词中的中日韩文字与其他文字各自作为一个短语（加引号转义，不会被解析成FTS语法），
+    短语之间为AND。
+    """
+    phrases = []
+    for keyword in keywords.split():
+        for i, part in enumerate(_CJK_RUN.split(keyword)):
+            tokens = _cjk_tokens(part, False) if i % 2 else part.split()
+            if tokens:
+                phrases.append('"' + " ".join(tokens).replace('"', '""') + '"')
+    return " ".join(phrases)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
 
 class TimeIndexedMemory:
     def __init__(self, recent_history_manager):
         self.engine = {}
         self.recent_history_manager = recent_history_manager
+        self._fts_lock = threading.Lock()  # 全文索引按rowid追赶原始表，同一时间只能有一个连接在追
         for i in TIME_STORE:
             self.engine[i] = create_engine(f"sqlite:///{TIME_STORE[i]}")
+            event.listen(self.engine[i], "connect", _set_sqlite_pragmas)
 
+            # 建表沿用SQLChatMessageHistory的格式（id, session_id, message），已有的数据库无需转换
             _ = SQLChatMessageHistory(
                 connection=self.engine[i],
                 session_id="",
@@ -23,6 +86,8 @@ class TimeIndexedMemory:
                 table_name=TIME_COMPRESSED_TABLE_NAME,
             )
             self.check_table_schema(i)
+            self.create_indexes(i)
+            self.create_fts_table(i)
 
     def add_timestamp_column(self, lanlan_name):
         with self.engine[lanlan_name].connect() as conn:
@@ -39,35 +104,85 @@ class TimeIndexedMemory:
                     return
             self.add_timestamp_column(lanlan_name)
 
-    def store_conversation(self, event_id, messages, lanlan_name, timestamp=None):
-        if timestamp is None:
-            timestamp = datetime.now()
+    def create_indexes(self, lanlan_name):
+        # 旧数据库第一次启动时建立索引，之后按session_id与时间范围的查询不再全表扫描
+        with self.engine[lanlan_name].connect() as conn:
+            for table_name in (TIME_ORIGINAL_TABLE_NAME, TIME_COMPRESSED_TABLE_NAME):
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_session_id ON {table_name} (session_id)"))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_timestamp ON {table_name} (timestamp)"))
+            conn.commit()
 
-        origin_history = SQLChatMessageHistory(
-            connection=self.engine[lanlan_name],
-            session_id=event_id,
-            table_name=TIME_ORIGINAL_TABLE_NAME,
-        )
+    def create_fts_table(self, lanlan_name):
+        with self.engine[lanlan_name].connect() as conn:
+            conn.execute(text(f"CREATE VIRTUAL TABLE IF NOT EXISTS {TIME_FTS_TABLE_NAME} USING fts5(text, content='')"))
+            conn.commit()
+        indexed = self.sync_fts(lanlan_name)
+        if indexed:
+            print(f"💗 {lanlan_name}的全文索引补充了{indexed}条消息")
 
-        compressed_history = SQLChatMessageHistory(
-            connection=self.engine[lanlan_name],
-            session_id=event_id,
-            table_name=TIME_COMPRESSED_TABLE_NAME,
-        )
+    def sync_fts(self, lanlan_name):
+        """把全文索引中还没有的原始消息（升级前的数据、其他程序写入的数据）补进索引，返回补充的条数。"""
+        with self._fts_lock, self.engine[lanlan_name].begin() as conn:
+            return self._sync_fts(conn)
 
-        origin_history.add_messages(messages)
-        compressed_history.add_message(SystemMessage(self.recent_history_manager.compress_history(messages, lanlan_name)[1]))
+    @staticmethod
+    def _sync_fts(conn):
+        # 调用方持有self._fts_lock。原始表只追加，id递增，索引中最大的rowid之后的就是还没索引的消息
+        last_id = conn.execute(text(f"SELECT rowid FROM {TIME_FTS_TABLE_NAME} ORDER BY rowid DESC LIMIT 1")).scalar() or 0
+        indexed = 0
+        while True:
+            rows = conn.execute(
+                text(f"SELECT id, message FROM {TIME_ORIGINAL_TABLE_NAME} WHERE id > :last_id ORDER BY id LIMIT {FTS_SYNC_BATCH}"),
+                {"last_id": last_id}
+            ).fetchall()
+            if not rows:
+                return indexed
+            conn.execute(text(f"INSERT INTO {TIME_FTS_TABLE_NAME} (rowid, text) VALUES (:id, :text)"),
+                         [{"id": row[0], "text": _fts_text(json.loads(row[1]))} for row in rows])
+            last_id = rows[-1][0]
+            indexed += len(rows)
 
-        with self.engine[lanlan_name].connect() as conn:
-            conn.execute(
-                text(f"UPDATE {TIME_ORIGINAL_TABLE_NAME} SET timestamp = :timestamp WHERE session_id = :session_id"),
-                {"timestamp": timestamp, "session_id": event_id}
-            )
-            conn.execute(
-                text(f"UPDATE {TIME_COMPRESSED_TABLE_NAME} SET timestamp = :timestamp WHERE session_id = :session_id"),
-                {"timestamp": timestamp, "session_id": event_id}
-            )
-            conn.commit()
+    def write_conversations(self, lanlan_name, conversations):
+        """
+        批量写入已经总结好的对话，conversations为 [(event_id, messages, summary, timestamp)]。
+        所有对话的原始消息、摘要和全文索引各用一次executemany，在同一个事务中写入；
+        message列与SQLChatMessageHistory写入的格式相同（json.dumps(message_to_dict(message))）。
+        """
+        originals, summaries, fts_rows = [], [], []
+        with self._fts_lock, self.engine[lanlan_name].begin() as conn:
+            # 先补上其他程序写入、还没进全文索引的消息，再由这里分配id，新消息的索引直接由内存中的文本生成
+            self._sync_fts(conn)
+            next_id = (conn.exec_driver_sql(f"SELECT max(id) FROM {TIME_ORIGINAL_TABLE_NAME}").scalar() or 0) + 1
+            for event_id, messages, summary, timestamp in conversations:
+                timestamp = str(timestamp)  # 与sqlite3写入datetime的格式相同
+                for message in messages:
+                    message_dict = message_to_dict(message)
+                    originals.append((next_id, event_id, json.dumps(message_dict), timestamp))
+                    fts_rows.append((next_id, _fts_text(message_dict)))
+                    next_id += 1
+                summaries.append((event_id, json.dumps(message_to_dict(SystemMessage(summary))), timestamp))
+            if originals:
+                conn.exec_driver_sql(
+                    f"INSERT INTO {TIME_ORIGINAL_TABLE_NAME} (id, session_id, message, timestamp) VALUES (?, ?, ?, ?)", originals)
+                conn.exec_driver_sql(f"INSERT INTO {TIME_FTS_TABLE_NAME} (rowid, text) VALUES (?, ?)", fts_rows)
+            if summaries:
+                conn.exec_driver_sql(
+                    f"INSERT INTO {TIME_COMPRESSED_TABLE_NAME} (session_id, message, timestamp) VALUES (?, ?, ?)", summaries)
+        return len(originals)
+
+    def store_conversations(self, conversations, lanlan_name):
+        """
+        总结并写入多段对话（例如导入旧的聊天记录），conversations为 [(event_id, messages, timestamp)]，timestamp为None时取当前时间。
+        先完成全部耗时的LLM总结，再一次性写入。
+        """
+        records = []
+        for event_id, messages, timestamp in conversations:
+            summary = self.recent_history_manager.compress_history(messages, lanlan_name)[1]
+            records.append((event_id, messages, summary, timestamp if timestamp is not None else datetime.now()))
+        return self.write_conversations(lanlan_name, records)
+
+    def store_conversation(self, event_id, messages, lanlan_name, timestamp=None):
+        self.store_conversations([(event_id, messages, timestamp)], lanlan_name)
 
     def retrieve_summary_by_timeframe(self, lanlan_name, start_time, end_time):
         with self.engine[lanlan_name].connect() as conn:
@@ -84,4 +199,43 @@ class TimeIndexedMemory:
                 text(f"SELECT session_id, message FROM {TIME_ORIGINAL_TABLE_NAME} WHERE timestamp BETWEEN :start_time AND :end_time"),
                 {"start_time": start_time, "end_time": end_time}
             )
-            return result.fetchall()
\ No newline at end of file
+            return result.fetchall()
+
+    def search_keyword(self, lanlan_name, keywords, start_time=None, end_time=None, limit=10):
+        """
+        按关键词检索原始对话（空格分隔的多个关键词需同时出现），可以限定时间范围。
+        在最近的max(FTS_RANK_CANDIDATES, limit)条命中中按BM25相关度排序，返回 [(session_id, message, timestamp, score)]，score越小越相关。
+        """
+        query = _fts_query(keywords)
+        if not query:
+            return []
+        self.sync_fts(lanlan_name)
+        params = {"query": query, "candidates": max(FTS_RANK_CANDIDATES, limit), "limit": limit}
+        time_filter, rowid_filter = "", ""
+        with self.engine[lanlan_name].connect() as conn:
+            if start_time is not None or end_time is not None:
+                # 先用timestamp索引把时间范围换算成id范围，全文索引按rowid范围取候选，外层再判断确切的时间
+                conditions = []
+                if start_time is not None:
+                    conditions.append("timestamp >= :start_time")
+                    params["start_time"] = start_time
+                if end_time is not None:
+                    conditions.append("timestamp <= :end_time")
+                    params["end_time"] = end_time
+                time_filter = " AND " + " AND ".join(f"o.{c}" for c in conditions)
+                params["min_id"], params["max_id"] = conn.execute(
+                    text(f"SELECT min(id), max(id) FROM {TIME_ORIGINAL_TABLE_NAME} WHERE {' AND '.join(conditions)}"),
+                    params
+                ).one()
+                if params["min_id"] is None:
+                    return []
+                rowid_filter = " AND rowid BETWEEN :min_id AND :max_id"
+            result = conn.execute(
+                text(f"SELECT o.session_id, o.message, o.timestamp, f.score FROM "
+                     f"(SELECT rowid, bm25({TIME_FTS_TABLE_NAME}) AS score FROM {TIME_FTS_TABLE_NAME} "
+                     f"WHERE {TIME_FTS_TABLE_NAME} MATCH :query{rowid_filter} ORDER BY rowid DESC LIMIT :candidates) f "
+                     f"JOIN {TIME_ORIGINAL_TABLE_NAME} o ON o.id = f.rowid{time_filter} "
+                     f"ORDER BY f.score LIMIT :limit"),
+                params
+            )
+            return result.fetchall()
@@ -1,16 +1,23 @@
-from memory import CompressedRecentHistoryManager, SemanticMemory, ImportantSettingsManager, TimeIndexedMemory
-from fastapi import FastAPI
+from memory import CompressedRecentHistoryManager, SemanticMemory, ImportantSettingsManager, TimeIndexedMemory, MemoryJobQueue
+from fastapi import FastAPI, Header, Response
+import hashlib
 import json
 import uvicorn
-from langchain_core.messages import convert_to_messages
+from langchain_core.messages import convert_to_messages, messages_from_dict
+from datetime import datetime
 from uuid import uuid4
 from config import MASTER_NAME, MEMORY_SERVER_PORT
 from pydantic import BaseModel
+from typing import Optional
 from config import NAME_MAPPING
 import re
 
+JOB_JOURNAL = 'memory/store/memory_jobs.jsonl'  # 总结任务日志，重启后重新执行其中未完成的任务
+SUMMARY_WORKERS = 2  # 同时执行总结的最大角色数
+
 class HistoryRequest(BaseModel):
     input_history: str
+    request_id: Optional[str] = None  # 发件箱中每条记录的id，重发时据此去重
 
 app = FastAPI()
 
@@ -21,36 +28,58 @@ settings_manager = ImportantSettingsManager()
 time_manager = TimeIndexedMemory(recent_history_manager)
 
 
-@app.post("/process/{lanlan_name}")
-def process_conversation(request: HistoryRequest, lanlan_name: str):
+def _summarize(lanlan_name, input_history, detailed=False):
+    uid = str(uuid4())
+    messages = convert_to_messages(json.loads(input_history))
+    recent_history_manager.update_history(messages, lanlan_name, detailed=detailed)
+    """
+    下面屏蔽了两个模块，因为这两个模块需要消耗token，但当前版本实用性近乎于0。尤其是，Qwen与GPT等旗舰模型相比性能差距过大。
+    """
+    # settings_manager.extract_and_update_settings(messages, lanlan_name)
+    # semantic_manager.store_conversation(uid, messages, lanlan_name)
+    time_manager.store_conversation(uid, messages, lanlan_name)
+
+
+# 总结要调用LLM，耗时数秒；请求只登记任务，由后台线程池执行
+job_queue = MemoryJobQueue(JOB_JOURNAL, {
+    'process': _summarize,
+    'renew': lambda lanlan_name, input_history: _summarize(lanlan_name, input_history, detailed=True),
+}, max_workers=SUMMARY_WORKERS)
+
+
+def _enqueue(kind, request: HistoryRequest, lanlan_name: str):
     try:
-        uid = str(uuid4())
-        input_history = convert_to_messages(json.loads(request.input_history))
-        recent_history_manager.update_history(input_history, lanlan_name)
-        """
-        下面屏蔽了两个模块，因为这两个模块需要消耗token，但当前版本实用性近乎于0。尤其是，Qwen与GPT等旗舰模型相比性能差距过大。
-        """
-        # settings_manager.extract_and_update_settings(input_history, lanlan_name)
-        # semantic_manager.store_conversation(uid, input_history, lanlan_name)
-        time_manager.store_conversation(uid, input_history, lanlan_name)
-        return {"status": "processed"}
+        convert_to_messages(json.loads(request.input_history))  # 格式有误的请求直接拒绝，不进入队列
+        job = job_queue.submit(kind, lanlan_name, request.input_history, request.request_id)
+        return {"status": "queued", "job_id": job["id"], "job_status": job["status"]}
     except Exception as e:
         import traceback
         traceback.print_exc()
         return {"status": "error", "message": str(e)}
 
+
+@app.post("/process/{lanlan_name}")
+def process_conversation(request: HistoryRequest, lanlan_name: str):
+    return _enqueue('process', request, lanlan_name)
+
 @app.post("/renew/{lanlan_name}")
 def process_conversation_for_renew(request: HistoryRequest, lanlan_name: str):
-    try:
-        uid = str(uuid4())
-        input_history = convert_to_messages(json.loads(request.input_history))
-        recent_history_manager.update_history(input_history, lanlan_name, detailed=True)
-        # settings_manager.extract_and_update_settings(input_history, lanlan_name)
-        # semantic_manager.store_conversation(uid, input_history, lanlan_name)
-        time_manager.store_conversation(uid, input_history, lanlan_name)
-        return {"status": "processed"}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    return _enqueue('renew', request, lanlan_name)
+
+@app.get("/jobs")
+def list_jobs(lanlan_name: str = None):
+    return {"pending": job_queue.pending(lanlan_name), "jobs": job_queue.list(lanlan_name)}
+
+@app.get("/summary_cache")
+def get_summary_cache_stats():
+    return recent_history_manager.summary_cache.stats()
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        return {"status": "error", "message": "job not found"}
+    return job
 
 @app.get("/get_recent_history/{lanlan_name}")
 def get_recent_history(lanlan_name: str):
@@ -69,14 +98,40 @@ def get_recent_history(lanlan_name: str):
 def get_memory(query: str, lanlan_name:str):
     return semantic_manager.query(query, lanlan_name)
 
+@app.get("/search_keyword/{lanlan_name}")
+def search_keyword(lanlan_name: str, q: str, start_time: str = None, end_time: str = None, limit: int = 10):
+    """
+    离线的关键词回忆：在时间索引记忆的原始对话中全文检索（空格分隔的关键词需同时出现），按BM25相关度排序。
+    start_time / end_time为ISO格式的时间，例如 2024-05-01 或 2024-05-01 20:00，可以只给一个。
+    """
+    try:
+        start = datetime.fromisoformat(start_time) if start_time else None
+        end = datetime.fromisoformat(end_time) if end_time else None
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    name_mapping = NAME_MAPPING.copy()
+    name_mapping['ai'] = lanlan_name
+    results = []
+    for session_id, message, timestamp, score in time_manager.search_keyword(lanlan_name, q, start, end, limit):
+        message = messages_from_dict([json.loads(message)])[0]
+        if type(message.content) == str:
+            content = message.content
+        else:
+            content = '\n'.join([j['text'] for j in message.content if j['type'] == 'text'])
+        results.append({"session_id": session_id, "timestamp": timestamp, "role": name_mapping.get(message.type, message.type),
+                        "text": content, "score": score})
+    return results
+
 @app.get("/get_settings/{lanlan_name}")
 def get_settings(lanlan_name: str):
     result = f"{lanlan_name}记得{json.dumps(settings_manager.get_settings(lanlan_name), ensure_ascii=False)}"
     return result
 
-@app.get("/new_dialog/{lanlan_name}")
-def new_dialog(lanlan_name: str):
-    m1 = re.compile('$$.*?$$')
+_new_dialog_marker = re.compile('$$.*?$$')
+_new_dialog_cache = {}  # lanlan_name -> ((设定版本, 近期记忆版本), ETag, 响应体)
+
+
+def _render_new_dialog(lanlan_name):
     name_mapping = NAME_MAPPING.copy()
     name_mapping['ai'] = lanlan_name
     result = f"\n========{lanlan_name}的内心活动========\n{lanlan_name}的脑海里经常想着自己和{MASTER_NAME}的事情，她记得{json.dumps(settings_manager.get_settings(lanlan_name), ensure_ascii=False)}\n\n"
@@ -85,8 +140,25 @@ def new_dialog(lanlan_name: str):
         if type(i.content) == str:
             result += f"{name_mapping[i.type]} | {i.content}\n"
         else:
-            result += f"{name_mapping[i.type]} | {'\n'.join([m1.sub(j['text'], '') for j in i.content if j['type'] == 'text'])}\n"
+            result += f"{name_mapping[i.type]} | {'\n'.join([_new_dialog_marker.sub(j['text'], '') for j in i.content if j['type'] == 'text'])}\n"
     return result
 
+
+@app.get("/new_dialog/{lanlan_name}")
+def new_dialog(lanlan_name: str, if_none_match: str = Header(None)):
+    """
+    新对话开始时的记忆prompt。渲染结果按角色缓存，设定或近期记忆的版本号变化时才重新渲染；
+    响应带有ETag，请求的If-None-Match与之相同时返回304，调用方继续使用本地的副本。
+    """
+    version = (settings_manager.version(lanlan_name), recent_history_manager.version(lanlan_name))
+    cached = _new_dialog_cache.get(lanlan_name)
+    if cached is None or cached[0] != version:
+        body = json.dumps(_render_new_dialog(lanlan_name), ensure_ascii=False).encode('utf-8')
+        cached = (version, f'"{hashlib.sha1(body).hexdigest()[:20]}"', body)
+        _new_dialog_cache[lanlan_name] = cached
+    if if_none_match == cached[1]:
+        return Response(status_code=304, headers={"ETag": cached[1]})
+    return Response(content=cached[2], media_type="application/json", headers={"ETag": cached[1]})
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=MEMORY_SERVER_PORT)
\ No newline at end of file
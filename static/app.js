@@ -447,11 +447,12 @@ function init_app(){
                 const audioData = event.data;
 
                 if (isRecording && socket.readyState === WebSocket.OPEN) {
-                    socket.send(JSON.stringify({
-                        action: 'stream_data',
-                        data: Array.from(audioData),
-                        input_type: 'audio'
-                    }));
+                    // 二进制帧：2字节头(action=1 stream_data, input_type=1 audio) + 小端int16 PCM
+                    const frame = new Uint8Array(2 + audioData.byteLength);
+                    frame[0] = 1;
+                    frame[1] = 1;
+                    frame.set(new Uint8Array(audioData.buffer, audioData.byteOffset, audioData.byteLength), 2);
+                    socket.send(frame.buffer);
                 }
             };
 
@@ -0,0 +1,61 @@
+"""
+对比麦克风音频上传的两条路径在服务器端的CPU开销：
+1. JSON整数数组：json.loads -> struct.pack -> OmniRealtimeClient.stream_audio
+2. 二进制帧：parse_binary_frame -> OmniRealtimeClient.stream_audio（memoryview，无拷贝）
+输出为每秒音频消耗的CPU毫秒数。用法：python tools/bench_audio_ingest.py [音频秒数]
+"""
+import asyncio
+import json
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from main_helper.omni_realtime_client import OmniRealtimeClient
+from main_helper.ws_protocol import encode_binary_frame, parse_binary_frame
+
+SAMPLE_RATE = 16000
+CHUNK_SAMPLES = 512  # 与audio-processor.js一致，约32ms
+
+
+class _NullWebSocket:
+    async def send(self, data):
+        pass
+
+
+async def _run_json(client, frames):
+    for text in frames:
+        message = json.loads(text)
+        data = message["data"]
+        await client.stream_audio(struct.pack(f'<{len(data)}h', *data))
+
+
+async def _run_binary(client, frames):
+    for frame in frames:
+        _, _, payload = parse_binary_frame(frame)
+        await client.stream_audio(payload)
+
+
+def main(seconds=60):
+    n_chunks = seconds * SAMPLE_RATE // CHUNK_SAMPLES
+    rng = np.random.default_rng(0)
+    chunks = [rng.integers(-32768, 32767, CHUNK_SAMPLES, dtype=np.int16) for _ in range(n_chunks)]
+    json_frames = [json.dumps({"action": "stream_data", "data": c.tolist(), "input_type": "audio"}) for c in chunks]
+    binary_frames = [encode_binary_frame("stream_data", "audio", c.astype('<i2').tobytes()) for c in chunks]
+
+    client = OmniRealtimeClient(base_url="", api_key="")
+    client.ws = _NullWebSocket()
+    audio_seconds = n_chunks * CHUNK_SAMPLES / SAMPLE_RATE
+
+    for name, runner, frames in [("json", _run_json, json_frames), ("binary", _run_binary, binary_frames)]:
+        start = time.process_time()
+        asyncio.run(runner(client, frames))
+        cpu = time.process_time() - start
+        print(f"{name:>6}: {cpu * 1000 / audio_seconds:8.3f} ms CPU / s audio  ({n_chunks} chunks)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 60)
@@ -0,0 +1,57 @@
+"""
+OmniRealtimeClient上行音频合并窗口的基准测试。
+按不同的audio_send_window_ms发送相同的麦克风音频（512采样/chunk），统计每秒音频产生的websocket帧数与CPU耗时。
+用法：python tools/bench_audio_send.py [音频秒数]
+"""
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from main_helper.omni_realtime_client import OmniRealtimeClient
+
+SAMPLE_RATE = 16000
+CHUNK_SAMPLES = 512
+WINDOWS_MS = [0, 32, 64, 100, 200]
+
+
+class _CountingWebSocket:
+    def __init__(self):
+        self.frames = 0
+
+    async def send(self, data):
+        self.frames += 1
+
+
+async def _run(window_ms, chunks):
+    client = OmniRealtimeClient(base_url="", api_key="", audio_send_window_ms=window_ms)
+    ws = client.ws = _CountingWebSocket()
+    for c in chunks:
+        await client.stream_audio(c)
+    await client.flush_audio()
+    return ws.frames
+
+
+def main(seconds=60):
+    n_chunks = seconds * SAMPLE_RATE // CHUNK_SAMPLES
+    rng = np.random.default_rng(0)
+    chunks = [rng.integers(-32768, 32767, CHUNK_SAMPLES, dtype=np.int16).tobytes() for _ in range(n_chunks)]
+    audio_seconds = n_chunks * CHUNK_SAMPLES / SAMPLE_RATE
+
+    for window_ms in WINDOWS_MS:
+        start = time.process_time()
+        frames = asyncio.run(_run(window_ms, chunks))
+        cpu = time.process_time() - start
+        print(f"window {window_ms:>3}ms: {frames / audio_seconds:6.1f} frames / s audio, "
+              f"{cpu * 1000 / audio_seconds:7.3f} ms CPU / s audio")
+
+    client = OmniRealtimeClient(base_url="", api_key="")
+    ids = [client.next_event_id() for _ in range(100000)]
+    assert len(set(ids)) == len(ids), "event_id collision"
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 60)
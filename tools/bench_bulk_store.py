@@ -0,0 +1,108 @@
+"""
+时间索引记忆写入路径的吞吐基准（rows/s，每段对话messages条原始消息+1条摘要）。三种写法各用一个新的临时数据库：
+    legacy：改动前的写法（两个SQLChatMessageHistory逐条ORM写入，再用两条UPDATE补时间戳；旧表结构，没有索引）；
+    per-call：TimeIndexedMemory.store_conversation，每段对话一个事务；
+    bulk：TimeIndexedMemory.store_conversations，每次batch段对话，一次executemany、一个事务。
+总结用的LLM调用被替换为直接返回固定摘要，只测数据库写入。
+自检：legacy写入的数据库由TimeIndexedMemory打开后补建全文索引、继续批量写入，两种来源的数据都能用SQLChatMessageHistory
+原样读回、按时间范围和关键词查到。
+memory模块需要Python 3.12，需要config/api.py存在。
+用法：python tools/bench_bulk_store.py [--conversations 2000] [--legacy-conversations 300] [--batch 500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from tools.bench_timeindex import FakeRecentHistoryManager, legacy_store_conversation
+
+
+def make_conversation(i, n, origin):
+    from langchain_core.messages import HumanMessage, AIMessage
+    messages = [(HumanMessage if j % 2 == 0 else AIMessage)(content=[{"type": "text", "text": f"conv{i} 第{j}句：周末去海边看日落吧。"}])
+                for j in range(n)]
+    return f"event{i}", messages, origin + timedelta(minutes=i)
+
+
+def rate(conversations, messages, seconds):
+    return conversations * (messages + 1) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TimeIndexedMemory bulk write benchmark")
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--legacy-conversations", type=int, default=300)
+    parser.add_argument("--messages", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    import config
+    config.OPENROUTER_API_KEY = "bench"
+    import memory.timeindex as timeindex
+    from langchain_community.chat_message_histories import SQLChatMessageHistory
+    from sqlalchemy import create_engine, text
+
+    name = config.her_name
+    origin = datetime(2024, 1, 1)
+    summary = FakeRecentHistoryManager().compress_history([], name)[1]
+    conversations = [make_conversation(i, args.messages, origin) for i in range(args.conversations)]
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        # legacy：改动前的表结构与写法
+        legacy_path = os.path.join(workdir, "legacy.db")
+        engine = create_engine(f"sqlite:///{legacy_path}")
+        for table_name in (config.TIME_ORIGINAL_TABLE_NAME, config.TIME_COMPRESSED_TABLE_NAME):
+            SQLChatMessageHistory(connection=engine, session_id="", table_name=table_name)
+            with engine.connect() as conn:
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN timestamp DATETIME"))
+                conn.commit()
+        start = time.perf_counter()
+        for event_id, messages, timestamp in conversations[:args.legacy_conversations]:
+            legacy_store_conversation(engine, event_id, messages, summary, timestamp)
+        results["legacy"] = rate(args.legacy_conversations, args.messages, time.perf_counter() - start)
+        engine.dispose()
+
+        for label in ("per-call", "bulk"):
+            timeindex.TIME_STORE = {name: os.path.join(workdir, f"{label}.db")}
+            memory = timeindex.TimeIndexedMemory(FakeRecentHistoryManager())
+            start = time.perf_counter()
+            if label == "per-call":
+                for event_id, messages, timestamp in conversations:
+                    memory.store_conversation(event_id, messages, name, timestamp)
+            else:
+                for i in range(0, len(conversations), args.batch):
+                    memory.store_conversations(conversations[i:i + args.batch], name)
+            results[label] = rate(args.conversations, args.messages, time.perf_counter() - start)
+            memory.engine[name].dispose()
+
+        # 自检：打开legacy写入的数据库，补建索引后继续批量写入，新旧数据都能读回、查到
+        timeindex.TIME_STORE = {name: legacy_path}
+        memory = timeindex.TimeIndexedMemory(FakeRecentHistoryManager())
+        memory.store_conversations(conversations[args.legacy_conversations:args.legacy_conversations + 10], name)
+        engine = memory.engine[name]
+        for event_id, messages, timestamp in (conversations[0], conversations[args.legacy_conversations]):
+            history = SQLChatMessageHistory(connection=engine, session_id=event_id, table_name=config.TIME_ORIGINAL_TABLE_NAME)
+            assert history.messages == messages, event_id
+            assert len(memory.retrieve_original_by_timeframe(name, timestamp, timestamp)) == args.messages
+            assert len(memory.retrieve_summary_by_timeframe(name, timestamp, timestamp)) == 1
+            hits = memory.search_keyword(name, f"conv{event_id[5:]} 日落", limit=100)
+            assert {row[0] for row in hits} == {event_id} and len(hits) == args.messages, (event_id, hits)
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql(f"SELECT count(*) FROM {config.TIME_ORIGINAL_TABLE_NAME}").scalar()
+            indexed = conn.exec_driver_sql(f"SELECT count(*) FROM {timeindex.TIME_FTS_TABLE_NAME}").scalar()
+        assert rows == indexed == (args.legacy_conversations + 10) * args.messages, (rows, indexed)
+        engine.dispose()
+
+    print(f"{args.messages} messages + 1 summary per conversation")
+    print(f"    legacy: {results['legacy']:>9,.0f} rows/s ({args.legacy_conversations} conversations, one call each)")
+    print(f"  per-call: {results['per-call']:>9,.0f} rows/s ({args.conversations} conversations, one transaction each)")
+    print(f"      bulk: {results['bulk']:>9,.0f} rows/s ({args.conversations} conversations, {args.batch} per transaction)")
+    print("  self-check passed: legacy data stays readable and searchable after bulk writes")
+
+
+if __name__ == "__main__":
+    main()
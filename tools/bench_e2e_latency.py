@@ -0,0 +1,169 @@
+"""
+基于本地模拟Realtime服务器的端到端延迟基准。
+1. 在本进程中启动tools/mock_realtime_server.py中的模拟服务器；
+2. 以子进程方式启动main_server，额外注册N个压测角色，并把CORE_URL指向模拟服务器；
+3. N个模拟浏览器客户端各自连接/ws/bench{i}，按真实节奏(每32ms一个512采样chunk)上传二进制麦克风帧。
+统计两类延迟的p50/p99：
+    mic->upstream：浏览器发出chunk到模拟服务器收到对应input_audio_buffer.append（PCM前8字节编码了客户端id与序号）
+    delta->browser：模拟服务器发出增量到浏览器收到对应消息（文本增量带有"#连接:轮次:序号#"标记，音频增量按顺序对应）
+main_server的工作目录是临时目录，日志与压测角色的发件箱都写在那里，运行结束后删除。
+需要config/api.py存在。用法：python tools/bench_e2e_latency.py [--clients 4] [--seconds 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+import websockets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from main_helper.ws_protocol import encode_binary_frame
+from tools.mock_realtime_server import MockRealtimeServer, MockScript
+
+CHUNK_SAMPLES = 512
+CHUNK_BYTES = CHUNK_SAMPLES * 2
+CHUNK_INTERVAL = CHUNK_SAMPLES / 16000
+TEXT_MARKER = re.compile(r'#(\d+):(\d+):(\d+)#')
+
+_SERVER_BOOTSTRAP = """
+import os, sys
+sys.path.insert(0, {root!r})
+import config
+for i in range({clients}):
+    config.LANLAN_PROMPT[f"bench{{i}}"] = config.lanlan_prompt
+    config.MEMORY_OUTBOX[f"bench{{i}}"] = os.path.join({workdir!r}, f"outbox_bench{{i}}.jsonl")
+import main_helper.core as core
+core.CORE_URL = "{core_url}"
+import uvicorn, main_server
+uvicorn.run(main_server.app, host="127.0.0.1", port={port}, log_level="warning")
+"""
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.chunk_sent = {}                       # (client, seq) -> t
+        self.text_sent = {}                        # (conn, turn, index) -> t
+        self.audio_sent = defaultdict(deque)       # client -> 按发送顺序的t
+        self.upstream = []
+        self.text_down = []
+        self.audio_down = []
+
+    def on_append(self, conn, pcm, t):
+        for offset in range(0, len(pcm) - 7, CHUNK_BYTES):
+            client, seq = struct.unpack_from('<II', pcm, offset)
+            sent = self.chunk_sent.pop((client, seq), None)
+            if sent is not None:
+                conn.tag = client
+                self.upstream.append(t - sent)
+
+    def on_delta(self, conn, kind, turn, index, t):
+        if kind == "text":
+            self.text_sent[(conn.id, turn, index)] = t
+        elif conn.tag is not None:
+            self.audio_sent[conn.tag].append(t)
+
+
+async def _browser_client(i, port, seconds, recorder: LatencyRecorder):
+    rng = np.random.default_rng(i)
+    async with websockets.connect(f"ws://127.0.0.1:{port}/ws/bench{i}", max_size=None) as ws:
+        await ws.send(json.dumps({"action": "start_session", "input_type": "audio"}))
+
+        async def receive():
+            async for message in ws:
+                now = time.perf_counter()
+                if isinstance(message, bytes):
+                    if recorder.audio_sent[i]:
+                        recorder.audio_down.append(now - recorder.audio_sent[i].popleft())
+                    continue
+                data = json.loads(message)
+                if data.get("type") == "gemini_response":
+                    for m in TEXT_MARKER.finditer(data.get("text", "")):
+                        sent = recorder.text_sent.pop(tuple(int(g) for g in m.groups()), None)
+                        if sent is not None:
+                            recorder.text_down.append(now - sent)
+
+        receiver = asyncio.create_task(receive())
+        await asyncio.sleep(1.)  # 等待start_session完成与模拟服务器的连接
+        start = time.perf_counter()
+        for seq in range(int(seconds / CHUNK_INTERVAL)):
+            pcm = bytearray(rng.integers(-3000, 3000, CHUNK_SAMPLES, dtype=np.int16).tobytes())
+            struct.pack_into('<II', pcm, 0, i, seq)
+            recorder.chunk_sent[(i, seq)] = time.perf_counter()
+            await ws.send(encode_binary_frame("stream_data", "audio", bytes(pcm)))
+            await asyncio.sleep(max(0., start + (seq + 1) * CHUNK_INTERVAL - time.perf_counter()))
+        await ws.send(json.dumps({"action": "end_session"}))
+        await asyncio.sleep(0.5)
+        receiver.cancel()
+
+
+def _report(name, samples):
+    if not samples:
+        print(f"{name:>16}: no samples")
+        return
+    ms = np.array(samples) * 1000
+    print(f"{name:>16}: n={len(ms):6d}  p50={np.percentile(ms, 50):7.2f}ms  p99={np.percentile(ms, 99):7.2f}ms")
+
+
+async def _wait_for_port(port, server, timeout=30.):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and server.poll() is None:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise TimeoutError(f"main_server did not start on port {port}")
+
+
+async def run(args):
+    recorder = LatencyRecorder()
+    script = MockScript(deltas=args.deltas, delta_interval_ms=args.delta_interval_ms,
+                        audio_delta_bytes=args.audio_delta_bytes, response_delay_ms=args.response_delay_ms)
+    mock = MockRealtimeServer(script, on_append=recorder.on_append, on_delta=recorder.on_delta)
+    mock_server = await mock.serve("127.0.0.1", args.mock_port)
+
+    # main_server以临时目录为工作目录，日志、发件箱等相对路径的文件都写在那里，结束后一并删除
+    with tempfile.TemporaryDirectory() as workdir:
+        os.symlink(os.path.join(ROOT, "static"), os.path.join(workdir, "static"))
+        bootstrap = _SERVER_BOOTSTRAP.format(root=ROOT, workdir=workdir, clients=args.clients,
+                                             core_url=f"ws://127.0.0.1:{args.mock_port}", port=args.port)
+        server = subprocess.Popen([sys.executable, "-c", bootstrap], cwd=workdir)
+        try:
+            await _wait_for_port(args.port, server)
+            await asyncio.gather(*[_browser_client(i, args.port, args.seconds, recorder) for i in range(args.clients)])
+        finally:
+            server.terminate()
+            server.wait()
+            mock_server.close()
+
+    print(f"{args.clients} clients, {args.seconds}s of audio each")
+    _report("mic->upstream", recorder.upstream)
+    _report("text->browser", recorder.text_down)
+    _report("audio->browser", recorder.audio_down)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark against the mock realtime server")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=20.)
+    parser.add_argument("--port", type=int, default=48990)
+    parser.add_argument("--mock-port", type=int, default=48991)
+    parser.add_argument("--deltas", type=int, default=20)
+    parser.add_argument("--delta-interval-ms", type=int, default=40)
+    parser.add_argument("--audio-delta-bytes", type=int, default=4800)
+    parser.add_argument("--response-delay-ms", type=int, default=300)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
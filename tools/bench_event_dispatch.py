@@ -0,0 +1,85 @@
+"""
+OmniRealtimeClient.handle_messages 的回放基准。
+从事件日志（每行一条服务器原始消息的JSONL）回放所有事件，统计每秒处理的事件数和每个事件的平均处理时间。
+未指定日志时，合成一段包含音频/文本增量、转录、VAD事件的典型日志。
+用法：python tools/bench_event_dispatch.py [events.jsonl] [回放次数]
+"""
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from main_helper.omni_realtime_client import OmniRealtimeClient
+from utils import json_codec
+
+
+def synthesize_log(turns=20, audio_deltas_per_turn=50, delta_bytes=4800):
+    audio_b64 = base64.b64encode(os.urandom(delta_bytes)).decode()
+    events = []
+    for t in range(turns):
+        rid = f"resp_{t}"
+        events.append({"type": "input_audio_buffer.speech_started", "audio_start_ms": t * 1000})
+        events.append({"type": "input_audio_buffer.speech_stopped", "audio_end_ms": t * 1000 + 800})
+        events.append({"type": "conversation.item.input_audio_transcription.completed", "transcript": "你好，今天天气怎么样？"})
+        events.append({"type": "response.created", "response": {"id": rid}})
+        events.append({"type": "response.output_item.added", "item": {"id": f"item_{t}"}})
+        for i in range(audio_deltas_per_turn):
+            events.append({"type": "response.audio_transcript.delta", "response_id": rid, "delta": "今天"})
+            events.append({"type": "response.audio.delta", "response_id": rid, "item_id": f"item_{t}",
+                           "output_index": 0, "content_index": 0, "delta": audio_b64})
+        events.append({"type": "response.audio_transcript.done", "response_id": rid})
+        events.append({"type": "response.done", "response": {"id": rid}})
+    return [json.dumps(e, ensure_ascii=False) for e in events]
+
+
+class _ReplayWebSocket:
+    def __init__(self, messages):
+        self._messages = messages
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for m in self._messages:
+            yield m
+
+
+async def _noop(*args):
+    pass
+
+
+def _make_client(json_loads, fast_path=True):
+    client = OmniRealtimeClient(base_url="", api_key="", on_text_delta=_noop, on_audio_delta=_noop,
+                                on_interrupt=_noop, on_input_transcript=_noop, on_output_transcript=_noop,
+                                on_response_done=_noop, json_loads=json_loads)
+    if not fast_path:
+        client.extract_audio_delta = lambda message: None
+    return client
+
+
+def main(log_path=None, repeat=5):
+    if log_path:
+        with open(log_path, encoding="utf-8") as f:
+            messages = [line.rstrip("\n") for line in f if line.strip()]
+    else:
+        messages = synthesize_log()
+
+    variants = [("json, full parse", json.loads, False), ("json, audio fast path", json.loads, True)]
+    if json_codec.BACKEND == "orjson":
+        variants.append(("orjson, audio fast path", json_codec.loads, True))
+
+    for name, loads, fast_path in variants:
+        client = _make_client(loads, fast_path)
+        client.ws = _ReplayWebSocket(messages * repeat)
+        start = time.perf_counter()
+        asyncio.run(client.handle_messages())
+        elapsed = time.perf_counter() - start
+        n = len(messages) * repeat
+        print(f"{name:>24}: {n / elapsed:10.0f} events/s, {elapsed * 1e6 / n:7.2f} us/event")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None, int(sys.argv[2]) if len(sys.argv) > 2 else 5)
@@ -0,0 +1,144 @@
+"""
+时间索引记忆全文检索（TimeIndexedMemory.search_keyword，SQLite FTS5）的基准。
+在临时目录中直接写入messages条原始消息（SQLChatMessageHistory的格式，文本由常见词和不同频率的话题拼成，
+每5分钟一条），然后：
+    1. 统计旧数据补建全文索引（sync_fts）的耗时；
+    2. 对稀有、中等、常见三类关键词各查询queries次，统计p50/p99，并与不用索引时唯一的离线办法
+       （对message列做LIKE全表扫描）对比；再统计限定30天时间范围的查询；
+    3. 统计带全文索引同步的store_conversation耗时；
+    4. 自检：LIKE扫描找到的消息数与全文检索的命中数一致，新写入的对话立即可以检索到。
+总结用的LLM调用被替换为直接返回固定摘要。memory模块需要Python 3.12，需要config/api.py存在。
+用法：python tools/bench_keyword_search.py [--messages 1000000] [--queries 50]
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FILLERS = ["今天", "刚才", "主人说", "喵喵觉得", "听说", "明天想", "一起去", "好想"]
+TOPICS = ["天气", "晚饭", "散步", "游戏", "音乐", "电影", "学校", "作业", "睡觉", "公园", "下雨", "咖喱饭",
+          "生日", "礼物", "旅行", "海边", "猫咪", "小说", "画画", "蛋糕"]
+RARE = "紫色长颈鹿"  # 每十万条消息出现一次
+KEYWORDS = {"rare": RARE, "medium": "蛋糕", "common": "今天"}
+
+
+class FakeRecentHistoryManager:
+    def compress_history(self, messages, lanlan_name, detailed=False):
+        return messages, "先前对话的备忘录: 主人和喵喵聊了天气和晚饭。"
+
+
+def make_text(rng, i):
+    # 话题按Zipf分布出现：靠前的话题常见，靠后的少见
+    topics = [TOPICS[min(int(rng.paretovariate(1.2)) - 1, len(TOPICS) - 1)] for _ in range(2)]
+    text = f"{FILLERS[i % len(FILLERS)]}{topics[0]}，还有{topics[1]}。"
+    if i % 100000 == 50000:
+        text += f"梦见了{RARE}。"
+    return text
+
+
+def fill(path, rows, origin):
+    from langchain_core.messages import HumanMessage, message_to_dict
+    from config import TIME_ORIGINAL_TABLE_NAME
+    rng = random.Random(0)
+    template = message_to_dict(HumanMessage(content=""))
+    db = sqlite3.connect(path)
+    batch = 100000
+    for start in range(0, rows, batch):
+        records = []
+        for i in range(start, min(start + batch, rows)):
+            template["type"] = template["data"]["type"] = "human" if i % 2 == 0 else "ai"
+            template["data"]["content"] = make_text(rng, i)
+            records.append((f"s{i // 10}", json.dumps(template), (origin + timedelta(minutes=5 * i)).isoformat(" ")))
+        db.executemany(f"INSERT INTO {TIME_ORIGINAL_TABLE_NAME} (session_id, message, timestamp) VALUES (?, ?, ?)", records)
+    db.commit()
+    db.close()
+
+
+def like_scan(engine, keyword):
+    """没有全文索引时的离线检索：message列中中文以\\uXXXX转义保存，对转义后的关键词做LIKE全表扫描。"""
+    from config import TIME_ORIGINAL_TABLE_NAME
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(f"SELECT session_id, message, timestamp FROM {TIME_ORIGINAL_TABLE_NAME} WHERE message LIKE ?",
+                                    (f"%{json.dumps(keyword)[1:-1]}%",)).fetchall()
+
+
+def timed(fn, calls):
+    samples = []
+    for i in range(calls):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return np.array(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TimeIndexedMemory keyword search benchmark")
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--scans", type=int, default=3)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    import config
+    config.OPENROUTER_API_KEY = "bench"
+    import memory.timeindex as timeindex
+    from langchain_core.messages import HumanMessage, AIMessage
+
+    name = config.her_name
+    origin = datetime(2020, 1, 1)
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "time_indexed.db")
+        timeindex.TIME_STORE = {name: path}
+        memory = timeindex.TimeIndexedMemory(FakeRecentHistoryManager())
+        fill(path, args.messages, origin)
+        engine = memory.engine[name]
+        db_mb = os.path.getsize(path) / 2 ** 20
+
+        start = time.perf_counter()
+        indexed = memory.sync_fts(name)
+        backfill_s = time.perf_counter() - start
+        assert indexed == args.messages
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        index_mb = os.path.getsize(path) / 2 ** 20 - db_mb
+
+        span = timedelta(minutes=5 * args.messages)
+        rows = {}
+        for label, keyword in KEYWORDS.items():
+            hits = len(like_scan(engine, keyword))
+            assert len(memory.search_keyword(name, keyword, limit=args.messages)) == hits, keyword
+            window = (origin + span / 3, origin + span / 3 + timedelta(days=30))
+            in_window = [row for row in like_scan(engine, keyword) if str(window[0]) <= row[2] <= str(window[1])]
+            assert len(memory.search_keyword(name, keyword, *window, limit=args.messages)) == len(in_window), keyword
+            search = timed(lambda i: memory.search_keyword(name, keyword), args.queries)
+            ranged = timed(lambda i: memory.search_keyword(
+                name, keyword, origin + span * (i % 10) / 10, origin + span * (i % 10) / 10 + timedelta(days=30)),
+                args.queries)
+            scan = timed(lambda i: like_scan(engine, keyword), args.scans)
+            rows[label] = (keyword, hits, search, ranged, scan)
+
+        messages = [(HumanMessage if i % 2 == 0 else AIMessage)(content=f"第{i}句：下周去看{RARE}吧。") for i in range(10)]
+        store = timed(lambda i: memory.store_conversation(f"new{i}", messages, name, origin + span + timedelta(minutes=i)),
+                      20)
+        assert sum(1 for row in memory.search_keyword(name, RARE, limit=1000) if row[0] == "new0") == 10
+        engine.dispose()
+
+    print(f"{args.messages} messages ({db_mb:.0f} MB), full-text index backfill {backfill_s:.1f}s "
+          f"({args.messages / backfill_s:,.0f} msgs/s, +{index_mb:.0f} MB)")
+    for label, (keyword, hits, search, ranged, scan) in rows.items():
+        print(f"  {label:>6} {keyword!r:>8} ({hits:>6} hits): top10 p50={np.percentile(search, 50):7.2f}ms "
+              f"p99={np.percentile(search, 99):7.2f}ms | 30-day range p50={np.percentile(ranged, 50):7.2f}ms | "
+              f"LIKE scan p50={np.percentile(scan, 50):8.1f}ms")
+    print(f"  store_conversation with index sync: p50={np.percentile(store, 50):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
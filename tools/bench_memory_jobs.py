@@ -0,0 +1,179 @@
+"""
+memory_server后台总结队列的基准：本进程中启动一个OpenAI兼容的本地假LLM（每次调用固定延迟llm_ms，返回合法的摘要JSON），
+以子进程方式启动memory_server（工作目录为临时目录，存储都写在那里），然后：
+    1. 连续提交conversations段对话（/process与/renew交替），统计请求本身的延迟p50/p99；
+    2. 轮询/jobs直到全部完成，统计每个任务的执行时间——也就是改动前这两个接口要阻塞的时间；
+    3. 自检：带同一个request_id重复提交返回同一个job id、不会再调用LLM；内容相同但request_id不同的请求
+       是另一段对话，会新建任务并执行；/jobs/{job_id}可查询状态；
+       同一段对话换一个接口再提交时，时间索引记忆的摘要命中共享的摘要缓存（/summary_cache）。
+memory模块需要Python 3.12，需要config/api.py存在。
+用法：python tools/bench_memory_jobs.py [--conversations 6] [--messages 12] [--llm-ms 800]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+import numpy as np
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SERVER_BOOTSTRAP = """
+import os, sys
+sys.path.insert(0, {root!r})
+os.chdir({workdir!r})
+import config
+config.OPENROUTER_URL = "{llm_url}"
+config.OPENROUTER_API_KEY = "bench"
+import uvicorn, memory_server
+uvicorn.run(memory_server.app, host="127.0.0.1", port={port}, log_level="warning")
+"""
+
+
+class FakeLLM:
+    def __init__(self, delay_ms):
+        self.delay = delay_ms / 1000
+        self.calls = 0
+
+    async def chat_completions(self, request):
+        await request.json()
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        content = json.dumps({"对话摘要": f"第{self.calls}次总结：主人和喵喵聊了聊天气和晚饭。"}, ensure_ascii=False)
+        return web.json_response({
+            "id": f"chatcmpl-{self.calls}", "object": "chat.completion", "created": int(time.time()), "model": "fake",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+
+def make_history(i, n):
+    history = []
+    for j in range(n):
+        role = "user" if j % 2 == 0 else "assistant"
+        history.append({"role": role, "content": [{"type": "text", "text": f"第{i}段对话的第{j}句：今天晚饭吃什么呀？"}]})
+    return json.dumps(history, ensure_ascii=False)
+
+
+async def wait_ready(session, base, timeout=60.):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{base}/jobs") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("memory_server did not start")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="memory_server background summarization queue benchmark")
+    parser.add_argument("--conversations", type=int, default=6)
+    parser.add_argument("--messages", type=int, default=12)
+    parser.add_argument("--llm-ms", type=float, default=800.)
+    parser.add_argument("--port", type=int, default=18848)
+    parser.add_argument("--llm-port", type=int, default=18849)
+    args = parser.parse_args()
+    sys.path.insert(0, ROOT)
+    from config import her_name
+
+    llm = FakeLLM(args.llm_ms)
+    app = web.Application()
+    app.router.add_post("/chat/completions", llm.chat_completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.llm_port).start()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.makedirs(os.path.join(workdir, "memory", "store"))
+        bootstrap = _SERVER_BOOTSTRAP.format(root=ROOT, workdir=workdir, port=args.port,
+                                             llm_url=f"http://127.0.0.1:{args.llm_port}")
+        server = subprocess.Popen([sys.executable, "-c", bootstrap])
+        base = f"http://127.0.0.1:{args.port}"
+        try:
+            async with aiohttp.ClientSession() as session:
+                await wait_ready(session, base)
+                request_ms, job_ids = [], []
+                for i in range(args.conversations):
+                    kind = "process" if i % 2 == 0 else "renew"
+                    start = time.perf_counter()
+                    async with session.post(f"{base}/{kind}/{her_name}",
+                                            json={"input_history": make_history(i, args.messages),
+                                                  "request_id": f"bench{i}"}) as response:
+                        result = await response.json()
+                    request_ms.append((time.perf_counter() - start) * 1000)
+                    assert result["status"] == "queued", result
+                    job_ids.append(result["job_id"])
+
+                start = time.perf_counter()
+                while True:
+                    async with session.get(f"{base}/jobs") as response:
+                        jobs = await response.json()
+                    if jobs["pending"] == 0:
+                        break
+                    await asyncio.sleep(0.05)
+                drain_s = time.perf_counter() - start
+                jobs = {job["id"]: job for job in jobs["jobs"]}
+                assert all(jobs[job_id]["status"] == "done" for job_id in job_ids), jobs
+                job_ms = np.array([(jobs[j]["finished"] - jobs[j]["started"]) * 1000 for j in job_ids])
+
+                # 去重自检：同一个request_id再提交一次（发件箱重发），返回原来的任务，不再调用LLM
+                calls = llm.calls
+                async with session.post(f"{base}/process/{her_name}",
+                                        json={"input_history": make_history(0, args.messages),
+                                              "request_id": "bench0"}) as response:
+                    duplicate = await response.json()
+                async with session.get(f"{base}/jobs/{job_ids[0]}") as response:
+                    job = await response.json()
+                assert duplicate["job_id"] == job_ids[0] and job["status"] == "done" and llm.calls == calls
+
+                # 内容相同、request_id不同的是另一段对话，必须新建任务并执行
+                async with session.post(f"{base}/process/{her_name}",
+                                        json={"input_history": make_history(0, args.messages),
+                                              "request_id": "bench-repeat"}) as response:
+                    repeat_id = (await response.json())["job_id"]
+                assert repeat_id != job_ids[0]
+                while True:
+                    async with session.get(f"{base}/jobs/{repeat_id}") as response:
+                        if (await response.json())["status"] == "done":
+                            break
+                    await asyncio.sleep(0.05)
+
+                # 摘要缓存自检：第0段对话改用/renew提交，近期记忆按detailed重新总结，时间索引记忆的摘要直接复用
+                async with session.post(f"{base}/renew/{her_name}",
+                                        json={"input_history": make_history(0, args.messages)}) as response:
+                    job_id = (await response.json())["job_id"]
+                while True:
+                    async with session.get(f"{base}/jobs/{job_id}") as response:
+                        if (await response.json())["status"] == "done":
+                            break
+                    await asyncio.sleep(0.05)
+                async with session.get(f"{base}/summary_cache") as response:
+                    cache_stats = await response.json()
+                assert cache_stats["hits"] >= 1 and cache_stats["llm_calls_saved"] >= 1, cache_stats
+        finally:
+            server.terminate()
+            server.wait()
+    await runner.cleanup()
+
+    request_ms = np.array(request_ms)
+    print(f"{args.conversations} conversations x {args.messages} messages, fake LLM {args.llm_ms:.0f}ms per call, "
+          f"{llm.calls} LLM calls")
+    print(f"  request latency (now):          p50={np.percentile(request_ms, 50):8.1f}ms "
+          f"p99={np.percentile(request_ms, 99):8.1f}ms")
+    print(f"  summarization per job (before): p50={np.percentile(job_ms, 50):8.1f}ms "
+          f"p99={np.percentile(job_ms, 99):8.1f}ms")
+    print(f"  all jobs finished {drain_s:.1f}s after the last request; resubmitted request_id deduplicated, repeated content executed")
+    print(f"  summary cache: {cache_stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
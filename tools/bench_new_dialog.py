@@ -0,0 +1,87 @@
+"""
+/new_dialog 的延迟基准。在临时目录中导入memory_server，按不同的历史长度写入recent_{name}.json，
+直接调用处理函数，统计每次调用的p50：
+    reload+parse：近期记忆原来的读取方式（每次重新读取并messages_from_dict解析JSON）+ 每次重新渲染；
+    render：内存中的近期记忆（只stat文件检查外部修改）+ 每次重新渲染；
+    cached：按设定与近期记忆的版本号缓存渲染结果；
+    304：调用方带着上次的ETag重新验证。
+同时校验缓存的响应体与原来的渲染结果逐字相同。
+memory模块需要Python 3.12，需要config/api.py存在。
+用法：python tools/bench_new_dialog.py [--sizes 10,100,1000] [--calls 200]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_get_recent_history(manager, lanlan_name):
+    """改动前的CompressedRecentHistoryManager.get_recent_history。"""
+    from langchain_core.messages import messages_from_dict
+    if os.path.exists(manager.log_file_path[lanlan_name]):
+        with open(manager.log_file_path[lanlan_name], encoding='utf-8') as f:
+            manager.user_histories[lanlan_name] = messages_from_dict(json.load(f))
+    return manager.user_histories[lanlan_name]
+
+
+def timed(fn, calls):
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return np.array(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/new_dialog latency benchmark")
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.makedirs(os.path.join(workdir, "memory", "store"))
+    sys.path.insert(0, ROOT)
+    os.chdir(workdir)
+    import config
+    config.OPENROUTER_API_KEY = "bench"
+    import memory_server
+    from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, messages_to_dict
+
+    name = config.her_name
+    manager = memory_server.recent_history_manager
+    path = manager.log_file_path[name]
+    for size in [int(s) for s in args.sizes.split(",")]:
+        history = [SystemMessage(content="先前对话的备忘录: 主人和喵喵聊了天气。")]
+        for i in range(size - 1):
+            cls = HumanMessage if i % 2 == 0 else AIMessage
+            history.append(cls(content=[{"type": "text", "text": f"第{i}句：今天晚饭吃什么呀？想吃咖喱饭。"}]))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(messages_to_dict(history), f, indent=2, ensure_ascii=False)
+        file_kb = os.path.getsize(path) / 1024
+
+        manager.get_recent_history = lambda ln: legacy_get_recent_history(manager, ln)
+        legacy = timed(lambda: memory_server._render_new_dialog(name), args.calls)
+        expected = json.dumps(memory_server._render_new_dialog(name), ensure_ascii=False).encode("utf-8")
+        del manager.get_recent_history
+        render = timed(lambda: memory_server._render_new_dialog(name), args.calls)
+        response = memory_server.new_dialog(name, None)
+        assert response.status_code == 200 and response.body == expected
+        etag = response.headers["ETag"]
+        cached = timed(lambda: memory_server.new_dialog(name, None), args.calls)
+        revalidate = timed(lambda: memory_server.new_dialog(name, etag), args.calls)
+        assert memory_server.new_dialog(name, etag).status_code == 304
+
+        results = {"reload+parse": legacy, "render": render, "cached": cached, "304": revalidate}
+        print(f"{size:>5} messages ({file_kb:7.1f} KB): " + " | ".join(
+            f"{label} p50={np.percentile(ms, 50):7.3f}ms" for label, ms in results.items()))
+
+
+if __name__ == "__main__":
+    main()
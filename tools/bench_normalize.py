@@ -0,0 +1,118 @@
+"""
+utils/text_normalizer.py 的正确性校验与吞吐基准。
+1. 校验：tools/normalize_golden.jsonl 中每条输入在 normalize_tts_text / normalize_sync_text 下的输出
+   必须与改动前 LLMSessionManager.normalize_text / cross_server.normalize_text 的输出（记录在文件中）逐字相同；
+2. 吞吐：对比原来的串联实现（下方legacy_*，逐字照搬）与新实现在长文本和流式短增量两种负载下的chars/sec。
+用法：python tools/bench_normalize.py [--repeat 5]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import inflect
+from utils import text_normalizer
+from utils.frontend_utils import contains_chinese, replace_blank, replace_corner_mark, remove_bracket, spell_out_number, \
+    is_only_punctuation
+
+GOLDEN = os.path.join(ROOT, "tools", "normalize_golden.jsonl")
+
+emoji_pattern = re.compile(r'[^\w\u4e00-\u9fff\s>][^\w\u4e00-\u9fff\s]{2,}[^\w\u4e00-\u9fff\s<]', flags=re.UNICODE)
+emoji_pattern2 = re.compile("["
+        u"\U0001F600-\U0001F64F"  # emoticons
+        u"\U0001F300-\U0001F5FF"  # symbols & pictographs
+        u"\U0001F680-\U0001F6FF"  # transport & map symbols
+        u"\U0001F1E0-\U0001F1FF"  # flags (iOS)
+                           "]+", flags=re.UNICODE)
+emotion_pattern = re.compile('<(.*?)>')
+inflect_parser = inflect.engine()
+
+
+def legacy_tts(text):
+    text = text.strip()
+    text = text.replace("\n", "")
+    if contains_chinese(text):
+        text = replace_blank(text)
+        text = replace_corner_mark(text)
+        text = text.replace(".", "。")
+        text = text.replace(" - ", "，")
+        text = remove_bracket(text)
+        text = re.sub(r'[，、]+$', '。', text)
+    else:
+        text = remove_bracket(text)
+        text = spell_out_number(text, inflect_parser)
+    text = emoji_pattern2.sub('', text)
+    text = emoji_pattern.sub('', text)
+    if is_only_punctuation(text) and text not in ['<', '>']:
+        return ""
+    return text
+
+
+def legacy_sync(text):
+    text = text.strip()
+    text = replace_blank(text)
+    text = emoji_pattern2.sub('', text)
+    text = emoji_pattern.sub('', text)
+    text = emotion_pattern.sub("", text)
+    if is_only_punctuation(text):
+        return ""
+    return text
+
+
+def check_golden():
+    with open(GOLDEN, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    failures = 0
+    for r in records:
+        for name, fn in (("tts", text_normalizer.normalize_tts_text), ("sync", text_normalizer.normalize_sync_text)):
+            got = fn(r["input"])
+            if got != r[name]:
+                failures += 1
+                print(f"MISMATCH {name}: {r['input']!r} -> {got!r}, expected {r[name]!r}")
+    print(f"golden corpus: {len(records)} inputs, {failures} mismatches")
+    return failures == 0
+
+
+def workloads(repeat):
+    with open(GOLDEN, encoding="utf-8") as f:
+        corpus = [json.loads(line)["input"] for line in f if line.strip()]
+    long_texts = ["".join(corpus[i:i + 40]) for i in range(0, len(corpus), 40)] * repeat
+    # 流式增量：短句反复出现（语气词、报时、问候），模拟LRU命中的场景
+    deltas = [t for t in corpus if 0 < len(t) <= 16] * (repeat * 10)
+    return {"long texts": long_texts, "stream deltas": deltas}
+
+
+def bench(fn, texts):
+    chars = sum(len(t) for t in texts)
+    start = time.perf_counter()
+    for t in texts:
+        fn(t)
+    return chars / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="normalize_text golden check and throughput benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    if not check_golden():
+        sys.exit(1)
+
+    variants = {
+        "tts": [("legacy", legacy_tts), ("new, no cache", text_normalizer._normalize_tts),
+                ("new, lru", text_normalizer.normalize_tts_text)],
+        "sync": [("legacy", legacy_sync), ("new, no cache", text_normalizer._normalize_sync),
+                 ("new, lru", text_normalizer.normalize_sync_text)],
+    }
+    for load_name, texts in workloads(args.repeat).items():
+        print(f"[{load_name}] {len(texts)} texts, {sum(len(t) for t in texts)} chars")
+        for kind, fns in variants.items():
+            for name, fn in fns:
+                print(f"  {kind:>4} {name:>14}: {bench(fn, texts) / 1e6:7.2f} M chars/s")
+
+
+if __name__ == "__main__":
+    main()
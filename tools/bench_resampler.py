@@ -0,0 +1,59 @@
+"""
+StreamingUpsampler 与逐chunk调用 librosa.resample 的对比。
+1. 校验：分块处理的拼接结果必须与一次性处理逐字节一致（滤波器状态跨chunk保留）。
+2. 基准：24kHz -> 48kHz，按不同chunk大小统计每秒音频的CPU耗时。
+用法：python tools/bench_resampler.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from librosa import resample
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.audio import StreamingUpsampler
+
+SAMPLE_RATE = 24000
+
+
+def _librosa_chunk(data: bytes) -> bytes:
+    # 与改动前handle_audio_data中的实现一致
+    audio = np.frombuffer(data, dtype=np.int16)
+    audio = (resample(audio.astype(np.float32) / 32768.0, orig_sr=24000, target_sr=48000) * 32767.).clip(-32768, 32767).astype(np.int16)
+    return audio.tobytes()
+
+
+def check_chunked_matches_oneshot(signal):
+    one_shot = StreamingUpsampler().process(signal.tobytes())
+    upsampler = StreamingUpsampler()
+    rng = np.random.default_rng(0)
+    parts, pos = [], 0
+    while pos < len(signal):
+        size = int(rng.integers(1, 3000))
+        parts.append(upsampler.process(signal[pos:pos + size].tobytes()))
+        pos += size
+    assert b''.join(parts) == one_shot, "chunked output differs from one-shot output"
+    print("✅ 分块输出与一次性输出一致")
+
+
+def main(seconds=20):
+    rng = np.random.default_rng(1)
+    signal = (rng.standard_normal(SAMPLE_RATE * seconds) * 3000).clip(-32768, 32767).astype(np.int16)
+    check_chunked_matches_oneshot(signal)
+    _librosa_chunk(signal[:SAMPLE_RATE].tobytes())  # 预热，排除首次调用的初始化开销
+
+    for chunk_ms in [20, 50, 100]:
+        chunk = SAMPLE_RATE * chunk_ms // 1000
+        chunks = [signal[i:i + chunk].tobytes() for i in range(0, len(signal), chunk)]
+        upsampler = StreamingUpsampler()
+        for name, func in [("librosa", _librosa_chunk), ("streaming", upsampler.process)]:
+            start = time.process_time()
+            for c in chunks:
+                func(c)
+            cpu = time.process_time() - start
+            print(f"chunk {chunk_ms:>3}ms  {name:>9}: {cpu * 1000 / seconds:8.3f} ms CPU / s audio")
+
+
+if __name__ == "__main__":
+    main()
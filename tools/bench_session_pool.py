@@ -0,0 +1,152 @@
+"""
+预连接会话池的基准。在本进程中启动tools/mock_realtime_server.py中的模拟服务器（握手阶段等待connect_delay_ms，模拟真实API的网络延迟），
+以及一个带ETag的假/new_dialog接口，然后直接驱动LLMSessionManager，分别在不使用会话池（SESSION_POOL_SPARES=0，即原来的行为）
+和使用会话池时统计：
+    start-session：start_session从调用到session激活的耗时；
+    swap gap：续期到期后 _background_prepare_pending_session（准备新session）+ _perform_final_swap_sequence（切换）的耗时。
+同时自检：记忆prompt变化后备用会话在原连接上重新配置（不新建连接），空闲超过max_idle的备用会话被关闭重建。
+需要config/api.py存在。用法：python tools/bench_session_pool.py [--rounds 10] [--connect-delay-ms 150]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from multiprocessing import Queue as MPQueue
+
+import numpy as np
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from tools.mock_realtime_server import MockRealtimeServer, MockScript
+
+
+class FakeMemoryServer:
+    def __init__(self):
+        self.version = 0
+        self.requests = 0
+        self.not_modified = 0
+
+    async def new_dialog(self, request):
+        self.requests += 1
+        etag = f'"v{self.version}"'
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        text = f"\n========喵喵的内心活动========\n第{self.version}版记忆：主人昨天说想吃咖喱饭。\n"
+        return web.Response(text=text, headers={"ETag": etag})
+
+
+async def wait_for(predicate, timeout=5.):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError("condition not met")
+        await asyncio.sleep(0.01)
+
+
+async def run_mode(core, spares, args, mock):
+    core.SESSION_POOL_SPARES = spares
+    core.SESSION_POOL_REFRESH_INTERVAL = 0.2
+    manager = core.LLMSessionManager(MPQueue(), "bench", "你是喵喵。")
+    manager.use_tts = False
+    pool = manager.session_pool
+    pool.native_audio = True
+    pool.start()
+    settle = lambda: wait_for(lambda: len(pool._idle) >= spares)
+
+    start_ms = []
+    for _ in range(args.rounds):
+        await settle()
+        start = time.perf_counter()
+        await manager.start_session(None)
+        start_ms.append((time.perf_counter() - start) * 1000)
+        assert manager.is_active and manager.session.is_open()
+        await manager.end_session()
+
+    await settle()
+    await manager.start_session(None)
+    swap_ms = []
+    for i in range(args.rounds):
+        await settle()
+        old_session = manager.session
+        manager.message_cache_for_new_session = [{"role": "主人", "text": f"第{i}轮：今天吃什么？"},
+                                                 {"role": "喵喵", "text": "咖喱饭！"}]
+        manager.pending_session_warmed_up_event = asyncio.Event()
+        start = time.perf_counter()
+        await manager._background_prepare_pending_session()
+        assert manager.pending_session_warmed_up_event.is_set()
+        manager.message_cache_for_new_session.append({"role": "主人", "text": "好呀。"})
+        await manager._perform_final_swap_sequence()
+        swap_ms.append((time.perf_counter() - start) * 1000)
+        assert manager.session is not old_session and manager.session.is_open() and not old_session.is_open()
+    await manager.end_session()
+    await pool.close()
+    return np.array(start_ms), np.array(swap_ms)
+
+
+async def check_pool(core, memory, mock):
+    core.SESSION_POOL_SPARES = 1
+    core.SESSION_POOL_REFRESH_INTERVAL = 0.1
+    manager = core.LLMSessionManager(MPQueue(), "bench", "你是喵喵。")
+    pool = manager.session_pool
+    pool.native_audio = True
+    pool.start()
+    await wait_for(lambda: len(pool._idle) == 1)
+    connects, spare = mock.connects, pool._idle[0]
+    memory.version += 1
+    await wait_for(lambda: pool.refreshed >= 1)
+    assert f"第{memory.version}版记忆" in spare[1] and mock.connects == connects, "prompt refresh must reuse the connection"
+    pool.max_idle = 0.05
+    await wait_for(lambda: pool.expired >= 1 and len(pool._idle) == 1 and pool._idle[0] is not spare)
+    assert mock.connects > connects
+    stats = pool.stats()
+    await pool.close()
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="pre-connected realtime session pool benchmark")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--connect-delay-ms", type=int, default=150)
+    parser.add_argument("--port", type=int, default=18765)
+    parser.add_argument("--memory-port", type=int, default=18766)
+    args = parser.parse_args()
+
+    mock = MockRealtimeServer(MockScript(connect_delay_ms=args.connect_delay_ms, deltas=2, delta_interval_ms=1,
+                                         response_delay_ms=10))
+    server = await mock.serve(port=args.port)
+    memory = FakeMemoryServer()
+    app = web.Application()
+    app.router.add_get("/new_dialog/{lanlan_name}", memory.new_dialog)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.memory_port).start()
+
+    import main_helper.core as core
+    core.CORE_URL = f"ws://127.0.0.1:{args.port}"
+    core.MEMORY_SERVER_PORT = args.memory_port
+
+    results = {}
+    for label, spares in (("cold", 0), ("pooled", 1)):
+        connects = mock.connects
+        start_ms, swap_ms = await run_mode(core, spares, args, mock)
+        results[label] = (start_ms, swap_ms, mock.connects - connects)
+    stats = await check_pool(core, memory, mock)
+
+    server.close()
+    await server.wait_closed()
+    await runner.cleanup()
+
+    print(f"mock realtime server with {args.connect_delay_ms}ms connect delay, {args.rounds} rounds each")
+    for label, (start_ms, swap_ms, connects) in results.items():
+        print(f"  {label:>6}: start-session p50={np.percentile(start_ms, 50):7.1f}ms p99={np.percentile(start_ms, 99):7.1f}ms | "
+              f"swap gap p50={np.percentile(swap_ms, 50):7.1f}ms p99={np.percentile(swap_ms, 99):7.1f}ms | "
+              f"{connects} connections")
+    print(f"  /new_dialog: {memory.requests} requests, {memory.not_modified} answered 304")
+    print(f"  self-check passed (prompt refresh reuses the connection, idle spares are recycled): {stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
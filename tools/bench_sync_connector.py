@@ -0,0 +1,166 @@
+"""
+cross_server.sync_connector_process 的基准：对比原来的轮询消费者（empty()/get() + 每条sleep 10ms + 每轮sleep 100ms）
+与现在的QueueBridge实现。本进程中启动一个本地的替身monitor（/sync与/sync_binary两个websocket端点），
+连接器以子进程方式运行，消息从本进程放入multiprocessing.Queue，每条消息带有放入时的时间戳。
+    paced：每隔interval_ms放入一条（文本增量与9600字节音频交替），统计放入到替身monitor收到的延迟p50/p99；
+    burst：一次性放入burst条，统计吞吐（条/秒）。
+需要config/api.py存在。用法：python tools/bench_sync_connector.py [--paced 300] [--interval-ms 20] [--burst 3000]
+"""
+import argparse
+import asyncio
+import os
+import struct
+import sys
+import time
+from multiprocessing import Process, Queue, Event
+
+import aiohttp
+import numpy as np
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from main_helper import cross_server
+
+AUDIO_BYTES = 9600
+
+
+def legacy_connector(message_queue, shutdown_event, lanlan_name, sync_server_url):
+    """原实现的消费循环结构，只保留json/binary的转发。"""
+    async def run():
+        async with aiohttp.ClientSession() as session:
+            sync_ws = await session.ws_connect(f"{sync_server_url}/sync/{lanlan_name}", heartbeat=10)
+            binary_ws = await session.ws_connect(f"{sync_server_url}/sync_binary/{lanlan_name}", heartbeat=10)
+            while not shutdown_event.is_set():
+                while not message_queue.empty():
+                    message = message_queue.get()
+                    if message["type"] == "json":
+                        await sync_ws.send_json(message["data"])
+                    elif message["type"] == "binary":
+                        await binary_ws.send_bytes(message["data"])
+                    await asyncio.sleep(0.01)
+                await sync_ws.send_json({"type": "heartbeat", "timestamp": time.time()})
+                await binary_ws.send_bytes(b'\x00\x01\x02\x03')
+                await asyncio.sleep(0.1)
+    asyncio.run(run())
+
+
+def bridge_connector(message_queue, shutdown_event, lanlan_name, sync_server_url):
+    cross_server.sync_connector_process(message_queue, shutdown_event, lanlan_name, sync_server_url,
+                                        {'bullet': False, 'monitor': True})
+
+
+class StandInMonitor:
+    def __init__(self):
+        self.lags = []
+        self.received = 0
+        self.last_receive = None
+        self.connected = asyncio.Event()
+        self._sockets = 0
+
+    def reset(self):
+        self.lags = []
+        self.received = 0
+        self.last_receive = None
+
+    def _record(self, ts):
+        now = time.monotonic()
+        self.lags.append(now - ts)
+        self.received += 1
+        self.last_receive = now
+
+    async def _accept(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._sockets += 1
+        if self._sockets == 2:
+            self.connected.set()
+        return ws
+
+    async def sync(self, request):
+        ws = await self._accept(request)
+        async for msg in ws:
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                data = msg.json()
+                if "ts" in data:
+                    self._record(data["ts"])
+        return ws
+
+    async def sync_binary(self, request):
+        ws = await self._accept(request)
+        async for msg in ws:
+            if msg.type == aiohttp.WSMsgType.BINARY and len(msg.data) > 4:
+                self._record(struct.unpack_from('<d', msg.data)[0])
+        return ws
+
+
+def make_message(i):
+    if i % 2:
+        payload = bytearray(AUDIO_BYTES)
+        struct.pack_into('<d', payload, 0, time.monotonic())
+        return {"type": "binary", "data": bytes(payload)}
+    return {"type": "json", "data": {"type": "gemini_response", "text": "今天天气不错呀，", "ts": time.monotonic()}}
+
+
+def produce(message_queue, n, interval_ms):
+    for i in range(n):
+        message_queue.put(make_message(i))
+        if interval_ms:
+            time.sleep(interval_ms / 1000)
+
+
+async def wait_received(monitor, n, timeout=120.):
+    deadline = time.monotonic() + timeout
+    while monitor.received < n and time.monotonic() < deadline:
+        await asyncio.sleep(0.005)
+
+
+async def run_variant(target, port, args):
+    monitor = StandInMonitor()
+    app = web.Application()
+    app.router.add_get("/sync/{lanlan_name}", monitor.sync)
+    app.router.add_get("/sync_binary/{lanlan_name}", monitor.sync_binary)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    message_queue, shutdown_event = Queue(), Event()
+    process = Process(target=target, args=(message_queue, shutdown_event, "bench", f"ws://127.0.0.1:{port}"))
+    process.start()
+    await asyncio.wait_for(monitor.connected.wait(), 10)
+    await asyncio.sleep(0.3)
+
+    await asyncio.to_thread(produce, message_queue, args.paced, args.interval_ms)
+    await wait_received(monitor, args.paced)
+    lags_ms = np.array(monitor.lags) * 1000
+
+    monitor.reset()
+    start = time.monotonic()
+    await asyncio.to_thread(produce, message_queue, args.burst, 0)
+    await wait_received(monitor, args.burst)
+    throughput = monitor.received / (monitor.last_receive - start)
+
+    shutdown_event.set()
+    process.join(5)
+    if process.is_alive():
+        process.terminate()
+    await runner.cleanup()
+    return lags_ms, throughput
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="sync_connector_process throughput and lag benchmark")
+    parser.add_argument("--paced", type=int, default=300)
+    parser.add_argument("--interval-ms", type=float, default=20.)
+    parser.add_argument("--burst", type=int, default=3000)
+    parser.add_argument("--port", type=int, default=18802)
+    args = parser.parse_args()
+
+    print(f"paced: {args.paced} messages every {args.interval_ms}ms; burst: {args.burst} messages")
+    for name, target in (("legacy polling", legacy_connector), ("queue bridge", bridge_connector)):
+        lags_ms, throughput = await run_variant(target, args.port, args)
+        print(f"{name:>14}: lag p50={np.percentile(lags_ms, 50):7.2f}ms p99={np.percentile(lags_ms, 99):7.2f}ms, "
+              f"burst throughput={throughput:9.0f} msgs/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
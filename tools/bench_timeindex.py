@@ -0,0 +1,152 @@
+"""
+时间索引记忆（memory/timeindex.py）的SQLite基准。对每个数据量：
+    1. 在临时目录中按改动前的表结构（没有索引、默认的回滚日志模式）写入rows条原始消息、rows/10条摘要，
+       时间戳每分钟一条，格式与sqlite3写入datetime时相同；
+    2. 改动前：SQLChatMessageHistory.add_messages + 两条按session_id的UPDATE写入一段对话，以及1小时范围的时间查询；
+    3. 构造TimeIndexedMemory（迁移：建立session_id/timestamp索引，开启WAL，补建全文索引），再测同样的写入与查询。
+总结用的LLM调用被替换为直接返回固定摘要，只测数据库本身。
+memory模块需要Python 3.12，需要config/api.py存在。
+用法：python tools/bench_timeindex.py [--sizes 10000,100000,1000000] [--stores 20] [--queries 50]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MESSAGES_PER_SESSION = 10
+
+
+class FakeRecentHistoryManager:
+    def compress_history(self, messages, lanlan_name, detailed=False):
+        return messages, "先前对话的备忘录: 主人和喵喵聊了天气和晚饭。"
+
+
+def legacy_store_conversation(engine, event_id, messages, summary, timestamp):
+    """改动前的TimeIndexedMemory.store_conversation（总结结果直接传入）。"""
+    from langchain_community.chat_message_histories import SQLChatMessageHistory
+    from langchain_core.messages import SystemMessage
+    from sqlalchemy import text
+    from config import TIME_ORIGINAL_TABLE_NAME, TIME_COMPRESSED_TABLE_NAME
+    origin_history = SQLChatMessageHistory(connection=engine, session_id=event_id, table_name=TIME_ORIGINAL_TABLE_NAME)
+    compressed_history = SQLChatMessageHistory(connection=engine, session_id=event_id, table_name=TIME_COMPRESSED_TABLE_NAME)
+    origin_history.add_messages(messages)
+    compressed_history.add_message(SystemMessage(summary))
+    with engine.connect() as conn:
+        for table_name in (TIME_ORIGINAL_TABLE_NAME, TIME_COMPRESSED_TABLE_NAME):
+            conn.execute(text(f"UPDATE {table_name} SET timestamp = :timestamp WHERE session_id = :session_id"),
+                         {"timestamp": timestamp, "session_id": event_id})
+        conn.commit()
+
+
+def range_query(engine, start_time, end_time):
+    """改动前后相同的时间范围查询（TimeIndexedMemory.retrieve_original_by_timeframe）。"""
+    from config import TIME_ORIGINAL_TABLE_NAME
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(
+            f"SELECT session_id, message FROM {TIME_ORIGINAL_TABLE_NAME} WHERE timestamp BETWEEN ? AND ?",
+            (str(start_time), str(end_time))).fetchall()
+
+
+def fill(path, rows, origin):
+    from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, message_to_dict
+    from config import TIME_ORIGINAL_TABLE_NAME, TIME_COMPRESSED_TABLE_NAME
+    db = sqlite3.connect(path)
+    for table_name in (TIME_ORIGINAL_TABLE_NAME, TIME_COMPRESSED_TABLE_NAME):
+        db.execute(f"CREATE TABLE {table_name} (id INTEGER NOT NULL, session_id TEXT, message TEXT, "
+                   f"timestamp DATETIME, PRIMARY KEY (id))")
+    human = json.dumps(message_to_dict(HumanMessage(content="今天晚饭吃什么呀？想吃咖喱饭。")))
+    ai = json.dumps(message_to_dict(AIMessage(content="好呀，喵喵也想吃！")))
+    summary = json.dumps(message_to_dict(SystemMessage(content="先前对话的备忘录: 主人和喵喵聊了晚饭。")))
+
+    def stamp(i):
+        return (origin + timedelta(minutes=i)).isoformat(" ")
+
+    batch = 100000
+    for start in range(0, rows, batch):
+        db.executemany(f"INSERT INTO {TIME_ORIGINAL_TABLE_NAME} (session_id, message, timestamp) VALUES (?, ?, ?)",
+                       ((f"s{i // MESSAGES_PER_SESSION}", human if i % 2 == 0 else ai, stamp(i))
+                        for i in range(start, min(start + batch, rows))))
+    db.executemany(f"INSERT INTO {TIME_COMPRESSED_TABLE_NAME} (session_id, message, timestamp) VALUES (?, ?, ?)",
+                   ((f"s{j}", summary, stamp(j * MESSAGES_PER_SESSION)) for j in range(rows // MESSAGES_PER_SESSION)))
+    db.commit()
+    db.close()
+
+
+def timed(fn, calls):
+    samples = []
+    for i in range(calls):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return np.array(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TimeIndexedMemory SQLite benchmark")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--stores", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    import config
+    config.OPENROUTER_API_KEY = "bench"
+    import memory.timeindex as timeindex
+    from langchain_core.messages import HumanMessage, AIMessage
+    from sqlalchemy import create_engine
+
+    name = config.her_name
+    messages = [(HumanMessage if i % 2 == 0 else AIMessage)(content=f"第{i}句：明天去公园散步吧。")
+                for i in range(MESSAGES_PER_SESSION)]
+    summary = FakeRecentHistoryManager().compress_history(messages, name)[1]
+    origin = datetime(2023, 1, 1)
+
+    for rows in [int(s) for s in args.sizes.split(",")]:
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, "time_indexed.db")
+            fill(path, rows, origin)
+            span = timedelta(minutes=rows)
+            window_start = lambda i: origin + span * ((i * 7919) % 1000) / 1000
+
+            engine = create_engine(f"sqlite:///{path}")
+            legacy_store = timed(lambda i: legacy_store_conversation(
+                engine, f"legacy{i}", messages, summary, origin + span + timedelta(minutes=i)), args.stores)
+            legacy_query = timed(lambda i: range_query(
+                engine, window_start(i), window_start(i) + timedelta(hours=1)), args.queries)
+            engine.dispose()
+
+            timeindex.TIME_STORE = {name: path}
+            start = time.perf_counter()
+            memory = timeindex.TimeIndexedMemory(FakeRecentHistoryManager())
+            migrate_s = time.perf_counter() - start
+            store = timed(lambda i: memory.store_conversation(
+                f"new{i}", messages, name, origin + span + timedelta(minutes=args.stores + i)), args.stores)
+            query = timed(lambda i: memory.retrieve_original_by_timeframe(
+                name, window_start(i), window_start(i) + timedelta(hours=1)), args.queries)
+
+            # 自检：新写入的消息与时间戳可以按时间范围查到，且查询走索引
+            found = memory.retrieve_original_by_timeframe(name, origin + span + timedelta(minutes=args.stores),
+                                                          origin + span + timedelta(minutes=args.stores))
+            assert len(found) == MESSAGES_PER_SESSION and found[0][0] == "new0", found
+            with memory.engine[name].connect() as conn:
+                plan = conn.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN SELECT session_id, message FROM {config.TIME_ORIGINAL_TABLE_NAME} "
+                    f"WHERE timestamp BETWEEN ? AND ?", ("a", "b")).fetchall()
+                journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+            assert "USING INDEX" in str(plan) and journal_mode == "wal", (plan, journal_mode)
+            memory.engine[name].dispose()
+
+        print(f"{rows:>8} rows: store p50 {np.percentile(legacy_store, 50):8.2f}ms -> {np.percentile(store, 50):6.2f}ms | "
+              f"1h range query p50 {np.percentile(legacy_query, 50):8.2f}ms -> {np.percentile(query, 50):6.2f}ms | "
+              f"migration {migrate_s:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
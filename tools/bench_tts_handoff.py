@@ -0,0 +1,129 @@
+"""
+TTS进程间音频传递的基准：对比旧的10ms轮询方式与QueueBridge（读线程 + asyncio.Queue）。
+1. 空闲CPU：主进程消费者与worker子进程在没有任何数据时各自空转idle_seconds，统计CPU时间；
+2. 传递延迟：子进程每隔interval_ms放入一个带时间戳的音频块，统计从put到协程拿到数据的p50/p99。
+用法：python tools/bench_tts_handoff.py [--idle-seconds 3] [--chunks 300] [--interval-ms 20]
+"""
+import argparse
+import asyncio
+import os
+import resource
+import struct
+import sys
+import time
+from multiprocessing import Process, Queue
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.queue_bridge import QueueBridge
+
+CHUNK_BYTES = 4800
+
+
+def _polling_worker(request_queue, seconds):
+    """旧版worker的空闲循环：队列为空时sleep 10ms。"""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if request_queue.empty():
+            time.sleep(0.01)
+            continue
+        request_queue.get()
+
+
+def _blocking_worker(request_queue, seconds):
+    """新版worker的空闲循环：阻塞在get()上。"""
+    while request_queue.get() is not None:
+        pass
+
+
+def _producer(response_queue, chunks, interval_ms):
+    time.sleep(0.5)
+    for i in range(chunks):
+        payload = bytearray(CHUNK_BYTES)
+        struct.pack_into('<d', payload, 0, time.monotonic())
+        response_queue.put(bytes(payload))
+        time.sleep(interval_ms / 1000)
+
+
+async def _polling_consumer(mp_queue, n, latencies):
+    while len(latencies) < n:
+        while not mp_queue.empty():
+            data = mp_queue.get_nowait()
+            latencies.append(time.monotonic() - struct.unpack_from('<d', data)[0])
+        await asyncio.sleep(0.01)
+
+
+async def _bridge_consumer(bridge, n, latencies):
+    while len(latencies) < n:
+        data = await bridge.get()
+        latencies.append(time.monotonic() - struct.unpack_from('<d', data)[0])
+
+
+def _child_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def _idle_consumer_cpu(mode, seconds):
+    mp_queue = Queue()
+    bridge = QueueBridge(mp_queue)
+    if mode == "bridge":
+        bridge.start()
+        task = asyncio.create_task(_bridge_consumer(bridge, 1, []))
+    else:
+        task = asyncio.create_task(_polling_consumer(mp_queue, 1, []))
+    start = time.process_time()
+    await asyncio.sleep(seconds)
+    used = time.process_time() - start
+    task.cancel()
+    bridge.stop()
+    return used
+
+
+def _idle_worker_cpu(target, seconds):
+    request_queue = Queue()
+    before = _child_cpu()
+    p = Process(target=target, args=(request_queue, seconds))
+    p.start()
+    time.sleep(seconds)
+    request_queue.put(None)
+    p.join()
+    return _child_cpu() - before
+
+
+async def _handoff_latency(mode, chunks, interval_ms):
+    mp_queue = Queue()
+    latencies = []
+    producer = Process(target=_producer, args=(mp_queue, chunks, interval_ms))
+    if mode == "bridge":
+        bridge = QueueBridge(mp_queue)
+        bridge.start()
+        producer.start()
+        await _bridge_consumer(bridge, chunks, latencies)
+        bridge.stop()
+    else:
+        producer.start()
+        await _polling_consumer(mp_queue, chunks, latencies)
+    producer.join()
+    return np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS response handoff benchmark")
+    parser.add_argument("--idle-seconds", type=float, default=3.)
+    parser.add_argument("--chunks", type=int, default=300)
+    parser.add_argument("--interval-ms", type=float, default=20.)
+    args = parser.parse_args()
+
+    for name, mode, worker in [("polling (old)", "polling", _polling_worker), ("bridge (new)", "bridge", _blocking_worker)]:
+        consumer_cpu = asyncio.run(_idle_consumer_cpu(mode, args.idle_seconds))
+        worker_cpu = _idle_worker_cpu(worker, args.idle_seconds)
+        ms = asyncio.run(_handoff_latency(mode, args.chunks, args.interval_ms))
+        print(f"{name:>14}: idle cpu consumer={consumer_cpu * 1000 / args.idle_seconds:6.2f}ms/s "
+              f"worker={worker_cpu * 1000 / args.idle_seconds:6.2f}ms/s  "
+              f"handoff p50={np.percentile(ms, 50):6.2f}ms p99={np.percentile(ms, 99):6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
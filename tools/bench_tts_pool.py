@@ -0,0 +1,136 @@
+"""
+SynthesizerPool基准：用本地模拟后端对比“每轮新建合成器”与“预热池”的TTS首包延迟。
+模拟合成器：建立连接耗时connect_ms（warm()时预先完成，否则在第一次streaming_call时完成），
+随后服务端首包耗时first_chunk_ms。每轮之间间隔turn_gap_ms（用户说话的时间），池在此期间补充备用合成器。
+用法：python tools/bench_tts_pool.py [--turns 20] [--connect-ms 150] [--first-chunk-ms 120] [--turn-gap-ms 500]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from main_helper.tts_pool import SynthesizerPool
+
+
+class FakeSynthesizer:
+    def __init__(self, callback, connect_ms, first_chunk_ms):
+        self.callback = callback
+        self.connect_ms = connect_ms
+        self.first_chunk_ms = first_chunk_ms
+        self.connected = False
+        self.started = False
+        self.closed = False
+        self._done = threading.Event()
+
+    def connect(self):
+        time.sleep(self.connect_ms / 1000)
+        self.connected = True
+
+    def streaming_call(self, text):
+        if self.closed:
+            raise RuntimeError("synthesizer closed")
+        if not self.connected:
+            self.connect()
+        if not self.started:
+            self.started = True
+            threading.Timer(self.first_chunk_ms / 1000, self._emit).start()
+
+    def _emit(self):
+        self.callback.on_data(b"\x00" * 4800)
+        self._done.set()
+
+    def streaming_complete(self):
+        self._done.wait()
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBackend:
+    def __init__(self, connect_ms, first_chunk_ms):
+        self.connect_ms = connect_ms
+        self.first_chunk_ms = first_chunk_ms
+
+    def create(self, callback):
+        return FakeSynthesizer(callback, self.connect_ms, self.first_chunk_ms)
+
+    def warm(self, synthesizer):
+        synthesizer.connect()
+
+
+class FirstChunkCallback:
+    def __init__(self):
+        self.turn_start = None
+        self.first_chunk_ms = None
+        self.event = threading.Event()
+
+    def on_data(self, data):
+        if self.turn_start is not None:
+            self.first_chunk_ms = (time.perf_counter() - self.turn_start) * 1000
+            self.turn_start = None
+        self.event.set()
+
+
+class NoPool:
+    """旧的做法：每个speech id当场新建合成器。"""
+    def __init__(self, backend, callback_factory):
+        self.backend = backend
+        self.callback_factory = callback_factory
+        self.hits = self.misses = self.expired = 0
+
+    def acquire(self):
+        self.misses += 1
+        callback = self.callback_factory()
+        return self.backend.create(callback), callback
+
+    def close(self):
+        pass
+
+
+def run_turns(pool, turns, turn_gap_ms):
+    samples = []
+    for _ in range(turns):
+        time.sleep(turn_gap_ms / 1000)
+        turn_start = time.perf_counter()
+        synthesizer, callback = pool.acquire()
+        callback.turn_start = turn_start
+        synthesizer.streaming_call("你好呀，今天过得怎么样？")
+        callback.event.wait()
+        samples.append(callback.first_chunk_ms)
+        synthesizer.streaming_complete()
+        synthesizer.close()
+    pool.close()
+    return np.array(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS synthesizer pool benchmark with a fake backend")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--connect-ms", type=float, default=150.)
+    parser.add_argument("--first-chunk-ms", type=float, default=120.)
+    parser.add_argument("--turn-gap-ms", type=float, default=500.)
+    parser.add_argument("--ttl", type=float, default=25.)
+    args = parser.parse_args()
+
+    backend = FakeBackend(args.connect_ms, args.first_chunk_ms)
+    for name, pool in (("new per turn", NoPool(backend, FirstChunkCallback)),
+                       ("warm pool", SynthesizerPool(backend, FirstChunkCallback, spares=1, ttl=args.ttl))):
+        ms = run_turns(pool, args.turns, args.turn_gap_ms)
+        print(f"{name:>13}: first chunk p50={np.percentile(ms, 50):7.1f}ms p99={np.percentile(ms, 99):7.1f}ms "
+              f"(hits={pool.hits}, misses={pool.misses}, expired={pool.expired})")
+
+    # TTL自检：ttl很短时备用合成器会被关闭并重建，取到的仍然是可用的合成器
+    pool = SynthesizerPool(backend, FirstChunkCallback, spares=1, ttl=0.2)
+    time.sleep(1.)
+    synthesizer, _ = pool.acquire()
+    assert pool.expired > 0 and not synthesizer.closed and synthesizer.connected
+    pool.close()
+    print("ttl self-check passed")
+
+
+if __name__ == "__main__":
+    main()
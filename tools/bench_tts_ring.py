@@ -0,0 +1,129 @@
+"""
+TTS音频从子进程到主进程事件循环的传递基准：对比旧的multiprocessing.Queue直接传递音频块，
+与SharedAudioRing（共享内存传递音频，Queue只传帧序号做唤醒）。两条路径的消费端都使用QueueBridge。
+1. 吞吐：生产者尽快写入chunks个chunk_bytes大小的块，统计MB/s；
+2. 延迟：生产者每interval_ms写入一块（块内带时间戳），统计从写入到协程拿到数据的p50/p99；
+3. 自检：跨进程校验帧内容与顺序，以及interrupt()之后旧epoch的帧全部被丢弃。
+用法：python tools/bench_tts_ring.py [--chunks 20000] [--chunk-bytes 9600] [--interval-ms 20]
+"""
+import argparse
+import asyncio
+import os
+import struct
+import sys
+import time
+from multiprocessing import Process, Queue
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.queue_bridge import QueueBridge
+from utils.shm_ring import SharedAudioRing
+
+
+def _stamped_chunk(i, chunk_bytes):
+    payload = bytearray(chunk_bytes)
+    struct.pack_into('<dI', payload, 0, time.monotonic(), i)
+    return payload
+
+
+def _queue_producer(queue, ring, chunks, chunk_bytes, interval_ms):
+    for i in range(chunks):
+        queue.put(bytes(_stamped_chunk(i, chunk_bytes)))
+        if interval_ms:
+            time.sleep(interval_ms / 1000)
+
+
+def _ring_producer(queue, ring, chunks, chunk_bytes, interval_ms):
+    for i in range(chunks):
+        payload = _stamped_chunk(i, chunk_bytes)
+        while True:
+            seq = ring.write(payload, ring.epoch)
+            if seq is not None:
+                break
+            time.sleep(0.0005)  # 缓冲区满时等待消费者（压测中不允许丢帧）
+        queue.put(seq)
+        if interval_ms:
+            time.sleep(interval_ms / 1000)
+
+
+async def _consume(mode, bridge, ring, chunks, latencies):
+    received = 0
+    while received < chunks:
+        item = await bridge.get()
+        frames = [item] if mode == "queue" else (bytes(frame) for _, frame in ring.read())
+        for data in frames:
+            sent, index = struct.unpack_from('<dI', data)
+            latencies.append(time.monotonic() - sent)
+            assert index == received, f"{mode}: expected chunk {received}, got {index}"
+            received += 1
+
+
+async def _run(mode, chunks, chunk_bytes, interval_ms):
+    queue = Queue()
+    ring = SharedAudioRing(1 << 20) if mode == "ring" else None
+    bridge = QueueBridge(queue)
+    bridge.start()
+    target = _ring_producer if mode == "ring" else _queue_producer
+    producer = Process(target=target, args=(queue, ring, chunks, chunk_bytes, interval_ms))
+    latencies = []
+    start = time.perf_counter()
+    producer.start()
+    await _consume(mode, bridge, ring, chunks, latencies)
+    elapsed = time.perf_counter() - start
+    producer.join()
+    bridge.stop()
+    if ring is not None:
+        ring.destroy()
+    return elapsed, np.array(latencies) * 1000
+
+
+def _interrupt_producer(ring, ready, chunks):
+    epoch = ring.epoch
+    for i in range(chunks):
+        ring.write(struct.pack('<I', i), epoch)
+    ready.put(True)
+    ready.get()  # 等待主进程interrupt
+    for i in range(chunks):
+        ring.write(b'stale', epoch)
+    ring.write(b'fresh', ring.epoch)
+    ready.put(True)
+
+
+def _check_interrupt():
+    ring = SharedAudioRing(1 << 16)
+    ready = Queue()
+    p = Process(target=_interrupt_producer, args=(ring, ready, 10))
+    p.start()
+    ready.get()
+    first = [bytes(frame) for _, frame in ring.read()][:3]
+    assert first == [struct.pack('<I', i) for i in range(3)], first
+    ring.interrupt()
+    ready.put(True)
+    ready.get()
+    p.join()
+    rest = [bytes(frame) for _, frame in ring.read()]
+    assert rest == [b'fresh'], rest
+    ring.destroy()
+    print("interrupt self-check passed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS audio transport benchmark: mp.Queue vs shared-memory ring")
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--chunk-bytes", type=int, default=9600)  # 48kHz int16 的100ms
+    parser.add_argument("--latency-chunks", type=int, default=300)
+    parser.add_argument("--interval-ms", type=float, default=20.)
+    args = parser.parse_args()
+
+    _check_interrupt()
+    for mode in ("queue", "ring"):
+        elapsed, _ = asyncio.run(_run(mode, args.chunks, args.chunk_bytes, 0))
+        _, ms = asyncio.run(_run(mode, args.latency_chunks, args.chunk_bytes, args.interval_ms))
+        mb = args.chunks * args.chunk_bytes / 1e6
+        print(f"{mode:>6}: throughput {mb / elapsed:8.1f} MB/s ({args.chunks / elapsed:8.0f} chunks/s)  "
+              f"paced latency p50={np.percentile(ms, 50):6.3f}ms p99={np.percentile(ms, 99):6.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+TTS分句基准：把较长的中/英文回复按1~8个字符一块模拟成流式增量（每块间隔delta_interval_ms），对比
+    per-delta      ：旧做法，每个增量直接调用一次synthesizer.streaming_call
+    rescan         ：每个增量后对整个buffer调用split_paragraph（重复扫描已处理文本）
+    incremental    ：IncrementalSegmenter，只扫描新到达的文本
+统计合成调用次数、首个可合成句子出现的模拟时间（首句越早完整，TTS越早拿到可以自然断句的输入）、
+以及分句+normalize_text的CPU耗时。同时自检incremental产出的文本段拼接后与原文一致。
+需要config/api.py存在（normalize_text来自LLMSessionManager）。
+用法：python tools/bench_tts_segmenter.py [--repeat 20] [--delta-interval-ms 30]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.frontend_utils import IncrementalSegmenter, split_paragraph
+from main_helper.core import LLMSessionManager
+
+ZH_TEXT = ("哎呀，你终于回来啦！今天我一个人在家里等了好久，差点以为你把我忘了呢。"
+           "对了，你上次说想去海边看日出，我查了一下天气预报，这周六早上是晴天，五点四十分左右日出，"
+           "如果我们四点半出发的话，应该刚好能赶上。不过你要记得带件外套，海边的风很大，早上会有点冷哦。"
+           "还有，回来的路上我们可以顺便去那家新开的早餐店，听说他们的豆浆和油条特别好吃，"
+           "排队的人很多，所以最好早一点过去。你觉得怎么样？要是你太累了，我们也可以改到下周再去，"
+           "反正日出每天都有嘛，最重要的是你要好好休息，不要总是熬夜。")
+EN_TEXT = ("Oh, you're finally back! I've been waiting here all afternoon, and I was starting to think you forgot about me. "
+           "Anyway, you mentioned last time that you wanted to watch the sunrise at the beach, so I checked the forecast. "
+           "Saturday morning looks clear, and the sun rises at around five forty, so if we leave by four thirty we should make it. "
+           "Don't forget to bring a jacket though; the wind by the sea is strong and it gets pretty cold early in the morning. "
+           "On the way back we could stop by that new breakfast place, the one everyone keeps talking about. "
+           "What do you think? If you're too tired, we can always go next week instead; the sun isn't going anywhere.")
+
+
+def make_deltas(text, seed=0):
+    rng = random.Random(seed)
+    deltas, i = [], 0
+    while i < len(text):
+        k = rng.randint(1, 8)
+        deltas.append(text[i:i + k])
+        i += k
+    return deltas
+
+
+def run_per_delta(deltas, normalize):
+    return [(i, normalize(d)) for i, d in enumerate(deltas)]
+
+
+def run_rescan(deltas, normalize, lang):
+    out, buffer = [], ""
+    for i, d in enumerate(deltas):
+        buffer += d
+        ready, buffer = split_paragraph(buffer, lang=lang)
+        if ready:
+            out.append((i, normalize(ready)))
+    out.append((len(deltas) - 1, normalize(buffer)))
+    return out
+
+
+def run_incremental(deltas, normalize, lang):
+    out, segmenter = [], IncrementalSegmenter(lang=lang)
+    for i, d in enumerate(deltas):
+        for segment in segmenter.feed(d):
+            out.append((i, normalize(segment)))
+    out.append((len(deltas) - 1, normalize(segmenter.flush())))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental TTS segmenter benchmark")
+    parser.add_argument("--repeat", type=int, default=20, help="把样例文本重复多少遍，模拟长回复")
+    parser.add_argument("--delta-interval-ms", type=float, default=30.)
+    args = parser.parse_args()
+
+    manager = LLMSessionManager(None, "bench", "")
+    normalize = manager.normalize_text
+
+    for lang, text in (("zh", ZH_TEXT), ("en", EN_TEXT)):
+        text = text * args.repeat
+        deltas = make_deltas(text)
+
+        segmenter, joined = IncrementalSegmenter(lang=lang), []
+        for d in deltas:
+            joined.extend(segmenter.feed(d))
+        joined.append(segmenter.flush())
+        assert ''.join(joined) == text, "incremental segments do not reassemble the input"
+
+        print(f"[{lang}] {len(text)} chars in {len(deltas)} deltas")
+        for name, fn in (("per-delta", lambda: run_per_delta(deltas, normalize)),
+                         ("rescan", lambda: run_rescan(deltas, normalize, lang)),
+                         ("incremental", lambda: run_incremental(deltas, normalize, lang))):
+            start = time.perf_counter()
+            calls = [c for c in fn() if c[1]]
+            cpu_ms = (time.perf_counter() - start) * 1000
+            first_ms = calls[0][0] * args.delta_interval_ms if calls else float("nan")
+            first_len = len(calls[0][1]) if calls else 0
+            print(f"  {name:>12}: {len(calls):5d} synth calls, first call at {first_ms:6.0f}ms "
+                  f"({first_len:3d} chars), cpu {cpu_ms:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+本地的Omni Realtime模拟服务器，用于在不连接DashScope/OpenAI的情况下对本项目自身的开销做压测。
+只实现OmniRealtimeClient用到的协议子集：
+    客户端 -> 服务器: session.update, input_audio_buffer.append, input_image_buffer.append, response.create, response.cancel
+    服务器 -> 客户端: session.created/updated, input_audio_buffer.speech_started/speech_stopped,
+                      conversation.item.input_audio_transcription.completed, response.created,
+                      response.output_item.added, response.audio_transcript.delta, response.text.delta,
+                      response.audio.delta, response.audio_transcript.done, response.done
+每个连接按MockScript循环：收到speech_after_ms的音频后触发speech_started，再过speech_ms触发speech_stopped和输入转录，
+等待response_delay_ms后逐个发出deltas条增量（间隔delta_interval_ms），最后response.done。
+文本增量的内容为 "#连接id:轮次:序号#"，便于端到端基准在浏览器侧还原出对应的发送时间。
+用法：python tools/mock_realtime_server.py [--port 8765] [--deltas 20] ...
+然后把config/api.py中的CORE_URL指向 ws://127.0.0.1:8765 即可。
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import websockets
+
+INPUT_BYTES_PER_MS = 16000 * 2 // 1000
+
+
+@dataclass
+class MockScript:
+    speech_after_ms: int = 1000      # 收到多少毫秒音频后触发speech_started
+    speech_ms: int = 1500            # speech_started 到 speech_stopped 之间的音频时长
+    response_delay_ms: int = 300     # speech_stopped 到 response.created 的模拟模型延迟
+    deltas: int = 20                 # 每轮回复的增量条数
+    delta_interval_ms: int = 40      # 增量之间的间隔
+    audio_delta_bytes: int = 4800    # 每条音频增量的PCM字节数（24kHz int16，4800字节=100ms）
+    text_mode: bool = False          # True时发送response.text.delta而不是音频+转录
+    connect_delay_ms: int = 0        # 模拟建立连接的网络延迟（DNS、TLS与HTTP升级），在握手阶段等待
+
+
+class MockConnection:
+    _ids = itertools.count()
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.id = next(self._ids)
+        self.tag = None  # 由on_append钩子设置，用于把连接与压测客户端对应起来
+        self.audio_ms = 0.
+        self.turn = 0
+        self.modalities = ["text", "audio"]
+        self.response_task: Optional[asyncio.Task] = None
+        self._event_ids = itertools.count()
+
+    async def send(self, event):
+        event["event_id"] = f"mock_{self.id}_{next(self._event_ids)}"
+        await self.ws.send(json.dumps(event, ensure_ascii=False))
+
+
+class MockRealtimeServer:
+    def __init__(self, script: MockScript = None,
+                 on_append: Optional[Callable[[MockConnection, bytes, float], None]] = None,
+                 on_delta: Optional[Callable[[MockConnection, str, int, int, float], None]] = None):
+        """
+        on_append(conn, pcm_bytes, t)：收到一条input_audio_buffer.append时调用，t为time.perf_counter()。
+        on_delta(conn, kind, turn, index, t)：发出一条增量后调用，kind为"text"或"audio"。
+        """
+        self.script = script or MockScript()
+        self.on_append = on_append
+        self.on_delta = on_delta
+        self._audio_payload = base64.b64encode(os.urandom(self.script.audio_delta_bytes)).decode()
+        self.connections = set()
+        self.connects = 0
+        self.session_updates = 0
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        return await websockets.serve(self._handler, host, port, max_size=None, process_request=self._process_request)
+
+    async def _process_request(self, connection, request):
+        self.connects += 1
+        if self.script.connect_delay_ms:
+            await asyncio.sleep(self.script.connect_delay_ms / 1000)
+        return None
+
+    async def _handler(self, ws):
+        conn = MockConnection(ws)
+        self.connections.add(conn)
+        try:
+            await conn.send({"type": "session.created", "session": {}})
+            async for message in ws:
+                event = json.loads(message)
+                handler = self._handlers.get(event.get("type"))
+                if handler:
+                    await handler(self, conn, event)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            if conn.response_task:
+                conn.response_task.cancel()
+            self.connections.discard(conn)
+
+    async def _session_update(self, conn, event):
+        self.session_updates += 1
+        conn.modalities = event.get("session", {}).get("modalities", conn.modalities)
+        await conn.send({"type": "session.updated", "session": event.get("session", {})})
+
+    async def _audio_append(self, conn, event):
+        pcm = base64.b64decode(event["audio"])
+        if self.on_append:
+            self.on_append(conn, pcm, time.perf_counter())
+        before = conn.audio_ms
+        conn.audio_ms += len(pcm) / INPUT_BYTES_PER_MS
+        start = self.script.speech_after_ms
+        stop = start + self.script.speech_ms
+        if before < start <= conn.audio_ms:
+            await conn.send({"type": "input_audio_buffer.speech_started", "audio_start_ms": int(start)})
+        if before < stop <= conn.audio_ms:
+            conn.audio_ms = 0.
+            await conn.send({"type": "input_audio_buffer.speech_stopped", "audio_end_ms": int(stop)})
+            await conn.send({"type": "conversation.item.input_audio_transcription.completed",
+                             "transcript": f"模拟输入{conn.turn}"})
+            self._start_response(conn, self.script.response_delay_ms)
+
+    async def _response_create(self, conn, event):
+        self._start_response(conn, self.script.response_delay_ms)
+
+    async def _response_cancel(self, conn, event):
+        if conn.response_task and not conn.response_task.done():
+            conn.response_task.cancel()
+
+    async def _ignore(self, conn, event):
+        pass
+
+    _handlers = {
+        "session.update": _session_update,
+        "input_audio_buffer.append": _audio_append,
+        "input_image_buffer.append": _ignore,
+        "response.create": _response_create,
+        "response.cancel": _response_cancel,
+    }
+
+    def _start_response(self, conn, delay_ms):
+        if conn.response_task and not conn.response_task.done():
+            conn.response_task.cancel()
+        conn.response_task = asyncio.create_task(self._respond(conn, delay_ms))
+
+    async def _respond(self, conn, delay_ms):
+        turn = conn.turn
+        conn.turn += 1
+        rid = f"resp_{conn.id}_{turn}"
+        status = "cancelled"
+        try:
+            await asyncio.sleep(delay_ms / 1000)
+            await conn.send({"type": "response.created", "response": {"id": rid}})
+            await conn.send({"type": "response.output_item.added", "response_id": rid, "item": {"id": f"item_{rid}"}})
+            native_audio = "audio" in conn.modalities and not self.script.text_mode
+            for i in range(self.script.deltas):
+                text = f"#{conn.id}:{turn}:{i}#"
+                if native_audio:
+                    await conn.send({"type": "response.audio_transcript.delta", "response_id": rid, "delta": text})
+                    self._delta_sent(conn, "text", turn, i)
+                    await conn.send({"type": "response.audio.delta", "response_id": rid, "item_id": f"item_{rid}",
+                                     "output_index": 0, "content_index": 0, "delta": self._audio_payload})
+                    self._delta_sent(conn, "audio", turn, i)
+                else:
+                    await conn.send({"type": "response.text.delta", "response_id": rid, "delta": text})
+                    self._delta_sent(conn, "text", turn, i)
+                await asyncio.sleep(self.script.delta_interval_ms / 1000)
+            if native_audio:
+                await conn.send({"type": "response.audio_transcript.done", "response_id": rid})
+            status = "completed"
+        finally:
+            try:
+                await conn.send({"type": "response.done", "response": {"id": rid, "status": status}})
+            except websockets.exceptions.ConnectionClosed:
+                pass
+
+    def _delta_sent(self, conn, kind, turn, index):
+        if self.on_delta:
+            self.on_delta(conn, kind, turn, index, time.perf_counter())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Omni Realtime server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    defaults = MockScript()
+    for field in MockScript.__dataclass_fields__:
+        value = getattr(defaults, field)
+        if isinstance(value, bool):
+            parser.add_argument(f"--{field.replace('_', '-')}", action="store_true")
+        else:
+            parser.add_argument(f"--{field.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+    script = MockScript(**{f: getattr(args, f) for f in MockScript.__dataclass_fields__})
+
+    async def run():
+        await MockRealtimeServer(script).serve(args.host, args.port)
+        print(f"Mock realtime server listening on ws://{args.host}:{args.port}")
+        await asyncio.Future()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
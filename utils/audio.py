@@ -38,3 +38,52 @@ def pcm_to_wav(pcm_data, sample_rate=16000, channels=1, sample_width=2):
 
     wav_buffer.seek(0)  # 重要：将指针重置到开始位置
     return wav_buffer.getvalue(), wav_buffer
+
+
+class StreamingUpsampler:
+    """
+    有状态的2倍多相FIR上采样器，用于把24kHz的模型/TTS输出转为48kHz。
+    每个会话、每条音频流各持有一个实例。滤波器历史在chunk之间保留，因此分块处理的结果与一次性处理完全一致，
+    不会像逐块调用librosa.resample那样在块边界处产生咔哒声。输入输出均为int16 PCM字节。
+    """
+    def __init__(self, taps_per_phase=24, beta=8.0, cutoff=0.45):
+        # 设计原型低通滤波器（Kaiser窗sinc），cutoff相对于输出采样率的奈奎斯特频率
+        n = 2 * taps_per_phase
+        t = np.arange(n) - (n - 1) / 2
+        h = cutoff * np.sinc(cutoff * t) * np.kaiser(n, beta)
+        h *= 2.0 / h.sum()  # 插零后补偿增益
+        # phases[j, p] 为第p个相位作用在窗口第j个采样上的系数，窗口按时间正序排列
+        self._phases = np.ascontiguousarray(h.reshape(taps_per_phase, 2)[::-1]).astype(np.float32)
+        self._taps = taps_per_phase
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        """丢弃滤波器历史，开始一条新的音频流。"""
+        self._history = np.zeros(self._taps - 1, dtype=np.float32)
+
+    def process(self, pcm: bytes) -> bytes:
+        """输入任意长度的int16 PCM，返回两倍长度的int16 PCM。"""
+        x = np.frombuffer(pcm, dtype=np.int16)
+        n = len(x)
+        if n == 0:
+            return b''
+        size = self._taps - 1 + n
+        if len(self._buffer) < size:
+            self._buffer = np.empty(size, dtype=np.float32)
+        buf = self._buffer[:size]
+        buf[:self._taps - 1] = self._history
+        buf[self._taps - 1:] = x
+        self._history = buf[n:].copy()
+        # 一次矩阵乘法同时算出偶数、奇数相位，(n, 2)展开后即为交织好的输出
+        windows = np.lib.stride_tricks.sliding_window_view(buf, self._taps)
+        y = windows @ self._phases
+        np.rint(y, out=y)
+        np.clip(y, -32768, 32767, out=y)
+        return y.astype(np.int16).tobytes()
+
+    def flush(self) -> bytes:
+        """输出滤波器中剩余的尾音（约taps_per_phase个输入采样的群延迟），并重置状态。"""
+        tail = self.process(np.zeros(self._taps // 2, dtype=np.int16).tobytes())
+        self.reset()
+        return tail
@@ -128,6 +128,59 @@ def split_paragraph(text: str, force_process=False, lang="zh", token_min_n=2.5,
         # print(f"💼后端进行切割：|| {''.join(utts[:-1])} || {utts[-1] + text[st:]}")
         return ''.join(utts[:-1]), utts[-1] + text[st:]
 
+class IncrementalSegmenter:
+    """
+    split_paragraph的增量版本，每个speech id一个实例。
+    feed()只扫描新到达的文本，遇到标点且累计的句子时长（estimate_speech_time）超过token_min_n时立即产出一段，
+    不足时与后续句子合并；flush()在回复结束时返回剩余的全部文本。
+    紧跟在标点后的引号在同一批增量内会并入前一句，跨增量到达时归入下一段。
+    """
+    def __init__(self, lang="zh", token_min_n=2.5, comma_split=True):
+        if lang == "zh":
+            pounc = ['。', '？', '！', '；', '：', '、', '.', '?', '!', ';']
+        else:
+            pounc = ['.', '?', '!', ';', ':']
+        if comma_split:
+            pounc.extend(['，', ','])
+        self._boundary = re.compile('[' + re.escape(''.join(pounc)) + '][”"]?')
+        self.token_min_n = token_min_n
+        self.reset()
+
+    def reset(self):
+        self._pending = []          # 已闭合但总时长不足的句子
+        self._pending_seconds = 0.
+        self._tail = []             # 最后一个标点之后的文本
+
+    def feed(self, text: str):
+        """输入一段增量文本，返回可以送去合成的文本段列表（可能为空）。"""
+        segments = []
+        start = 0
+        for m in self._boundary.finditer(text):
+            self._tail.append(text[start:m.end()])
+            start = m.end()
+            utt = ''.join(self._tail)
+            self._tail = []
+            if len(utt) == len(m.group()) and not self._pending:
+                # 单独的标点（例如段首），并入下一句
+                self._tail.append(utt)
+                continue
+            self._pending.append(utt)
+            self._pending_seconds += estimate_speech_time(utt)
+            if self._pending_seconds > self.token_min_n:
+                segments.append(''.join(self._pending))
+                self._pending = []
+                self._pending_seconds = 0.
+        if start < len(text):
+            self._tail.append(text[start:])
+        return segments
+
+    def flush(self):
+        """回复结束时调用，返回剩余文本（可能为空字符串）并清空状态。"""
+        rest = ''.join(self._pending) + ''.join(self._tail)
+        self.reset()
+        return rest
+
+
 # remove blank between chinese character
 def replace_blank(text: str):
     out_str = []
@@ -0,0 +1,18 @@
+"""
+可替换的JSON编解码器。安装了orjson时使用orjson，否则回退到标准库json。
+dumps始终返回str，以便直接作为websocket文本帧发送。
+"""
+import json
+
+try:
+    import orjson
+
+    BACKEND = "orjson"
+    loads = orjson.loads
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    BACKEND = "json"
+    loads = json.loads
+    dumps = json.dumps
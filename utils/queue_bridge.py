@@ -0,0 +1,85 @@
+"""
+把multiprocessing.Queue桥接到asyncio：一个守护线程阻塞在mp队列的get()上，
+收到数据后顺手取走队列中已经到达的其余数据（最多max_batch条），整批通过一次loop.call_soon_threadsafe
+投递到asyncio.Queue，协程侧直接await即可，不再需要 empty()/get_nowait() + asyncio.sleep 的轮询。
+约定：mp队列中的None表示停止，stop()会向队列放入None以唤醒阻塞中的读线程。
+"""
+import asyncio
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class QueueBridge:
+    def __init__(self, mp_queue, name: str = "queue-bridge", max_batch: int = 64):
+        self.mp_queue = mp_queue
+        self.name = name
+        self.max_batch = max_batch
+        self.queue: asyncio.Queue = None
+        self._loop = None
+        self._thread = None
+
+    def start(self):
+        """必须在事件循环中调用。重复调用是安全的。"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self._thread = threading.Thread(target=self._reader, name=self.name, daemon=True)
+        self._thread.start()
+
+    def _reader(self):
+        loop = self._loop
+        stopping = False
+        while not stopping:
+            try:
+                item = self.mp_queue.get()
+            except (EOFError, OSError, ValueError):
+                # 队列已关闭
+                break
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.mp_queue.get_nowait()
+                except queue.Empty:
+                    break
+                except (EOFError, OSError, ValueError):
+                    stopping = True
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                loop.call_soon_threadsafe(self._deliver, batch)
+            except RuntimeError:
+                # 事件循环已关闭
+                break
+
+    def _deliver(self, batch):
+        for item in batch:
+            self.queue.put_nowait(item)
+
+    async def get(self):
+        return await self.queue.get()
+
+    async def get_batch(self, max_items: int = None):
+        """等待至少一条数据，然后一并取走已经到达的其余数据（最多max_items条）。"""
+        items = [await self.queue.get()]
+        while not self.queue.empty() and (max_items is None or len(items) < max_items):
+            items.append(self.queue.get_nowait())
+        return items
+
+    def stop(self, timeout: float = 1.):
+        if self._thread is None:
+            return
+        if self._thread.is_alive():
+            self.mp_queue.put(None)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"{self.name}: reader thread did not exit in time")
+        self._thread = None
@@ -0,0 +1,166 @@
+"""
+基于multiprocessing.shared_memory的单生产者/单消费者PCM帧环形缓冲区，用于TTS子进程向主进程传递合成音频，
+避免每个音频块都经过multiprocessing.Queue的pickle与管道拷贝。
+共享内存布局（小端，各计数器单独占一个cache line）：
+    [0]    write_pos  u64  只由生产者写，单调递增的字节位置
+    [64]   read_pos   u64  只由消费者写
+    [128]  epoch      u64  只由消费者写，interrupt()时加一
+    [136]  dropped    u64  只由生产者写，缓冲区满时丢弃的帧数
+    [144]  stale      u64  只由生产者写，因epoch已过期而丢弃的payload字节数
+    [192:] 数据区，每帧为 帧头(seq u32, epoch u32, length u32, flags u32) + payload（按8字节对齐），
+           帧不跨越数据区末尾，放不下时写入一个WRAP帧头并从头开始。
+每个计数器都只有一个写者，8字节对齐的写入在x86/ARM64上不会被撕裂；生产者先写payload再更新write_pos，
+消费者先读write_pos再读payload。
+生产者给每帧打上开始合成时的epoch；消费者调用interrupt()后，所有旧epoch的帧（包括之后才写入的）都会被丢弃。
+对象可以作为Process参数传递，子进程中会按名字重新attach到同一块共享内存。
+"""
+import atexit
+import struct
+from multiprocessing import shared_memory
+
+_U64 = struct.Struct('<Q')
+_FRAME = struct.Struct('<IIII')
+_WRITE_POS, _READ_POS, _EPOCH, _DROPPED, _STALE = 0, 64, 128, 136, 144
+_DATA = 192
+_FLAG_WRAP = 1
+
+
+def _align8(n):
+    return (n + 7) & ~7
+
+
+class SharedAudioRing:
+    def __init__(self, capacity: int = 1 << 22, name: str = None):
+        """name为None时创建新的共享内存，否则attach到已有的同名共享内存。"""
+        self.capacity = _align8(capacity)
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=_DATA + self.capacity)
+            self.shm.buf[:_DATA] = bytes(_DATA)
+            atexit.register(self.destroy)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.buf = self.shm.buf
+        self._seq = 0
+        self._read_seq = None
+        self.frames_lost = 0
+
+    def __reduce__(self):
+        return self.__class__, (self.capacity, self.shm.name)
+
+    def _load(self, offset):
+        return _U64.unpack_from(self.buf, offset)[0]
+
+    def _store(self, offset, value):
+        _U64.pack_into(self.buf, offset, value)
+
+    @property
+    def epoch(self):
+        return self._load(_EPOCH)
+
+    # ---------------- 生产者 ----------------
+    def write(self, payload, epoch: int):
+        """写入一帧。返回seq；帧属于已被打断的epoch时返回None；缓冲区满时丢弃并返回None。"""
+        length = len(payload)
+        if epoch < self._load(_EPOCH):
+            self._store(_STALE, self._load(_STALE) + length)
+            return None
+        need = _FRAME.size + _align8(length)
+        if need > self.capacity:
+            raise ValueError(f"frame of {length} bytes does not fit in a ring of {self.capacity} bytes")
+        w = self._load(_WRITE_POS)
+        off = w % self.capacity
+        tail = self.capacity - off
+        skip = tail if tail < need else 0
+        if self.capacity - (w - self._load(_READ_POS)) < skip + need:
+            self._store(_DROPPED, self._load(_DROPPED) + 1)
+            self._seq += 1
+            return None
+        if skip:
+            if tail >= _FRAME.size:
+                _FRAME.pack_into(self.buf, _DATA + off, 0, 0, 0, _FLAG_WRAP)
+            w += skip
+            off = 0
+        seq = self._seq
+        self._seq += 1
+        start = _DATA + off
+        _FRAME.pack_into(self.buf, start, seq & 0xFFFFFFFF, epoch & 0xFFFFFFFF, length, 0)
+        self.buf[start + _FRAME.size:start + _FRAME.size + length] = payload
+        self._store(_WRITE_POS, w + need)
+        return seq
+
+    # ---------------- 消费者 ----------------
+    def read(self):
+        """
+        逐帧产出 (seq, memoryview)，memoryview直接指向共享内存，只在下一次迭代前有效。
+        迭代过程中若调用了interrupt()，迭代立即结束。
+        """
+        epoch = self._load(_EPOCH)
+        r = self._load(_READ_POS)
+        w = self._load(_WRITE_POS)
+        while r < w:
+            off = r % self.capacity
+            tail = self.capacity - off
+            if tail < _FRAME.size:
+                r += tail
+                continue
+            seq, frame_epoch, length, flags = _FRAME.unpack_from(self.buf, _DATA + off)
+            if flags & _FLAG_WRAP:
+                r += tail
+                continue
+            end = r + _FRAME.size + _align8(length)
+            if self._read_seq is not None:
+                self.frames_lost += (seq - self._read_seq - 1) & 0xFFFFFFFF
+            self._read_seq = seq
+            if frame_epoch >= (epoch & 0xFFFFFFFF):
+                start = _DATA + off + _FRAME.size
+                view = self.buf[start:start + length]
+                try:
+                    yield seq, view
+                finally:
+                    view.release()
+                if self._load(_EPOCH) != epoch:
+                    return
+            r = end
+            self._store(_READ_POS, r)
+        self._store(_READ_POS, r)
+
+    def interrupt(self):
+        """
+        丢弃当前所有未读的帧，以及生产者之后写入的任何旧epoch的帧。
+        返回被丢弃的未读字节数（含帧头，作为近似值）。
+        """
+        self._store(_EPOCH, self._load(_EPOCH) + 1)
+        w = self._load(_WRITE_POS)
+        discarded = w - self._load(_READ_POS)
+        self._store(_READ_POS, w)
+        self._read_seq = None
+        return discarded
+
+    @property
+    def stale_bytes(self):
+        """生产者因epoch过期而没有写入的payload字节数（累计值）。"""
+        return self._load(_STALE)
+
+    def stats(self):
+        w, r = self._load(_WRITE_POS), self._load(_READ_POS)
+        return {"ring_bytes_used": w - r, "ring_capacity": self.capacity, "ring_epoch": self._load(_EPOCH),
+                "ring_frames_dropped": self._load(_DROPPED), "ring_frames_lost": self.frames_lost}
+
+    def close(self):
+        self.buf = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+
+    def destroy(self):
+        """仅创建者调用：关闭并释放共享内存。"""
+        if not self.owner or self.shm is None:
+            return
+        self.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
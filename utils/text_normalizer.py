@@ -0,0 +1,144 @@
+"""
+core（送去TTS的文本）与cross_server（同步/记忆用的文本）共用的文本规范化。
+原先两处各自串联调用frontend_utils中的replace_blank（逐字符Python循环）、remove_bracket（多次replace）、
+spell_out_number（逐字符循环）和is_only_punctuation（每次按字符串查找regex缓存），这里改为：
+    - replace_blank、数字串、括号、emoji用预编译的正则一次扫描完成，且只在文本中出现相关字符时才执行；
+    - 单字符的替换/删除用str.replace（CPython中对非ASCII文本比带dict表的str.translate快得多）；
+    - 数字转英文单词（inflect每次调用都有很重的类型检查）与较短的文本（流式增量、语气词、报时等经常重复）用LRU缓存结果。
+各步骤的顺序与原实现保持一致，输出逐字相同，见tools/normalize_golden.jsonl与tools/bench_normalize.py。
+"""
+import re
+import sys
+from functools import lru_cache
+
+import regex
+
+_CACHE_MAX_LEN = 64
+
+_chinese_char = re.compile(r'[\u4e00-\u9fff]')
+# 空格两侧都是非空格的ASCII字符时保留，否则删除（即replace_blank）
+_ascii_non_space = r'[\x00-\x1f\x21-\x7f]'
+_blank = re.compile(rf'(?<!{_ascii_non_space}) | (?!{_ascii_non_space})')
+_round_bracket = re.compile(r'\(.*?\)')
+_full_bracket = re.compile('（.*?）')
+_trailing_comma = re.compile(r'[，、]+$')
+_emotion = re.compile('<(.*?)>')
+_emoji = re.compile(r'[^\w\u4e00-\u9fff\s>][^\w\u4e00-\u9fff\s]{2,}[^\w\u4e00-\u9fff\s<]', flags=re.UNICODE)
+_emoji2 = re.compile("["
+                     u"\U0001F600-\U0001F64F"  # emoticons
+                     u"\U0001F300-\U0001F5FF"  # symbols & pictographs
+                     u"\U0001F680-\U0001F6FF"  # transport & map symbols
+                     u"\U0001F1E0-\U0001F1FF"  # flags (iOS)
+                     "]+", flags=re.UNICODE)
+_EMOJI2_MIN = '\U0001F1E0'
+_only_punctuation = regex.compile(r'^[\p{P}\p{S}]*$')
+
+_CORNER_MARKS = (('²', '平方'), ('³', '立方'))
+_STRIP_MARKS = '【】《》`'
+_STRIP_BRACKETS = '（）()'
+
+
+@lru_cache(maxsize=1)
+def _digit_run():
+    # 与str.isdigit()一致：\d之外还包括上标、带圈数字等
+    extra = ''.join(chr(c) for c in range(sys.maxunicode + 1) if chr(c).isdigit() and not chr(c).isdecimal())
+    return re.compile(r'[\d' + re.escape(extra) + r']+')
+
+
+@lru_cache(maxsize=1)
+def _inflect_parser():
+    import inflect
+    return inflect.engine()
+
+
+@lru_cache(maxsize=4096)
+def _number_to_words(digits):
+    return _inflect_parser().number_to_words(digits)
+
+
+def _delete_chars(text, chars):
+    for c in chars:
+        if c in text:
+            text = text.replace(c, '')
+    return text
+
+
+def _remove_bracket(text):
+    if '(' in text:
+        text = _round_bracket.sub('', text)
+    if '（' in text:
+        text = _full_bracket.sub('', text)
+    text = _delete_chars(text, _STRIP_MARKS)
+    if '——' in text:
+        text = text.replace('——', ' ')
+    return _delete_chars(text, _STRIP_BRACKETS)
+
+
+def _remove_emoji(text):
+    if text and max(text) >= _EMOJI2_MIN:
+        text = _emoji2.sub('', text)
+    return _emoji.sub('', text)
+
+
+def _spell_out_number(text):
+    return _digit_run().sub(lambda m: _number_to_words(m.group()), text)
+
+
+def _normalize_tts(text):
+    text = text.strip()
+    if '\n' in text:
+        text = text.replace('\n', '')
+    if _chinese_char.search(text):
+        if ' ' in text:
+            text = _blank.sub('', text)
+        for mark, spoken in _CORNER_MARKS:
+            if mark in text:
+                text = text.replace(mark, spoken)
+        text = text.replace('.', '。')
+        if ' - ' in text:
+            text = text.replace(' - ', '，')
+        text = _remove_bracket(text)
+        text = _trailing_comma.sub('。', text)
+    else:
+        text = _remove_bracket(text)
+        text = _spell_out_number(text)
+    text = _remove_emoji(text)
+    if text not in ('<', '>') and _only_punctuation.fullmatch(text):
+        return ""
+    return text
+
+
+def _normalize_sync(text):
+    text = text.strip()
+    if ' ' in text:
+        text = _blank.sub('', text)
+    text = _remove_emoji(text)
+    if '<' in text:
+        text = _emotion.sub('', text)
+    if _only_punctuation.fullmatch(text):
+        return ""
+    return text
+
+
+_normalize_tts_cached = lru_cache(maxsize=4096)(_normalize_tts)
+_normalize_sync_cached = lru_cache(maxsize=4096)(_normalize_sync)
+
+
+def warm_up():
+    """提前构建inflect引擎与数字正则（首次调用约3秒），避免在事件循环中第一次遇到数字时卡住。"""
+    _digit_run()
+    _inflect_parser()
+
+
+def normalize_tts_text(text: str) -> str:
+    """送去TTS前的规范化（原LLMSessionManager.normalize_text）。"""
+    if len(text) <= _CACHE_MAX_LEN:
+        return _normalize_tts_cached(text)
+    return _normalize_tts(text)
+
+
+def normalize_sync_text(text: str) -> str:
+    """同步给副终端/记忆服务器前的规范化（原cross_server.normalize_text）。"""
+    if len(text) <= _CACHE_MAX_LEN:
+        return _normalize_sync_cached(text)
+    return _normalize_sync(text)